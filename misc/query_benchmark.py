@@ -0,0 +1,100 @@
+#!/usr/bin/python2
+# -*- coding: utf-8 -*-
+
+"""Compares the speed of the interpreted and the compiled query search
+(and the QueryIndex) over a synthetic library.
+
+./query_benchmark.py [number of songs]
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                    "quodlibet"))
+
+from quodlibet import config
+from quodlibet.formats import AudioFile
+from quodlibet.query import Query, QueryIndex
+
+
+QUERIES = [
+    u"beatles",
+    u"the beat",
+    u"artist=\"The Beatles 12\"",
+    u"&(artist=beat, #(playcount > 3))",
+    u"|(genre=rock, album=love, #(rating > 0.5))",
+    u"&(#(length > 200), !title=love, ~dirname=/12/)",
+    u"#(2003 <= year <= 2007)",
+]
+
+WORDS = [u"love", u"rock", u"beat", u"night", u"blue", u"the", u"song",
+         u"heart", u"dream", u"fire", u"Über", u"Ärger", u"café"]
+
+
+def create_songs(count):
+    rand = random.Random(42)
+
+    def words(n):
+        return u" ".join(rand.choice(WORDS) for i in xrange(n))
+
+    songs = []
+    for i in xrange(count):
+        artist = u"The Beatles %d" % (i % 2000) if i % 7 == 0 else words(2)
+        song = AudioFile({
+            "~filename": "/music/%d/%d/%d.ogg" % (i % 50, i % 1000, i),
+            "artist": artist,
+            "album": words(3),
+            "title": words(4),
+            "genre": rand.choice([u"Rock", u"Pop", u"Jazz", u"Rock\nPop"]),
+            "date": u"%d" % rand.randint(1960, 2015),
+            "tracknumber": u"%d/12" % (i % 12 + 1),
+            "~#length": rand.randint(60, 600),
+            "~#playcount": rand.randint(0, 10),
+        })
+        if i % 3:
+            song["~#rating"] = rand.random()
+        songs.append(song)
+    return songs
+
+
+def measure(func, repeat=3):
+    best = None
+    for i in xrange(repeat):
+        start = time.time()
+        func()
+        t = time.time() - start
+        best = t if best is None else min(best, t)
+    return best
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 100000
+
+    config.init_defaults()
+    config.init()
+    songs = create_songs(count)
+    index = QueryIndex(songs)
+    print "%d songs" % count
+    print "%-50s %10s %10s %10s" % ("query", "search", "compiled", "index")
+
+    for text in QUERIES:
+        query = Query(text)
+        search, compiled = query.search, query.compiled
+        assert filter(search, songs) == filter(compiled, songs)
+        index.search(query)
+
+        t_search = measure(lambda: filter(search, songs))
+        t_compiled = measure(lambda: filter(compiled, songs))
+        t_index = measure(lambda: index.search(query))
+        print "%-50s %9.3fs %9.3fs %9.3fs" % (
+            text, t_search, t_compiled, t_index)
+
+    config.quit()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
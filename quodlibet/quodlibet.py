@@ -50,11 +50,20 @@ def main(argv):
     config.init(os.path.join(quodlibet.get_user_dir(), "config"))
 
     library_path = os.path.join(quodlibet.get_user_dir(), "songs")
+    sort_keys_path = os.path.join(quodlibet.get_user_dir(), "sortkeys")
+    persist_sort_keys = config.getboolean("library", "persist_sort_keys")
+    if persist_sort_keys:
+        util.sort_key_cache.load(sort_keys_path)
 
     print_d("Initializing main library (%s)" % (
             quodlibet.util.path.unexpand(library_path)))
 
-    library = quodlibet.library.init(library_path)
+    library = quodlibet.library.init(
+        library_path, journal=config.getboolean("library", "journal"))
+    library.use_index = config.getboolean("library", "query_index")
+    library.scan_processes = config.getint("library", "scan_processes")
+    library.trust_dir_mtimes = config.getboolean(
+        "library", "trust_dir_mtimes")
     app.library = library
 
     # this assumes that nullbe will always succeed
@@ -116,6 +125,11 @@ def main(argv):
     from quodlibet.util.cover import CoverManager
     app.cover_manager = CoverManager()
     app.cover_manager.init_plugins()
+    cover_cache_path = os.path.join(quodlibet.get_user_dir(), "coverpaths")
+    app.cover_manager.load_cache(cover_cache_path)
+    from quodlibet.util.thumbnails import pixbuf_cache
+    pixbuf_cache.max_bytes = \
+        config.getint("albumart", "cache_size") * 1024 * 1024
 
     from quodlibet.plugins.playlist import PLAYLIST_HANDLER
     PLAYLIST_HANDLER.init_plugins()
@@ -213,6 +227,11 @@ def main(argv):
 
     tracker.destroy()
     quodlibet.library.save()
+    if persist_sort_keys:
+        util.sort_key_cache.save(sort_keys_path)
+    print_d("Sort key cache: %r" % util.sort_key_cache.get_stats())
+    app.cover_manager.save_cache(cover_cache_path)
+    print_d("Pixbuf cache: %r" % pixbuf_cache.get_stats())
 
     config.save()
 
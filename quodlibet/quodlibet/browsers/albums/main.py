@@ -437,11 +437,12 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate):
 
         def cell_data_pb(column, cell, model, iter_, no_cover):
             album = model.get_album(iter_)
+            cover = album and album.cover
 
             if album is None:
                 pixbuf = None
-            elif album.cover:
-                pixbuf = album.cover
+            elif cover:
+                pixbuf = cover
                 round_ = config.getboolean("albumart", "round")
                 pixbuf = add_border_widget(
                     pixbuf, self.view, cell, round_)
@@ -26,6 +26,7 @@ from quodlibet.qltk.x import ScrolledWindow, Align, SymbolicIconImage
 from quodlibet.util.collection import Album
 from quodlibet.util import connect_obj
 from quodlibet.util.library import background_filter
+from quodlibet.util.thumbnails import pixbuf_cache
 
 from .models import (CollectionTreeStore, CollectionSortModel,
     CollectionFilterModel, MultiNode, UnknownNode)
@@ -35,8 +36,14 @@ from .prefs import get_headers, Preferences
 class CollectionView(AllTreeView):
     def __init__(self):
         super(CollectionView, self).__init__()
+        self.connect("test-expand-row", self.__populate)
         self.connect_after("row-expanded", self.__expand_helper)
 
+    def __populate(self, view, iter_, path):
+        # the rows below get added on demand
+        view.get_model().populate(iter_)
+        return False
+
     def __expand_helper(self, view, iter, path):
         model = view.get_model()
         children = list(model[path].iterchildren())
@@ -153,6 +160,7 @@ class CollectionBrowser(Browser, util.InstanceTracker):
         self.__filter = None
         self.__bg_filter = background_filter()
         model_filter.set_visible_func(self.__parse_query)
+        model_filter.album_filter = self.__check_album
         view.set_model(model_filter)
 
         def sort(model, i1, i2, data):
@@ -186,17 +194,16 @@ class CollectionBrowser(Browser, util.InstanceTracker):
             cell.set_property('markup', markup)
 
         def get_scaled_cover(album):
-            # XXX: Cache this somewhere else
-            cover = None
-            if not hasattr(album, "_scaled_cover"):
-                scale_factor = get_scale_factor(self)
+            scale_factor = get_scale_factor(self)
+            key = ("collection", album.key, scale_factor)
+            cover = pixbuf_cache.get(key)
+            if cover is None:
                 album.scan_cover(scale_factor=scale_factor)
-                if album.cover:
+                pixbuf = album.cover
+                if pixbuf:
                     s = 25 * scale_factor
-                    cover = scale(album.cover, (s, s))
-                    album._scaled_cover = cover
-            else:
-                cover = album._scaled_cover
+                    cover = scale(pixbuf, (s, s))
+                    pixbuf_cache.set(key, cover)
             return cover
 
         def cell_data_pb(column, cell, model, iter_, data):
@@ -269,24 +276,29 @@ class CollectionBrowser(Browser, util.InstanceTracker):
     def __uninhibit(self):
         self.view.get_selection().handler_unblock(self.__sig)
 
-    def __parse_query(self, model, iter_, data):
+    def __check_album(self, album):
         f, b = self.__filter, self.__bg_filter
         if f is None and b is None:
             return True
+        if b is None:
+            return f(album)
+        if f is None:
+            return b(album)
+        return f(album) and b(album)
 
-        def check_album(obj):
-            if b is None:
-                return f(obj)
-            if f is None:
-                return b(obj)
-            return f(obj) and b(obj)
+    def __parse_query(self, model, iter_, data):
+        if self.__filter is None and self.__bg_filter is None:
+            return True
 
         obj = model.get_value(iter_)
         if isinstance(obj, Album):
-            return check_album(obj)
+            return self.__check_album(obj)
+        elif obj is None:
+            # placeholder of a not yet expanded row
+            return True
         else:
             for album in model.iter_albums(iter_):
-                if check_album(album):
+                if self.__check_album(album):
                     return True
             return False
 
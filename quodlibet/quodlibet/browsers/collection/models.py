@@ -50,53 +50,59 @@ def build_tree(tags, albums, cache=None):
 
 
 class CollectionModelMixin(object):
+    """Shared by the tree store and the models stacked on it. Everything
+    album related is answered by the CollectionTreeStore index.
+    """
+
+    def _get_store_iter(self, iter_):
+        """Returns the underlying CollectionTreeStore and the iter in it"""
+
+        model = self
+        while not isinstance(model, CollectionTreeStore):
+            if iter_ is not None:
+                iter_ = model.convert_iter_to_child_iter(iter_)
+            model = model.get_model()
+        return model, iter_
+
+    def populate(self, iter_):
+        """Makes sure the children of iter_ are in the model"""
+
+        store, iter_ = self._get_store_iter(iter_)
+        store.populate(iter_)
 
     def get_path_for_album(self, album):
         """Returns the path for an album or None"""
 
-        def func(model, path, iter_, result):
-            if model[iter_][0] is album:
-                # pygobject bug: treepath only valid in callback,
-                # so make a copy
-                result[0] = path.copy()
-                return True
-            return False
+        for path in self.iter_paths_for_album(album):
+            return path
 
-        res = [None]
-        self.foreach(func, res)
-        return res[0]
+    def iter_paths_for_album(self, album):
+        """Yields all paths of an album, adding missing rows on the way"""
+
+        for path in self.get_model().iter_paths_for_album(album):
+            path = self.convert_child_path_to_path(path)
+            if path is not None:
+                yield path
 
     def get_albums_for_path(self, path):
         return self.get_albums_for_iter(self.get_iter(path))
 
     def get_albums_for_iter(self, iter_):
-        obj = self.get_value(iter_)
-
-        if isinstance(obj, Album):
-            return {obj}
-
-        albums = set()
-        for child_iter, value in self.iterrows(iter_):
-            if isinstance(value, Album):
-                albums.add(value)
-            else:
-                albums.update(self.get_albums_for_iter(child_iter))
-        return albums
+        store, iter_ = self._get_store_iter(iter_)
+        return store.get_albums_for_iter(iter_)
 
     def iter_albums(self, iter_):
         """Yields all albums below iter_"""
 
-        for child_iter, value in self.iterrows(iter_):
-            if isinstance(value, Album):
-                yield value
-            else:
-                for album in self.iter_albums(child_iter):
-                    yield album
+        store, iter_ = self._get_store_iter(iter_)
+        return store.iter_albums(iter_)
 
     def get_markup(self, tags, iter_):
         obj = self.get_value(iter_, 0)
         if isinstance(obj, Album):
             return PAT % obj
+        elif obj is None:
+            return u""
 
         if isinstance(obj, basestring):
             markup = util.escape(obj)
@@ -117,121 +123,225 @@ class CollectionModelMixin(object):
 
 
 class CollectionFilterModel(ObjectModelFilter, CollectionModelMixin):
-    pass
+
+    album_filter = None
+    """A function returning False for albums which are filtered out"""
+
+    def get_albums_for_iter(self, iter_):
+        albums = super(CollectionFilterModel, self).get_albums_for_iter(iter_)
+        if self.album_filter is not None:
+            albums = set(filter(self.album_filter, albums))
+        return albums
 
 
 class CollectionSortModel(ObjectModelSort, CollectionModelMixin):
     pass
 
 
+class _Node(object):
+    """A header row of the tree, present in the store or not"""
+
+    __slots__ = ("key", "parent", "iter", "albums", "children",
+                 "album_iters", "populated")
+
+    def __init__(self, key, parent):
+        self.key = key
+        self.parent = parent
+        # None if the row isn't in the store (yet)
+        self.iter = None
+        # all albums below this node
+        self.albums = set()
+        # key -> _Node, for all but the lowest level
+        self.children = {}
+        # album -> iter of the album rows, for the lowest level
+        self.album_iters = {}
+        # if the child rows are in the store, if not there is a
+        # placeholder row so the node can be expanded
+        self.populated = False
+
+    def get_keys(self):
+        keys = []
+        node = self
+        while node.parent is not None:
+            keys.append(node.key)
+            node = node.parent
+        return tuple(reversed(keys))
+
+
 class CollectionTreeStore(ObjectTreeStore, CollectionModelMixin):
+    """The rows below a header get added the first time it gets expanded
+    (see populate()); until then it only has a placeholder row containing
+    None. The complete hierarchy is kept in a tree of _Node objects and
+    every album maps to the nodes it is in, so changes only touch the
+    affected rows.
+    """
+
     def __init__(self):
         super(CollectionTreeStore, self).__init__(object)
         self.__tags = []
+        self.__reset()
+
+    def __reset(self):
+        self.__root = _Node(None, None)
+        self.__root.populated = True
+        # album -> list of the lowest level nodes containing it
+        self.__album_nodes = {}
 
     def set_albums(self, tags, albums):
         self.clear()
         self.__tags = tags
+        self.__reset()
         self.add_albums(albums)
 
     @property
     def tags(self):
         return [t[0] for t in self.__tags]
 
+    def __get_keys(self, album):
+        """Returns the key sequences of all lowest level nodes the album
+        belongs to.
+        """
+
+        paths = [()]
+        for tag, merge in self.__tags:
+            values = album.list(tag)
+            if merge and len(values) > 1:
+                values = [MultiNode]
+            values = values or [UnknownNode]
+            paths = [p + (v,) for p in paths for v in values]
+        return paths
+
+    def __get_node(self, iter_):
+        """Returns the node for a header row or the root for None"""
+
+        keys = []
+        while iter_ is not None:
+            keys.append(self.get_value(iter_))
+            iter_ = self.iter_parent(iter_)
+
+        node = self.__root
+        for key in reversed(keys):
+            node = node.children.get(key)
+            if node is None:
+                break
+        return node
+
+    def __is_leaf(self, node):
+        return len(node.get_keys()) == len(self.__tags)
+
+    def __append_node(self, node):
+        node.iter = self.append(parent=node.parent.iter, row=[node.key])
+        self.append(parent=node.iter, row=[None])
+
+    def __populate(self, node):
+        if node.populated:
+            return
+        node.populated = True
+
+        placeholder = self.iter_children(node.iter)
+        if self.__is_leaf(node):
+            for album in node.albums:
+                node.album_iters[album] = self.append(
+                    parent=node.iter, row=[album])
+        else:
+            for child in node.children.itervalues():
+                self.__append_node(child)
+        # remove it last, so the row never loses its expander
+        if placeholder is not None:
+            self.remove(placeholder)
+
+    def populate(self, iter_):
+        node = self.__get_node(iter_)
+        if node is not None:
+            self.__populate(node)
+
+    def iter_paths_for_album(self, album):
+        for node in list(self.__album_nodes.get(album, [])):
+            parents = []
+            parent = node
+            while parent is not None:
+                parents.append(parent)
+                parent = parent.parent
+            for parent in reversed(parents):
+                self.__populate(parent)
+            iter_ = node.album_iters.get(album)
+            if iter_ is not None:
+                yield self.get_path(iter_)
+
+    def get_albums_for_iter(self, iter_):
+        obj = self.get_value(iter_) if iter_ is not None else None
+        if isinstance(obj, Album):
+            return {obj}
+        return set(self.iter_albums(iter_))
+
+    def iter_albums(self, iter_):
+        if iter_ is not None and self.get_value(iter_) is None:
+            # placeholder
+            return iter([])
+        node = self.__get_node(iter_)
+        if node is None:
+            return iter([])
+        return iter(list(node.albums))
+
     def add_albums(self, albums):
-        def _add(tree, iter_=None):
-            # lowest level, add albums
-            if isinstance(tree, list):
-                for album in tree:
-                    self.append(parent=iter_, row=[album])
-                return
-
-            # move into existing nodes and remove them from tree
-            child = self.iter_children(iter_)
-            while child:
-                obj = self[child][0]
-                if obj in tree:
-                    _add(tree[obj], child)
-                    del tree[obj]
-                child = self.iter_next(child)
-
-            # add missing ones
-            for key, value in tree.iteritems():
-                _add(value, self.append(parent=iter_, row=[key]))
-
-        _add(build_tree(self.__tags, albums))
+        root = self.__root
+        for album in albums:
+            album_nodes = self.__album_nodes.setdefault(album, [])
+            for keys in self.__get_keys(album):
+                node = root
+                node.albums.add(album)
+                for key in keys:
+                    child = node.children.get(key)
+                    if child is None:
+                        child = node.children[key] = _Node(key, node)
+                        if node.populated:
+                            self.__append_node(child)
+                    child.albums.add(album)
+                    node = child
+
+                if node not in album_nodes:
+                    album_nodes.append(node)
+                if node.populated and album not in node.album_iters:
+                    node.album_iters[album] = self.append(
+                        parent=node.iter, row=[album])
 
     def remove_albums(self, albums):
-        # We can't get anything from the albums (they have no songs),
-        # so we have to look through everything.
-
-        def _remove_albums(albums, iter_=None):
-            child = self.iter_children(iter_)
-            while child:
-                _remove_albums(albums, child)
-                obj = self[child][0]
-                if isinstance(obj, Album):
-                    # remove albums
-                    if obj in albums:
-                        if not self.remove(child):
-                            child = None
-                        continue
-                    else:
-                        child = self.iter_next(child)
-                else:
-                    # clean up empty containers
-                    if not self.iter_has_child(child):
-                        if not self.remove(child):
-                            child = None
-                        continue
-                    else:
-                        child = self.iter_next(child)
-
-        _remove_albums(set(albums))
+        root = self.__root
+        for album in albums:
+            album_nodes = self.__album_nodes.pop(album, [])
+            for node in album_nodes:
+                iter_ = node.album_iters.pop(album, None)
+                if iter_ is not None:
+                    self.remove(iter_)
+                while node is not None:
+                    node.albums.discard(album)
+                    node = node.parent
+
+            # clean up empty containers
+            for node in album_nodes:
+                while node is not root and not node.albums:
+                    parent = node.parent
+                    if parent.children.get(node.key) is not node:
+                        # already removed through another node
+                        break
+                    if node.iter is not None:
+                        self.remove(node.iter)
+                    del parent.children[node.key]
+                    node = parent
 
     def change_albums(self, albums):
-        def _check_albums(tree, iter_=None, not_found=None):
-            if not_found is None:
-                not_found = set()
-
-            if isinstance(tree, list):
-                # save nodes that are not there anymore
-                child = self.iter_children(iter_)
-                while child:
-                    row = self[child]
-                    try:
-                        tree.remove(row[0])
-                    except ValueError:
-                        pass
-                    else:
-                        # it's still in the same position, trigger a redraw
-                        self.row_changed(row.path, row.iter)
-                    child = self.iter_next(child)
-                not_found.update(tree)
-                return not_found
-
-            child = self.iter_children(iter_)
-            while child:
-                obj = self[child][0]
-                if obj in tree:
-                    _check_albums(tree[obj], child, not_found)
-                    del tree[obj]
-                child = self.iter_next(child)
-
-            # everything left over changed
-            def _get_all(sub, found=None):
-                if found is None:
-                    found = set()
-                if isinstance(sub, list):
-                    found.update(sub)
-                    return found
-                for v in sub.itervalues():
-                    _get_all(v, found)
-                return found
-            not_found.update(_get_all(tree))
-
-            return not_found
-
-        not_found = _check_albums(build_tree(self.__tags, albums))
-        self.remove_albums(not_found)
-        self.add_albums(not_found)
+        moved = []
+        for album in albums:
+            nodes = self.__album_nodes.get(album, [])
+            keys = set(n.get_keys() for n in nodes)
+            if keys != set(self.__get_keys(album)):
+                moved.append(album)
+                continue
+            # it's still in the same position, trigger a redraw
+            for node in nodes:
+                iter_ = node.album_iters.get(album)
+                if iter_ is not None:
+                    self.row_changed(self.get_path(iter_), iter_)
+
+        self.remove_albums(moved)
+        self.add_albums(moved)
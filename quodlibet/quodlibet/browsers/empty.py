@@ -74,7 +74,7 @@ class EmptyBar(Browser):
         except Query.error:
             pass
         else:
-            return self._query.filter(self._library)
+            return self._library.search(self._query)
 
     def activate(self):
         songs = self._get_songs()
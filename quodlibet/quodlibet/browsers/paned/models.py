@@ -6,6 +6,9 @@
 # published by the Free Software Foundation
 
 import re
+import heapq
+from bisect import bisect_left
+from itertools import izip
 
 from quodlibet import util
 from quodlibet.qltk.models import ObjectStore
@@ -109,11 +112,22 @@ class AllEntry(BaseEntry):
 
 
 class PaneModel(ObjectStore):
+    """Keeps an index of the rows by key and the sort keys of all
+    SongsEntry rows, so adding and removing songs only has to touch
+    the affected rows.
+
+    The row order is [AllEntry] SongsEntry* [UnknownEntry].
+    """
 
     def __init__(self, pattern_config):
         super(PaneModel, self).__init__()
-        self.__sort_cache = {}
         self.__key_cache = {}
+        # key -> iter for all SongsEntry rows, including Unknown ("")
+        self.__iters = {}
+        # sorted sort keys of all SongsEntry rows, excluding Unknown
+        self.__sort_keys = []
+        # keys of rows which got empty but weren't removed
+        self.__empty = set()
         self.config = pattern_config
 
     def get_format_keys(self, song):
@@ -125,16 +139,23 @@ class PaneModel(ObjectStore):
             return self.__key_cache[song]
 
     def __human_sort_key(self, text, reg=re.compile('<.*?>')):
-        try:
-            return self.__sort_cache[text], text
-        except KeyError:
-            # remove the markup so it doesn't affect the sort order
-            if self.config.has_markup:
-                text_stripped = reg.sub("", text)
-            else:
-                text_stripped = text
-            self.__sort_cache[text] = util.human_sort_key(text_stripped)
-            return self.__sort_cache[text], text
+        # remove the markup so it doesn't affect the sort order
+        if self.config.has_markup:
+            text_stripped = reg.sub("", text)
+        else:
+            text_stripped = text
+        return util.human_sort_key(text_stripped), text
+
+    def __has_all(self):
+        iter_ = self.get_iter_first()
+        return iter_ is not None and \
+            isinstance(self.get_value(iter_), AllEntry)
+
+    def clear(self):
+        super(PaneModel, self).clear()
+        self.__iters.clear()
+        del self.__sort_keys[:]
+        self.__empty.clear()
 
     def get_songs(self, paths):
         """Get all songs for the given paths (from a selection e.g.)"""
@@ -162,38 +183,51 @@ class PaneModel(ObjectStore):
         If remove_if_empty == True, entries with no songs will be removed.
         """
 
-        songs = set(songs)
-
+        iters = self.__iters
+        changed = {}
         for song in songs:
-            if song in self.__key_cache:
-                del self.__key_cache[song]
-
-        to_remove = []
-        for iter_, entry in self.iterrows():
-            if isinstance(entry, AllEntry):
+            keys = self.__key_cache.pop(song, None)
+            if keys is None:
+                # never added, so in no entry
                 continue
-            entry.songs -= songs
+            for key in (keys or [""]):
+                iter_ = iters.get(key)
+                if iter_ is None:
+                    continue
+                entry = self.get_value(iter_)
+                if song in entry.songs:
+                    entry.songs.discard(song)
+                    changed[key] = iter_
+
+        empty = self.__empty
+        for key, iter_ in changed.iteritems():
+            entry = self.get_value(iter_)
             entry.finalize()
             self.row_changed(self.get_path(iter_), iter_)
             if not entry.songs:
-                to_remove.append(iter_)
+                empty.add(key)
 
         if not remove_if_empty:
             return
 
-        # remove from cache and the model
-        for iter_ in to_remove:
-            try:
-                key = self.get_value(iter_).key
-                del(self.__sort_cache[key])
-            except KeyError:
-                pass
+        removed = False
+        for key in empty:
+            iter_ = iters.get(key)
+            if iter_ is None or self.get_value(iter_).songs:
+                continue
+            del iters[key]
             self.remove(iter_)
-
-        if len(self) == 1 and isinstance(self[0][0], AllEntry):
+            removed = True
+            if key:
+                sort_keys = self.__sort_keys
+                del sort_keys[
+                    bisect_left(sort_keys, self.__human_sort_key(key))]
+        empty.clear()
+
+        if len(self) == 1 and self.__has_all():
             # only All is left.. clear everything
             self.clear()
-        elif to_remove and len(self) == 2:
+        elif removed and len(self) == 2 and self.__has_all():
             # Only one entry + All -> remove All
             self.remove(self.get_iter_first())
 
@@ -201,88 +235,68 @@ class PaneModel(ObjectStore):
         """Add new songs to the list, creating new rows"""
 
         collection = {}
-        unknown = UnknownEntry()
-        human_sort = self.__human_sort_key
+        unknown = set()
         for song in songs:
             keys = self.get_format_keys(song)
             if not keys:
-                unknown.songs.add(song)
+                unknown.add(song)
             for key in keys:
-                if key in collection:
-                    collection[key][0].songs.add(song)
-                else:
-                    entry = SongsEntry(key)
-                    collection[key] = (entry, human_sort(key))
-                    entry.songs.add(song)
+                collection.setdefault(key, set()).add(song)
 
-        items = sorted(collection.iteritems(),
-                       key=lambda s: s[1][1],
-                       reverse=True)
+        # extend existing rows
+        iters = self.__iters
+        human_sort = self.__human_sort_key
+        items = []
+        for key, key_songs in collection.iteritems():
+            iter_ = iters.get(key)
+            if iter_ is None:
+                items.append((human_sort(key), key, key_songs))
+            else:
+                entry = self.get_value(iter_)
+                entry.songs |= key_songs
+                entry.finalize()
+                self.row_changed(self.get_path(iter_), iter_)
+                self.__empty.discard(key)
+        items.sort()
 
         # fast path
         if not len(self):
-            if unknown.songs:
-                self.insert(0, [unknown])
-            entries = []
-            for key, (val, sort_key) in items:
-                entries.append(val)
-            self.insert_many(0, reversed(entries))
-            if len(self) > 1:
-                self.insert(0, [AllEntry()])
+            if len(items) + bool(unknown) > 1:
+                self.append(row=[AllEntry()])
+            entries = [SongsEntry(key, s) for (sort_key, key, s) in items]
+            for item, iter_ in izip(items, self.iter_append_many(entries)):
+                iters[item[1]] = iter_
+            self.__sort_keys = [sort_key for (sort_key, key, s) in items]
+            if unknown:
+                iters[""] = self.append(row=[UnknownEntry(unknown)])
             return
 
-        # insert all new songs
-        key = None
-        val = None
-        sort_key = None
-
-        for iter_, entry in self.iterrows():
-            if not isinstance(entry, SongsEntry):
-                continue
-
-            if key is None:
-                if not items:
-                    break
-                key, (val, sort_key) = items.pop(-1)
+        # insert the new rows, in order so the positions stay valid
+        sort_keys = self.__sort_keys
+        offset = int(self.__has_all())
+        for i, (sort_key, key, key_songs) in enumerate(items):
+            position = bisect_left(sort_keys, sort_key) + i + offset
+            iters[key] = self.insert(position, [SongsEntry(key, key_songs)])
+        if items:
+            self.__sort_keys = list(
+                heapq.merge(sort_keys, (item[0] for item in items)))
 
-            if key == entry.key:
-                entry.songs |= val.songs
+        # check if Unknown needs to be inserted or updated
+        if unknown:
+            iter_ = iters.get("")
+            if iter_ is None:
+                iters[""] = self.append(row=[UnknownEntry(unknown)])
+            else:
+                entry = self.get_value(iter_)
+                entry.songs |= unknown
                 entry.finalize()
                 self.row_changed(self.get_path(iter_), iter_)
-                key = None
-            elif sort_key < human_sort(entry.key):
-                self.insert_before(iter_, row=[val])
-                key = None
-
-        # the last one failed, add it again
-        if key:
-            items.append((key, (val, sort_key)))
-
-        # insert the left over songs
-        if items:
-            entries = []
-            for key, (val, srt) in items:
-                entries.append(val)
-            if isinstance(self[-1][0], UnknownEntry):
-                self.insert_many(len(self) - 1, entries)
-            else:
-                self.append_many(entries)
+                self.__empty.discard("")
 
         # check if All needs to be inserted
-        if len(self) > 1 and not isinstance(self[0][0], AllEntry):
+        if len(self) > 1 and not offset:
             self.insert(0, [AllEntry()])
 
-        # check if Unknown needs to be inserted or updated
-        if unknown.songs:
-            last_row = self[-1]
-            entry = last_row[0]
-            if isinstance(entry, UnknownEntry):
-                entry.songs |= unknown.songs
-                entry.finalize()
-                self.row_changed(last_row.path, last_row.iter)
-            else:
-                self.append(row=[unknown])
-
     def matches(self, paths, song):
         """If the song is included in the selection defined by the paths.
 
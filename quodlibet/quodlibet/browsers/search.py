@@ -21,6 +21,8 @@ from quodlibet.qltk.songlist import SongList
 from quodlibet.qltk.searchbar import LimitSearchBarBox
 from quodlibet.qltk.x import Align, SymbolicIconImage
 from quodlibet.qltk import Icons
+from quodlibet.util import connect_destroy
+from quodlibet.util.library import QueryExecutor
 
 
 class PreferencesButton(Gtk.HBox):
@@ -45,6 +47,9 @@ class PreferencesButton(Gtk.HBox):
 class SearchBar(Browser):
     """Like EmptyBar, but the user can also enter a query manually"""
 
+    MAX_RESULTS = 8
+    """Number of recent search results to keep"""
+
     name = _("Search Library")
     accelerated_name = _("_Search Library")
     keys = ["SearchBar"]
@@ -67,6 +72,13 @@ class SearchBar(Browser):
 
         self._query = None
         self._library = library
+        # (key, query, songs) of recent searches, most recent last
+        self._results = []
+        # incremented on library changes, see __library_changed
+        self.__generation = 0
+        self._executor = QueryExecutor()
+        for sig in ["added", "removed", "changed"]:
+            connect_destroy(library, sig, self.__library_changed)
 
         completion = LibraryTagCompletion(library.librarian)
         self.accelerators = Gtk.AccelGroup()
@@ -95,25 +107,99 @@ class SearchBar(Browser):
         self._sb_box.set_text(text)
 
     def __destroy(self, *args):
+        self._executor.cancel()
         self._sb_box = None
 
     def __focus(self, widget, *args):
         qltk.get_top_parent(widget).songlist.grab_focus()
 
-    def _get_songs(self):
-        text = self._get_text()
+    def __library_changed(self, library, songs):
+        del self._results[:]
+        self.__generation += 1
+
+    def __store_result(self, query, songs):
+        if query.depends_on_time:
+            return
+        key = (query.string, tuple(query.star))
+        self._results.append((key, query, songs))
+        del self._results[:-self.MAX_RESULTS]
+
+    def __find_result(self, query):
+        """Returns a (songs, done) tuple. If done is True, songs is the
+        result, otherwise songs still need to be filtered using query.
+
+        If the query only narrows down a recent one (like "beat" ->
+        "beatl") only the songs of the recent result need filtering.
+        """
+
+        results = self._results
+        if not query.depends_on_time:
+            key = (query.string, tuple(query.star))
+            for i, (k, q, songs) in enumerate(results):
+                if k == key:
+                    results.append(results.pop(i))
+                    return list(songs), True
+
+            for k, q, songs in reversed(results):
+                if query.is_refinement_of(q):
+                    return songs, False
+
+        # only use the index if it's fast, the rest is left to the
+        # background filtering
+        library = self._library
+        if library.use_index and library.index.can_resolve(query):
+            songs = library.search(query)
+            self.__store_result(query, songs)
+            return list(songs), True
+
+        return library.values(), False
+
+    def _search(self, query):
+        """Returns the songs matching query, reusing recent results"""
+
+        songs, done = self.__find_result(query)
+        if not done:
+            songs = query.filter(songs)
+            self.__store_result(query, songs)
+        return list(songs)
+
+    def __parse_text(self):
         try:
-            self._query = Query(text, star=SongList.star)
+            self._query = Query(self._get_text(), star=SongList.star)
         except Query.error:
-            pass
-        else:
-            return self._query.filter(self._library)
+            return
+        return self._query
+
+    def _get_songs(self):
+        query = self.__parse_text()
+        if query is not None:
+            return self._search(query)
+
+    def __songs_found(self, songs):
+        songs = self._sb_box.limit(songs)
+        GLib.idle_add(self.songs_selected, songs)
 
     def activate(self):
-        songs = self._get_songs()
-        if songs is not None:
-            songs = self._sb_box.limit(songs)
-            GLib.idle_add(self.songs_selected, songs)
+        query = self.__parse_text()
+        if query is None:
+            return
+
+        songs, done = self.__find_result(query)
+        if done:
+            self._executor.cancel()
+            self.__songs_found(songs)
+            return
+
+        # filter in the background, so typing doesn't get blocked;
+        # a new search cancels the running one
+        generation = self.__generation
+
+        def finished(result):
+            if generation == self.__generation:
+                self.__store_result(query, result)
+            self.__songs_found(list(result))
+
+        self._executor.run(query, songs, finished, self.__songs_found)
 
     def __text_parse(self, bar, text):
         self.activate()
@@ -34,6 +34,19 @@ INITIAL = {
     "library": {
         "exclude": "",
         "refresh_on_start": "true",
+        # only write changed songs on save, see JournalingMixin
+        "journal": "false",
+        # evaluate queries using an inverted index, see QueryIndex
+        "query_index": "false",
+        # worker processes for reading tags of new files, 0 for none,
+        # -1 for one per CPU, see FileLibrary.scan
+        "scan_processes": "0",
+        # skip unchanged directories when refreshing, misses files
+        # modified in place, see FileLibrary.trust_dir_mtimes
+        "trust_dir_mtimes": "false",
+        # keep the human sort keys of tag values between sessions,
+        # see util.SortKeyCache
+        "persist_sort_keys": "false",
     },
     # State about the player, to restore on startup
     "memory": {
@@ -112,6 +125,10 @@ INITIAL = {
         # search as soon as text is typed into search box
         "eager_search": "true",
 
+        # don't create a GTK row for each song in the main song list,
+        # makes showing large amounts of songs faster, see LazyPlaylistModel
+        "lazy_song_list": "false",
+
         # tags which get searched in addition to the ones present in the
         # song list, separate with ","
         "search_tags": "",
@@ -153,6 +170,12 @@ INITIAL = {
         "prefer_embedded": "false",
         "force_filename": "false",
         "filename": "folder.jpg",
+        # memory used for keeping cover images around in MiB,
+        # see thumbnails.PixbufCache
+        "cache_size": "32",
+        # create missing cover thumbnails for all albums after scanning
+        # the library, see util.library.warm_cover_cache
+        "pregenerate": "false",
     }
 }
 
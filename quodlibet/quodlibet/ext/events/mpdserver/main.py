@@ -5,12 +5,21 @@
 # it under the terms of version 2 of the GNU General Public License as
 # published by the Free Software Foundation.
 
+import os
 import re
+import time
 import shlex
+import calendar
+from bisect import bisect_left
+from collections import deque
+from itertools import product
 
 from gi.repository import GObject
 
 from quodlibet import const
+from quodlibet.query import Query
+from quodlibet.util import re_escape
+from quodlibet.util.path import fsdecode
 from .tcpserver import BaseTCPServer, BaseTCPConnection
 
 
@@ -53,6 +62,19 @@ TAG_MAPPING = [
 ]
 
 
+TAGS = dict((k.lower(), (k, v)) for (k, v) in TAG_MAPPING if v)
+"""lower case MPD tag -> (MPD tag, QL tag)"""
+
+
+def song_to_uri(song):
+    """The MPD URI of a song, its path relative to the file system root"""
+
+    path = fsdecode(song("~filename"), note=False)
+    if os.sep != "/":
+        path = path.replace(os.sep, u"/")
+    return path.lstrip(u"/")
+
+
 def format_tags(song):
     """Gives a tag list message for a song"""
 
@@ -74,6 +96,271 @@ def format_tags(song):
     return u"\n".join(lines)
 
 
+def format_song(song):
+    """Gives a file + tag list message for a song"""
+
+    tags = format_tags(song)
+    uri = u"file: %s" % song_to_uri(song)
+    if tags:
+        return uri + u"\n" + tags
+    return uri
+
+
+def get_song_values(song, ql_key):
+    """All values of a QL tag as unicode, as used in MPD messages"""
+
+    if ql_key.startswith("~#"):
+        value = song(ql_key, None)
+        if value is None:
+            return []
+        return [unicode(value)]
+    return song.list(ql_key)
+
+
+class SongInfoCache(object):
+    """Caches format_song() results, entries of changed or removed songs
+    get dropped.
+
+    Entries are kept in two generations: once the newer one is full it
+    replaces the older one, so at most `max_size` entries are kept.
+    """
+
+    def __init__(self, library, max_size=20000):
+        self._library = library
+        self._max_gen = max(max_size // 2, 1)
+        self._new = {}
+        self._old = {}
+
+        def invalidate(library, songs):
+            for song in songs:
+                self._new.pop(song, None)
+                self._old.pop(song, None)
+
+        self._sigs = [
+            library.connect("removed", invalidate),
+            library.connect("changed", invalidate),
+        ]
+
+    def destroy(self):
+        for id_ in self._sigs:
+            self._library.disconnect(id_)
+        del self._library
+        self._new.clear()
+        self._old.clear()
+
+    def __call__(self, song):
+        try:
+            return self._new[song]
+        except KeyError:
+            info = self._old.pop(song, None)
+            if info is None:
+                info = format_song(song)
+            if len(self._new) >= self._max_gen:
+                self._old = self._new
+                self._new = {}
+            self._new[song] = info
+            return info
+
+
+class URIIndex(object):
+    """Sorted MPD URIs of all songs in a library, for looking up
+    directories and files.
+
+    Gets rebuilt on demand if songs were added, removed or renamed.
+    """
+
+    def __init__(self, library):
+        self._library = library
+        self._song_uris = None
+        self._uris = []
+        self._songs = []
+
+        def invalidate(*args):
+            self._song_uris = None
+
+        def changed(library, songs):
+            uris = self._song_uris
+            if uris is not None:
+                for song in songs:
+                    if uris.get(song) != song_to_uri(song):
+                        invalidate()
+                        break
+
+        self._sigs = [
+            library.connect("added", invalidate),
+            library.connect("removed", invalidate),
+            library.connect("changed", changed),
+        ]
+
+    def destroy(self):
+        for id_ in self._sigs:
+            self._library.disconnect(id_)
+        del self._library
+
+    def _get_lists(self):
+        if self._song_uris is None:
+            song_uris = dict((s, song_to_uri(s)) for s in self._library)
+            pairs = sorted(song_uris.iteritems(), key=lambda i: i[1])
+            self._songs = [p[0] for p in pairs]
+            self._uris = [p[1] for p in pairs]
+            self._song_uris = song_uris
+        return self._uris, self._songs
+
+    def _get_dir_range(self, uris, uri):
+        uri = uri.strip(u"/")
+        if not uri:
+            return u"", 0, len(uris)
+        prefix = uri + u"/"
+        # "dir0" sorts right after everything starting with "dir/"
+        return (prefix, bisect_left(uris, prefix),
+                bisect_left(uris, uri + u"0"))
+
+    def get_songs(self, uri):
+        """Returns the songs for a file or directory URI in URI order"""
+
+        uris, songs = self._get_lists()
+
+        start = end = bisect_left(uris, uri)
+        while end < len(uris) and uris[end] == uri:
+            end += 1
+        if start != end:
+            return songs[start:end]
+
+        prefix, start, end = self._get_dir_range(uris, uri)
+        return songs[start:end]
+
+    def is_dir(self, uri):
+        uris, songs = self._get_lists()
+        prefix, start, end = self._get_dir_range(uris, uri)
+        return not prefix or start != end
+
+    def iter_entries(self, uri):
+        """Yields (URI, None) for sub directories and (URI, song) for
+        files in the directory.
+        """
+
+        uris, songs = self._get_lists()
+        prefix, i, end = self._get_dir_range(uris, uri)
+        while i < end:
+            rest = uris[i][len(prefix):]
+            if u"/" in rest:
+                sub_uri = prefix + rest.split(u"/", 1)[0]
+                yield sub_uri, None
+                # skip everything in the sub directory
+                i = bisect_left(uris, sub_uri + u"0", i, end)
+            else:
+                yield uris[i], songs[i]
+                i += 1
+
+    def iter_tree(self, uri):
+        """Yields (URI, None) for all directories and (URI, song) for all
+        files below the directory, recursively.
+        """
+
+        uris, songs = self._get_lists()
+        prefix, start, end = self._get_dir_range(uris, uri)
+        last = []
+        for i in xrange(start, end):
+            parts = uris[i][len(prefix):].split(u"/")[:-1]
+            common = 0
+            while common < min(len(parts), len(last)) and \
+                    parts[common] == last[common]:
+                common += 1
+            for j in xrange(common, len(parts)):
+                yield prefix + u"/".join(parts[:j + 1]), None
+            last = parts
+            yield uris[i], songs[i]
+
+
+class LibraryStats(object):
+    """The total length and the newest added time of all songs in a
+    library, kept up to date so they don't need a pass over all songs.
+
+    Starts tracking with the first request.
+    """
+
+    def __init__(self, library):
+        self._library = library
+        # song -> (length, added), None until first needed
+        self._songs = None
+        self._playtime = 0
+        # None if it has to be looked up again
+        self._last_added = 0
+
+        def added(library, songs):
+            if self._songs is not None:
+                self._update(songs)
+
+        def removed(library, songs):
+            if self._songs is not None:
+                self._remove(songs)
+
+        def changed(library, songs):
+            if self._songs is not None:
+                self._update([s for s in songs if s in self._songs])
+
+        self._sigs = [
+            library.connect("added", added),
+            library.connect("removed", removed),
+            library.connect("changed", changed),
+        ]
+
+    def destroy(self):
+        for id_ in self._sigs:
+            self._library.disconnect(id_)
+        del self._library
+        self._songs = None
+
+    def _update(self, songs):
+        stored = self._songs
+        for song in songs:
+            length = song("~#length", 0)
+            added = song("~#added", 0)
+            old_length, old_added = stored.get(song, (0, 0))
+            stored[song] = (length, added)
+            self._playtime += length - old_length
+            if self._last_added is not None:
+                if added >= self._last_added:
+                    self._last_added = added
+                elif old_added == self._last_added:
+                    # the newest one got older
+                    self._last_added = None
+
+    def _remove(self, songs):
+        stored = self._songs
+        for song in songs:
+            if song not in stored:
+                continue
+            length, added = stored.pop(song)
+            self._playtime -= length
+            if added == self._last_added:
+                self._last_added = None
+
+    def _get_songs(self):
+        if self._songs is None:
+            self._songs = {}
+            self._playtime = 0
+            self._last_added = 0
+            self._update(self._library)
+        return self._songs
+
+    @property
+    def playtime(self):
+        """The sum of the length of all songs"""
+
+        self._get_songs()
+        return self._playtime
+
+    @property
+    def last_added(self):
+        """The newest added time of all songs or 0"""
+
+        songs = self._get_songs()
+        if self._last_added is None:
+            self._last_added = max([a for l, a in songs.itervalues()] or [0])
+        return self._last_added
+
+
 class ParseError(Exception):
     pass
 
@@ -182,6 +469,14 @@ class MPDService(object):
         self._connections = set()
         self._idle_subscriptions = {}
         self._pl_ver = 0
+        self._start_time = time.time()
+        self._uris = URIIndex(app.library)
+        self._format_song = SongInfoCache(app.library)
+        self._stats = LibraryStats(app.library)
+
+        # seconds played while the service exists
+        self._playtime = 0
+        self._play_start = None
 
         self._options = PlayerOptions(app)
 
@@ -201,6 +496,7 @@ class MPDService(object):
         self._player_sigs.append(id_)
 
         def player_changed(*args):
+            self._update_playtime()
             self.emit_changed("player")
 
         id_ = app.player.connect("paused", player_changed)
@@ -211,6 +507,7 @@ class MPDService(object):
         self._player_sigs.append(id_)
 
         def playlist_changed(*args):
+            self._update_playtime()
             self._pl_ver += 1
             self.emit_changed("playlist")
 
@@ -223,12 +520,27 @@ class MPDService(object):
         # this should work
         return (id(info) & 0xFFFFFFFF) >> 1
 
+    def _update_playtime(self):
+        now = time.time()
+        if self._play_start is not None:
+            self._playtime += now - self._play_start
+            self._play_start = None
+        player = self._app.player
+        if player.info is not None and not player.paused:
+            self._play_start = now
+
     def destroy(self):
         for id_ in self._player_sigs:
             self._app.player.disconnect(id_)
         self._options.destroy()
+        self._uris.destroy()
+        self._format_song.destroy()
+        self._stats.destroy()
         del self._app
         del self._options
+        del self._uris
+        del self._format_song
+        del self._stats
 
     def add_connection(self, connection):
         self._connections.add(connection)
@@ -311,19 +623,222 @@ class MPDService(object):
         self._options.set_single(value)
 
     def stats(self):
-        has_song = int(bool(self._app.player.info))
+        library = self._app.library
+        vocabulary = library.vocabulary
+
+        self._update_playtime()
         stats = [
-            ("artists", has_song),
-            ("albums", has_song),
-            ("songs", has_song),
-            ("uptime", 1),
-            ("playtime", 1),
-            ("db_playtime", 1),
-            ("db_update", 1252868674),
+            ("artists", vocabulary.count_values("artist")),
+            ("albums", vocabulary.count_values("album")),
+            ("songs", len(library)),
+            ("uptime", int(time.time() - self._start_time)),
+            ("playtime", int(self._playtime)),
+            ("db_playtime", int(self._stats.playtime)),
+            ("db_update", int(self._stats.last_added)),
         ]
 
         return stats
 
+    def _get_tag(self, mpd_key):
+        """Returns (MPD tag, QL tag) or raises MPDRequestError"""
+
+        try:
+            return TAGS[mpd_key.lower()]
+        except KeyError:
+            raise MPDRequestError(
+                u"Unknown tag type: %s" % mpd_key, AckError.ARG)
+
+    def _get_filter_part(self, type_, value, exact):
+        """Returns a query string for one filter"""
+
+        if type_ == u"any":
+            keys = [v for (k, v) in TAGS.values() if not v.startswith("~#")]
+        else:
+            keys = [self._get_tag(type_)[1]]
+
+        if keys[0].startswith("~#"):
+            try:
+                number = int(value)
+            except ValueError:
+                raise MPDRequestError(u"Number expected", AckError.ARG)
+            return u"#(%s = %d)" % (keys[0][2:], number)
+
+        if exact:
+            value = u'"%s"c' % value.replace(
+                u"\\", u"\\\\").replace(u'"', u'\\"')
+        else:
+            value = u"/%s/" % re_escape(value)
+        return u"%s=%s" % (u",".join(sorted(keys)), value)
+
+    def find(self, filters, exact=True):
+        """Returns all songs matching a list of (type, value) filters,
+        sorted by URI.
+
+        exact -- if values need to match exactly and case sensitive
+                 (find) or only partially and case insensitive (search)
+        """
+
+        songs = None
+        parts = []
+        checks = []
+        for type_, value in filters:
+            if type_ == u"base":
+                if not self._uris.is_dir(value):
+                    raise MPDRequestError(
+                        u"No such directory", AckError.NO_EXIST)
+                songs = self._uris.get_songs(value)
+            elif type_ == u"file":
+                if exact:
+                    checks.append(lambda s, v=value: song_to_uri(s) == v)
+                else:
+                    checks.append(lambda s, v=value.lower():
+                                  v in song_to_uri(s).lower())
+            elif type_ == u"modified-since":
+                parts.append(u"#(mtime > %d)" % _parse_time(value))
+            else:
+                parts.append(self._get_filter_part(type_, value, exact))
+
+        if parts:
+            try:
+                query = Query(u"&(%s)" % u", ".join(parts))
+            except Query.error:
+                raise MPDRequestError(u"Invalid filter", AckError.ARG)
+            if songs is None:
+                songs = self._app.library.search(query)
+            else:
+                songs = query.filter(songs)
+        elif songs is None:
+            songs = self._app.library.values()
+
+        for check in checks:
+            songs = filter(check, songs)
+
+        return sorted(songs, key=song_to_uri)
+
+    def songs_info(self, songs):
+        """Yields the file + tag messages for songs"""
+
+        for song in songs:
+            yield self._format_song(song)
+
+    def list(self, mpd_key, filters, groups):
+        """Returns an iterable of all values of a tag for the songs matching
+        the filters, grouped by the values of the `groups` tags.
+        """
+
+        name, ql_key = self._get_tag(mpd_key)
+        groups = [self._get_tag(g) for g in groups]
+
+        if not filters and not groups and not ql_key.startswith("~#"):
+            values = self._app.library.vocabulary.values(ql_key)
+            return (u"%s: %s" % (name, value) for value in values)
+
+        if filters:
+            songs = self.find(filters)
+        else:
+            songs = self._app.library.values()
+
+        def lines():
+            result = {}
+            for song in songs:
+                values = get_song_values(song, ql_key)
+                if not values:
+                    continue
+                group_values = [get_song_values(song, g[1]) or [u""]
+                                for g in groups]
+                for key in product(*group_values):
+                    result.setdefault(key, set()).update(values)
+
+            last = None
+            for key in sorted(result):
+                for i, (group_name, ql_group) in enumerate(groups):
+                    if last is None or last[:i + 1] != key[:i + 1]:
+                        yield u"%s: %s" % (group_name, key[i])
+                last = key
+                for value in sorted(result[key]):
+                    yield u"%s: %s" % (name, value)
+        return lines()
+
+    def count(self, filters, group=None):
+        """Returns an iterable of the number of songs and their total length
+        for the songs matching the filters, per value of `group` if given.
+        """
+
+        if filters:
+            songs = self.find(filters)
+        else:
+            songs = self._app.library.values()
+
+        if group is None:
+            return [
+                u"songs: %d" % len(songs),
+                u"playtime: %d" % sum(s("~#length", 0) for s in songs),
+            ]
+
+        name, ql_key = self._get_tag(group)
+
+        def lines():
+            result = {}
+            for song in songs:
+                for value in get_song_values(song, ql_key) or [u""]:
+                    count, length = result.get(value, (0, 0))
+                    result[value] = (count + 1, length + song("~#length", 0))
+
+            for value, (count, length) in sorted(result.iteritems()):
+                yield u"%s: %s" % (name, value)
+                yield u"songs: %d" % count
+                yield u"playtime: %d" % length
+        return lines()
+
+    def get_songs(self, uri):
+        """Returns all songs for a file or directory URI"""
+
+        songs = self._uris.get_songs(uri)
+        if not songs and not self._uris.is_dir(uri):
+            raise MPDRequestError(u"No such song", AckError.NO_EXIST)
+        return songs
+
+    def lsinfo(self, uri):
+        """Yields the content of a directory"""
+
+        if not self._uris.is_dir(uri):
+            songs = self.get_songs(uri)
+            return self.songs_info(songs)
+
+        def lines():
+            for sub_uri, song in self._uris.iter_entries(uri):
+                if song is None:
+                    yield u"directory: %s" % sub_uri
+                else:
+                    yield self._format_song(song)
+        return lines()
+
+    def listall(self, uri, info):
+        """Yields all directories and files below a directory"""
+
+        if not self._uris.is_dir(uri):
+            songs = self.get_songs(uri)
+            if info:
+                return self.songs_info(songs)
+            return (u"file: %s" % song_to_uri(s) for s in songs)
+
+        def lines():
+            for sub_uri, song in self._uris.iter_tree(uri):
+                if song is None:
+                    yield u"directory: %s" % sub_uri
+                elif info:
+                    yield self._format_song(song)
+                else:
+                    yield u"file: %s" % sub_uri
+        return lines()
+
+    def add(self, songs):
+        """Adds songs to the queue"""
+
+        songs = [s for s in songs if s.can_add]
+        if songs:
+            self._app.window.playlist.enqueue(songs)
+
     def status(self):
         app = self._app
         info = app.player.info
@@ -372,34 +887,47 @@ class MPDService(object):
             return None
 
         parts = []
-        parts.append(u"file: %s" % info("~filename"))
-        parts.append(format_tags(info))
+        parts.append(self._format_song(info))
         parts.append(u"Pos: %d" % 0)
         parts.append(u"Id: %d" % self._get_id(info))
 
         return u"\n".join(parts)
 
+    def _get_playlist(self):
+        """Returns the playlist entries. Not lazy, so they match the
+        playlist version at the time of the request.
+        """
+
+        song = self.currentsong()
+        if song is not None:
+            return [song]
+        return []
+
     def playlistinfo(self, start=None, end=None):
+        """Returns a list of playlist entries"""
+
         if start is not None and start > 1:
-            return None
+            return []
 
-        return self.currentsong()
+        return self._get_playlist()
 
     def playlistid(self, songid=None):
-        return self.currentsong()
+        return self._get_playlist()
 
     def plchanges(self, version):
         if version != self._pl_ver:
-            return self.currentsong()
+            return self._get_playlist()
+        return []
 
     def plchangesposid(self, version):
         info = self._app.player.info
         if version != self._pl_ver and info:
             parts = []
-            parts.append(u"file: %s" % info("~filename"))
+            parts.append(u"file: %s" % song_to_uri(info))
             parts.append(u"Pos: %d" % 0)
             parts.append(u"Id: %d" % self._get_id(info))
-            return u"\n".join(parts)
+            return [u"\n".join(parts)]
+        return []
 
 
 class MPDServer(BaseTCPServer):
@@ -440,6 +968,8 @@ class MPDConnection(BaseTCPConnection):
 
         str_version = ".".join(map(str, service.version))
         self._buf = bytearray("OK MPD %s\n" % str_version)
+        # line iterators, written after _buf
+        self._pending = deque()
         self._read_buf = bytearray()
 
         # begin - command processing state
@@ -476,13 +1006,25 @@ class MPDConnection(BaseTCPConnection):
                 self._use_command_list = False
                 del self._command_list[:]
 
+    WRITE_CHUNK_SIZE = 64 * 1024
+    """Pending line iterators get consumed up to this many bytes
+    per handle_write()"""
+
     def handle_write(self):
-        data = self._buf[:]
-        del self._buf[:]
+        data = self._buf
+        pending = self._pending
+        while pending and len(data) < self.WRITE_CHUNK_SIZE:
+            try:
+                line = next(pending[0])
+            except StopIteration:
+                pending.popleft()
+                continue
+            data.extend(line.encode("utf-8", errors="replace") + "\n")
+        self._buf = bytearray()
         return data
 
     def can_write(self):
-        return bool(self._buf)
+        return bool(self._buf or self._pending)
 
     def handle_close(self):
         self.log("connection closed")
@@ -517,7 +1059,17 @@ class MPDConnection(BaseTCPConnection):
 
         assert isinstance(line, unicode)
 
-        self._buf.extend(line.encode("utf-8", errors="replace") + "\n")
+        if self._pending:
+            self._pending.append(iter([line]))
+        else:
+            self._buf.extend(line.encode("utf-8", errors="replace") + "\n")
+
+    def write_lines(self, lines):
+        """Writes lines to the client. The iterable only gets consumed
+        once the client can receive more data.
+        """
+
+        self._pending.append(iter(lines))
 
     def ok(self):
         self.write_line(u"OK")
@@ -632,6 +1184,28 @@ def _parse_bool(arg):
         return bool(value)
 
 
+def _parse_filters(args):
+    """Parses TYPE VALUE pairs, returns a list of (type, value)"""
+
+    if len(args) % 2:
+        raise MPDRequestError(u"Incorrect arguments", AckError.ARG)
+    return [(args[i].lower(), args[i + 1]) for i in xrange(0, len(args), 2)]
+
+
+def _parse_time(arg):
+    """Parses a unix timestamp or an ISO 8601 UTC time"""
+
+    try:
+        return int(arg)
+    except ValueError:
+        pass
+
+    try:
+        return calendar.timegm(time.strptime(arg, "%Y-%m-%dT%H:%M:%SZ"))
+    except ValueError:
+        raise MPDRequestError(u"Invalid time", AckError.ARG)
+
+
 def _parse_range(arg):
     try:
         values = [int(v) for v in arg.split(":")]
@@ -753,31 +1327,92 @@ def _cmd_currentsong(conn, service, args):
 
 @MPDConnection.Command("count")
 def _cmd_count(conn, service, args):
-    conn.write_line(u"songs: 0")
-    conn.write_line(u"playtime: 0")
+    group = None
+    if len(args) >= 2 and args[-2].lower() == u"group":
+        group = args[-1]
+        args = args[:-2]
+    filters = _parse_filters(args)
+    conn.write_lines(service.count(filters, group))
+
+
+def _find_songs(service, args, exact):
+    _verify_length(args, 2)
+    return service.find(_parse_filters(args), exact)
+
+
+@MPDConnection.Command("find")
+def _cmd_find(conn, service, args):
+    songs = _find_songs(service, args, True)
+    conn.write_lines(service.songs_info(songs))
+
+
+@MPDConnection.Command("search")
+def _cmd_search(conn, service, args):
+    songs = _find_songs(service, args, False)
+    conn.write_lines(service.songs_info(songs))
+
+
+@MPDConnection.Command("findadd")
+def _cmd_findadd(conn, service, args):
+    service.add(_find_songs(service, args, True))
+
+
+@MPDConnection.Command("searchadd")
+def _cmd_searchadd(conn, service, args):
+    service.add(_find_songs(service, args, False))
+
+
+@MPDConnection.Command("list")
+def _cmd_list(conn, service, args):
+    _verify_length(args, 1)
+    tag, args = args[0], args[1:]
+
+    groups = []
+    while len(args) >= 2 and args[-2].lower() == u"group":
+        groups.insert(0, args[-1])
+        args = args[:-2]
+
+    if len(args) == 1:
+        # "list album ARTIST"
+        if tag.lower() != u"album":
+            raise MPDRequestError(
+                u"should be \"Album\" for 3 arguments", AckError.ARG)
+        args = [u"artist", args[0]]
+
+    filters = _parse_filters(args)
+    conn.write_lines(service.list(tag, filters, groups))
+
+
+@MPDConnection.Command("add")
+def _cmd_add(conn, service, args):
+    _verify_length(args, 1)
+    service.add(service.get_songs(args[0]))
 
 
 @MPDConnection.Command("plchanges")
 def _cmd_plchanges(conn, service, args):
     _verify_length(args, 1)
     version = _parse_int(args[0])
-    changes = service.plchanges(version)
-    if changes is not None:
-        conn.write_line(changes)
+    conn.write_lines(service.plchanges(version))
 
 
 @MPDConnection.Command("plchangesposid")
 def _cmd_plchangesposid(conn, service, args):
     _verify_length(args, 1)
     version = _parse_int(args[0])
-    changes = service.plchangesposid(version)
-    if changes is not None:
-        conn.write_line(changes)
+    conn.write_lines(service.plchangesposid(version))
+
+
+@MPDConnection.Command("listall")
+def _cmd_listall(conn, service, args):
+    uri = args[0] if args else u""
+    conn.write_lines(service.listall(uri, False))
 
 
 @MPDConnection.Command("listallinfo")
-def _cmd_listallinfo(*args):
-    _cmd_currentsong(*args)
+def _cmd_listallinfo(conn, service, args):
+    uri = args[0] if args else u""
+    conn.write_lines(service.listall(uri, True))
 
 
 @MPDConnection.Command("seek")
@@ -835,7 +1470,8 @@ def _cmd_tagtypes(conn, service, args):
 
 @MPDConnection.Command("lsinfo")
 def _cmd_lsinfo(conn, service, args):
-    _verify_length(args, 1)
+    uri = args[0] if args else u""
+    conn.write_lines(service.lsinfo(uri))
 
 
 @MPDConnection.Command("playlistinfo")
@@ -846,8 +1482,7 @@ def _cmd_playlistinfo(conn, service, args):
         result = service.playlistinfo(start, end)
     else:
         result = service.playlistinfo()
-    if result is not None:
-        conn.write_line(result)
+    conn.write_lines(result)
 
 
 @MPDConnection.Command("playlistid")
@@ -856,6 +1491,4 @@ def _cmd_playlistid(conn, service, args):
         songid = _parse_int(args[0])
     else:
         songid = None
-    result = service.playlistid(songid)
-    if result is not None:
-        conn.write_line(result)
+    conn.write_lines(service.playlistid(songid))
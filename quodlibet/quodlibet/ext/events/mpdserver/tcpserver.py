@@ -197,7 +197,9 @@ class BaseTCPConnection(object):
                 return False
 
             if flags & GLib.IOCondition.OUT:
-                if self.can_write():
+                # only ask for new data once everything is sent, so the
+                # data gets produced as fast as the client can receive it
+                if not write_buffer and self.can_write():
                     write_buffer.extend(self.handle_write())
                 if not write_buffer:
                     self._out_id = None
@@ -51,6 +51,29 @@ class RandomAlbum(EventPlugin):
         delay = config.getint("plugins", "randomalbum_delay", 0)
         self.delay = delay
 
+    _cache = None
+    """album -> list of the album's values for `keys`, kept while enabled"""
+
+    def enabled(self):
+        self._cache = {}
+
+        def invalidate(library, albums):
+            for album in albums:
+                self._cache.pop(album, None)
+
+        self._albums = albums = app.library.albums
+        self._sigs = [
+            albums.connect("changed", invalidate),
+            albums.connect("removed", invalidate),
+        ]
+
+    def disabled(self):
+        for sig in self._sigs:
+            self._albums.disconnect(sig)
+        del self._sigs
+        del self._albums
+        self._cache = None
+
     def PluginPreferences(self, song):
         def changed_cb(hscale, key):
             val = hscale.get_value()
@@ -141,21 +164,30 @@ class RandomAlbum(EventPlugin):
         # Rank ordering is more resistant to clustering than weighting
         # based on normalized means, and also normalizes the scale of each
         # weight slider in the prefs pane.
-        ranked = {}
-        for (tag, text, func) in self.keys:
-            tag_key = ("~#%s:%s" % (tag, func) if func
-                       else "~#%s" % tag)
-            ranked[tag] = sorted(albums,
-                                 key=lambda al: al.get(tag_key))
-
-        scores = {}
-        for album in albums:
-            scores[album] = 0
-            for (tag, text, func) in self.keys:
-                rank = ranked[tag].index(album)
-                scores[album] += rank * self.weights[tag]
+        tag_keys = [("~#%s:%s" % (tag, func) if func else "~#%s" % tag)
+                    for (tag, text, func) in self.keys]
 
-        return [(score, name) for name, score in scores.items()]
+        cache = self._cache if self._cache is not None else {}
+        values = []
+        for album in albums:
+            album_values = cache.get(album)
+            if album_values is None:
+                album_values = [album.get(key) for key in tag_keys]
+                cache[album] = album_values
+            values.append(album_values)
+
+        # sort once per key and add up the weighted positions
+        scores = [0] * len(albums)
+        indices = range(len(albums))
+        for i, (tag, text, func) in enumerate(self.keys):
+            weight = self.weights[tag]
+            if not weight:
+                continue
+            ranked = sorted(indices, key=lambda j: values[j][i])
+            for rank, j in enumerate(ranked):
+                scores[j] += rank * weight
+
+        return zip(scores, albums)
 
     def plugin_on_song_started(self, song):
         if (song is None and config.get("memory", "order") != "onesong" and
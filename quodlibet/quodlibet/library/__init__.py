@@ -18,21 +18,28 @@ import time
 from quodlibet import print_d
 import quodlibet.formats as formats
 
-from quodlibet.library.libraries import SongFileLibrary, SongLibrary
+from quodlibet.library.libraries import SongFileLibrary, SongLibrary, \
+    JournalingSongFileLibrary
 from quodlibet.library.librarians import SongLibrarian
 from quodlibet.util.path import mtime
 
 
-def init(cache_fn=None):
+def init(cache_fn=None, journal=False):
     """Set up the library and return the main one.
 
     Return a main library, and set a librarian for
     all future SongLibraries.
+
+    If `journal` is True, only changes get written on save
+    (see JournalingSongFileLibrary).
     """
     s = ", ".join(formats.modules)
     print_d("Supported formats: %s" % s)
     SongFileLibrary.librarian = SongLibrary.librarian = SongLibrarian()
-    library = SongFileLibrary("main")
+    if journal:
+        library = JournalingSongFileLibrary("main")
+    else:
+        library = SongFileLibrary("main")
     if cache_fn:
         library.load(cache_fn)
     return library
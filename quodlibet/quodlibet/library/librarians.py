@@ -140,11 +140,18 @@ class SongLibrarian(Librarian):
     """A librarian for SongLibraries."""
 
     def tag_values(self, tag):
-        """Return a list of all values for the given tag."""
+        """Return a sorted list of all values for the given tag."""
         tags = set()
         for library in self.libraries.itervalues():
             tags.update(library.tag_values(tag))
-        return list(tags)
+        return sorted(tags)
+
+    def tag_names(self):
+        """Return a sorted list of all keys set in any song."""
+        tags = set()
+        for library in self.libraries.itervalues():
+            tags.update(library.tag_names())
+        return sorted(tags)
 
     def rename(self, song, newname, changed=None):
         """Rename the song in all libraries it belongs to.
@@ -16,14 +16,19 @@ least useful but most content-agnostic.
 from pickle import Unpickler
 from cStringIO import StringIO
 import cPickle as pickle
+import collections
+import mmap
+import multiprocessing
 import os
 import shutil
 import time
+from bisect import bisect_left
+from multiprocessing.pool import ThreadPool
 
 from gi.repository import GObject
 
 from quodlibet.formats import MusicFile
-from quodlibet.query import Query
+from quodlibet.query import Query, QueryIndex
 from quodlibet.qltk.notif import Task
 from quodlibet.util.collection import Album
 from quodlibet.util.collections import DictMixin
@@ -32,7 +37,7 @@ from quodlibet import const
 from quodlibet import formats
 from quodlibet.util.dprint import print_d, print_w
 from quodlibet.util.path import fsdecode, expanduser, unexpand, mkdir, \
-    normalize_path
+    normalize_path, mtime
 
 
 class Library(GObject.GObject, DictMixin):
@@ -339,6 +344,223 @@ class PicklingLibrary(Library, PicklingMixin):
         Library.__init__(self, name)
 
 
+def load_items_mapped(filename, default=None):
+    """Like load_items(), but unpickles from a read only memory mapping of
+    the file instead of reading it into a string first. The mapped pages
+    are backed by the file, so no copy of the whole file has to be kept in
+    memory while the items get created, and it's still one bulk read.
+
+    Falls back to load_items() in case of an error, which also handles
+    recovery.
+    """
+
+    try:
+        with open(filename, "rb") as fp:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (EnvironmentError, ValueError):
+        # ValueError: empty file
+        return load_items(filename, default)
+
+    try:
+        # cStringIO uses the mapped buffer directly
+        return pickle.load(StringIO(data))
+    except Exception:
+        return load_items(filename, default)
+    finally:
+        data.close()
+
+
+def append_journal(filename, removed, items):
+    """Append one record to a journal file.
+
+    Doesn't handle exceptions.
+    """
+
+    dirname = os.path.dirname(filename)
+    mkdir(dirname)
+
+    with open(filename, "ab") as fileobj:
+        # protocol 1, see dump_items()
+        pickle.dump((removed, items), fileobj, 1)
+        fileobj.flush()
+        os.fsync(fileobj.fileno())
+
+
+def replay_journal(filename, contents):
+    """Apply all records of a journal file to the `contents` dict
+    (key -> item).
+
+    Returns a tuple of the number of entries (removed keys and items)
+    applied and whether the whole journal could be replayed. A broken
+    record (e.g. a partly written one) stops the replay.
+    """
+
+    try:
+        fp = open(filename, "rb")
+    except EnvironmentError:
+        return 0, True
+
+    count = 0
+    complete = True
+    with fp:
+        unpickler = pickle.Unpickler(fp)
+        while 1:
+            try:
+                removed, items = unpickler.load()
+            except EOFError:
+                break
+            except Exception:
+                util.print_exc()
+                print_w("Stopped replaying broken journal: %r" % filename)
+                complete = False
+                break
+
+            for key in removed:
+                contents.pop(key, None)
+            for item in items:
+                contents[item.key] = item
+            count += len(removed) + len(items)
+
+    return count, complete
+
+
+class JournalingMixin(PicklingMixin):
+    """A mixin to provide persistence of a library by pickling to disk,
+    writing only the changes since the last save.
+
+    Changed, added and removed items get appended to a journal file next
+    to the main one. Once the journal has grown too large compared to the
+    library it gets merged back into the main file.
+
+    The main file is the same as the one written by PicklingMixin, so
+    an existing one gets picked up as is.
+    """
+
+    JOURNAL_SUFFIX = ".journal"
+
+    COMPACT_MIN = 1000
+    """Minimum number of journal entries before compacting"""
+
+    COMPACT_RATIO = 0.5
+    """Compact if the journal has more entries than this fraction
+    of the library size"""
+
+    _journal_sig = None
+
+    _journal_broken = False
+    """If the journal contains a broken record. Records appended after it
+    would never get replayed, so the next save has to compact"""
+
+    @property
+    def journal_filename(self):
+        if self.filename is None:
+            return None
+        return self.filename + self.JOURNAL_SUFFIX
+
+    def load(self, filename):
+        """Load a library from a file and replay its journal.
+
+        Loading does not cause added, changed, or removed signals.
+        """
+
+        self.filename = filename
+        print_d("Loading contents of %r." % filename, self)
+
+        contents = {}
+        for item in load_items_mapped(filename):
+            contents[item.key] = item
+        self._journal_count, complete = replay_journal(
+            self.journal_filename, contents)
+        self._journal_broken = not complete
+
+        self._load_init(contents.itervalues())
+
+        # what is on disk right now, to compute the difference on save
+        self._journal_saved = contents
+        self._journal_changed = set()
+        if self._journal_sig is None:
+            self._journal_sig = self.connect(
+                'changed', self.__journal_item_changed)
+
+        print_d("Done loading contents of %r (%d journal entries)." % (
+            filename, self._journal_count), self)
+
+    def __journal_item_changed(self, library, items):
+        self._journal_changed.update(items)
+
+    def _need_compact(self, size, pending):
+        if self._journal_broken:
+            return True
+        limit = max(self.COMPACT_MIN, int(size * self.COMPACT_RATIO))
+        return self._journal_count + pending > limit
+
+    def __remove_journal(self):
+        """Removes the journal or empties it if that fails.
+
+        Raises EnvironmentError if neither works.
+        """
+
+        try:
+            os.remove(self.journal_filename)
+        except EnvironmentError:
+            if os.path.exists(self.journal_filename):
+                # replaying an outdated journal on top of the compacted
+                # file would revert changes, so this has to succeed
+                with open(self.journal_filename, "wb"):
+                    pass
+
+    def save(self, filename=None):
+        """Save the library to the given filename, or the default if `None`.
+
+        Only appends to the journal if the library was loaded from
+        the same file.
+        """
+
+        if filename is None:
+            filename = self.filename
+
+        if self._journal_sig is None or filename != self.filename:
+            PicklingMixin.save(self, filename)
+            return
+
+        current = {}
+        for item in self.get_content():
+            current[item.key] = item
+
+        saved = self._journal_saved
+        removed = [k for k in saved if k not in current]
+        changed = self._journal_changed
+        items = [i for k, i in current.iteritems()
+                 if saved.get(k) is not i or i in changed]
+
+        try:
+            if self._need_compact(len(current), len(removed) + len(items)):
+                print_d("Compacting journal into %r." % filename, self)
+                dump_items(filename, current.values())
+                self.__remove_journal()
+                self._journal_count = 0
+                self._journal_broken = False
+            elif removed or items:
+                print_d("Journaling %d removed, %d changed items to %r." % (
+                    len(removed), len(items), self.journal_filename), self)
+                append_journal(self.journal_filename, removed, items)
+                self._journal_count += len(removed) + len(items)
+        except EnvironmentError:
+            print_w("Couldn't save library to path: %r" % filename)
+        else:
+            self._journal_saved = current
+            self._journal_changed = set()
+            self.dirty = False
+
+
+class JournalingLibrary(Library, JournalingMixin):
+    """A library that journals changes of its contents to disk"""
+    def __init__(self, name=None):
+        print_d("Using journaling persistence for library \"%s\"" % name)
+        JournalingMixin.__init__(self)
+        Library.__init__(self, name)
+
+
 class AlbumLibrary(Library):
     """An AlbumLibrary listens to a SongLibrary and sorts its songs into
     albums.
@@ -355,6 +577,8 @@ class AlbumLibrary(Library):
             "AlbumLibrary for %s" % library._name)
 
         self._library = library
+        # song -> album containing it
+        self._albums = {}
         self._asig = library.connect('added', self.__added)
         self._rsig = library.connect('removed', self.__removed)
         self._csig = library.connect('changed', self.__changed)
@@ -381,12 +605,14 @@ class AlbumLibrary(Library):
         for song in items:
             key = song.album_key
             if key in self._contents:
-                changed.add(self._contents[key])
+                album = self._contents[key]
+                changed.add(album)
             else:
                 album = Album(song)
                 self._contents[key] = album
                 new.add(album)
-            self._contents[key].songs.add(song)
+            album.songs.add(song)
+            self._albums[song] = album
 
         changed -= new
         return changed, new
@@ -407,13 +633,12 @@ class AlbumLibrary(Library):
         changed = set()
         removed = set()
         for song in items:
-            key = song.album_key
-            album = self._contents[key]
+            album = self._albums.pop(song)
             album.songs.remove(song)
             changed.add(album)
             if not album.songs:
                 removed.add(album)
-                del self._contents[key]
+                del self._contents[album.key]
 
         changed -= removed
 
@@ -426,37 +651,37 @@ class AlbumLibrary(Library):
             self.emit('changed', changed)
 
     def __changed(self, library, items):
-        """Album keys could change between already existing ones.. so we
-        have to do it the hard way and search by id."""
+        """Album keys could change between already existing ones, so
+        move songs using the song -> album map."""
         print_d("Updating affected albums for %d items" % len(items))
         changed = set()
         removed = set()
         to_add = []
         for song in items:
-            # in case the key hasn't changed
-            key = song.album_key
-            if key in self._contents and song in self._contents[key].songs:
-                changed.add(self._contents[key])
-            else:  # key changed.. look for it in each album
+            album = self._albums.get(song)
+            if album is None:
+                to_add.append(song)
+            elif album.key == song.album_key:
+                # in case the key hasn't changed
+                changed.add(album)
+            else:
+                del self._albums[song]
                 to_add.append(song)
-                for key, album in self._contents.iteritems():
-                    if song in album.songs:
-                        album.songs.remove(song)
-                        if not album.songs:
-                            removed.add(album)
-                        else:
-                            changed.add(album)
-                        break
+                album.songs.remove(song)
+                if not album.songs:
+                    removed.add(album)
+                else:
+                    changed.add(album)
 
         # get new albums and changed ones because keys could have changed
         add_changed, new = self.__add(to_add)
         changed |= add_changed
 
         # check if albums that were empty at some point are still empty
+        removed = {album for album in removed if not album.songs}
         for album in removed:
-            if not album.songs:
-                del self._contents[album.key]
-                changed.discard(album)
+            del self._contents[album.key]
+            changed.discard(album)
 
         for album in changed:
             album.finalize()
@@ -469,6 +694,147 @@ class AlbumLibrary(Library):
             self.emit("added", new)
 
 
+class _ValueCounter(object):
+    """value -> number of songs having it, for one kind of song values"""
+
+    def __init__(self, get_values, songs):
+        self._get_values = get_values
+        self._counts = {}
+        self._values = {}
+        self._sorted = None
+        self.add(songs)
+
+    def __len__(self):
+        """The number of different values"""
+
+        return len(self._counts)
+
+    def _add_values(self, values):
+        counts = self._counts
+        for value in values:
+            if value in counts:
+                counts[value] += 1
+            else:
+                counts[value] = 1
+                self._sorted = None
+
+    def _remove_values(self, values):
+        counts = self._counts
+        for value in values:
+            counts[value] -= 1
+            if not counts[value]:
+                del counts[value]
+                self._sorted = None
+
+    def add(self, songs):
+        get_values = self._get_values
+        stored = self._values
+        for song in songs:
+            values = stored[song] = frozenset(get_values(song))
+            self._add_values(values)
+
+    def remove(self, songs):
+        stored = self._values
+        for song in songs:
+            self._remove_values(stored.pop(song, ()))
+
+    def change(self, songs):
+        get_values = self._get_values
+        stored = self._values
+        for song in songs:
+            old = stored.get(song, frozenset())
+            new = frozenset(get_values(song))
+            if old != new:
+                stored[song] = new
+                self._remove_values(old - new)
+                self._add_values(new - old)
+
+    def get_sorted(self):
+        if self._sorted is None:
+            self._sorted = sorted(self._counts)
+        return self._sorted
+
+
+class TagVocabulary(object):
+    """Keeps track of all values of tags and of all tag names of a
+    collection of songs.
+
+    Tags get tracked starting with the first request for them, after
+    that the results are available without looking at the songs.
+    """
+
+    def __init__(self, songs=None):
+        self._songs = set(songs or [])
+        self._tags = {}
+        self._names = None
+
+    def _counters(self):
+        counters = self._tags.values()
+        if self._names is not None:
+            counters.append(self._names)
+        return counters
+
+    def add(self, songs):
+        self._songs.update(songs)
+        for counter in self._counters():
+            counter.add(songs)
+
+    def remove(self, songs):
+        self._songs.difference_update(songs)
+        for counter in self._counters():
+            counter.remove(songs)
+
+    def change(self, songs):
+        songs = [s for s in songs if s in self._songs]
+        for counter in self._counters():
+            counter.change(songs)
+
+    def clear(self):
+        self._songs.clear()
+        self._tags.clear()
+        self._names = None
+
+    def _get_counter(self, tag):
+        counter = self._tags.get(tag)
+        if counter is None:
+            counter = self._tags[tag] = _ValueCounter(
+                lambda song: song.list(tag), self._songs)
+        return counter
+
+    def values(self, tag, prefix=u""):
+        """Returns a sorted list of all values of `tag`, optionally
+        only the ones starting with `prefix`.
+        """
+
+        values = self._get_counter(tag).get_sorted()
+        if not prefix:
+            return list(values)
+
+        start = end = bisect_left(values, prefix)
+        while end < len(values) and values[end].startswith(prefix):
+            end += 1
+        return values[start:end]
+
+    def count(self, tag, value):
+        """Returns the number of songs which have `value` in `tag`"""
+
+        return self._get_counter(tag)._counts.get(value, 0)
+
+    def count_values(self, tag):
+        """Returns the number of different values of `tag`"""
+
+        return len(self._get_counter(tag))
+
+    def tag_names(self):
+        """Returns a sorted list of all keys set in any song, including
+        internal ones.
+        """
+
+        if self._names is None:
+            self._names = _ValueCounter(lambda song: song.keys(), self._songs)
+        return list(self._names.get_sorted())
+
+
 class SongLibrary(PicklingLibrary):
     """A library for songs.
 
@@ -476,6 +842,9 @@ class SongLibrary(PicklingLibrary):
     interface.
     """
 
+    use_index = False
+    """Whether queries should be evaluated using `index`"""
+
     def __init__(self, *args, **kwargs):
         super(SongLibrary, self).__init__(*args, **kwargs)
 
@@ -483,17 +852,54 @@ class SongLibrary(PicklingLibrary):
     def albums(self):
         return AlbumLibrary(self)
 
+    @util.cached_property
+    def index(self):
+        """A QueryIndex of all songs, kept up to date"""
+
+        index = QueryIndex(self.values())
+        self._index_sigs = [
+            self.connect('added', lambda lib, items: index.add(items)),
+            self.connect('removed', lambda lib, items: index.remove(items)),
+            self.connect('changed', lambda lib, items: index.change(items)),
+        ]
+        return index
+
+    @util.cached_property
+    def vocabulary(self):
+        """A TagVocabulary of all songs, kept up to date"""
+
+        vocabulary = TagVocabulary(self.values())
+        self._vocabulary_sigs = [
+            self.connect('added', lambda lib, items: vocabulary.add(items)),
+            self.connect(
+                'removed', lambda lib, items: vocabulary.remove(items)),
+            self.connect(
+                'changed', lambda lib, items: vocabulary.change(items)),
+        ]
+        return vocabulary
+
     def destroy(self):
         super(SongLibrary, self).destroy()
         if "albums" in self.__dict__:
             self.albums.destroy()
+        if "index" in self.__dict__:
+            for sig in self._index_sigs:
+                self.disconnect(sig)
+            self.index.clear()
+        if "vocabulary" in self.__dict__:
+            for sig in self._vocabulary_sigs:
+                self.disconnect(sig)
+            self.vocabulary.clear()
 
     def tag_values(self, tag):
-        """Return a list of all values for the given tag."""
-        tags = set()
-        for song in self.itervalues():
-            tags.update(song.list(tag))
-        return list(tags)
+        """Return a sorted list of all values for the given tag."""
+
+        return self.vocabulary.values(tag)
+
+    def tag_names(self):
+        """Return a sorted list of all keys set in any song."""
+
+        return self.vocabulary.tag_names()
 
     def rename(self, song, newname, changed=None):
         """Rename a song.
@@ -522,10 +928,16 @@ class SongLibrary(PicklingLibrary):
         if isinstance(text, str):
             text = text.decode('utf-8')
 
-        songs = self.values()
-        if text != "":
-            songs = filter(Query(text, star).search, songs)
-        return songs
+        if text == "":
+            return self.values()
+        return self.search(Query(text, star))
+
+    def search(self, query):
+        """Return all songs matching the Query."""
+
+        if self.use_index:
+            return self.index.search(query)
+        return query.filter(self.values())
 
 
 class FileLibrary(PicklingLibrary):
@@ -535,6 +947,17 @@ class FileLibrary(PicklingLibrary):
     and have a mountpoint attribute.
     """
 
+    trust_dir_mtimes = False
+    """Skip checking the items in directories whose mtime didn't change
+    since the last rebuild(). Misses files modified in place."""
+
+    REBUILD_THREADS = 8
+    DIRS_SUFFIX = ".dirs"
+
+    scan_processes = 0
+    """Number of worker processes used for loading new files in scan(),
+    serial if < 2, one per CPU if < 0"""
+
     def __init__(self, name=None):
         super(FileLibrary, self).__init__(name)
         self._masked = {}
@@ -637,6 +1060,76 @@ class FileLibrary(PicklingLibrary):
             else:
                 removed.add(item)
 
+    def _check_items(self, task):
+        """Yields all items which aren't valid anymore, and None after
+        each directory to allow the caller to yield.
+
+        The items get checked per directory in a thread pool. If
+        `trust_dir_mtimes` is set, directories whose mtime hasn't changed
+        since the last check get skipped.
+        """
+
+        dirs = {}
+        for item in self.values():
+            key = item.key
+            # keys are usually, but not necessarily, file names
+            dirname = os.path.dirname(key) \
+                if isinstance(key, basestring) else None
+            dirs.setdefault(dirname, []).append(item)
+
+        filename = None
+        old_mtimes = {}
+        if self.trust_dir_mtimes and self.filename:
+            filename = self.filename + self.DIRS_SUFFIX
+            old_mtimes = load_items(filename, {})
+            if not isinstance(old_mtimes, dict):
+                # broken or from something else
+                old_mtimes = {}
+        new_mtimes = {}
+
+        def check(dirname, items):
+            # a directory mtime changes if files get added, renamed or
+            # removed, but not if they get modified in place
+            dir_mtime = dirname and mtime(dirname)
+            if dir_mtime and old_mtimes.get(dirname) == dir_mtime:
+                return dir_mtime, []
+            return dir_mtime, [item for item in items if not item.valid()]
+
+        pool = ThreadPool(self.REBUILD_THREADS)
+        try:
+            pending = collections.deque()
+            for dirname in sorted(dirs):
+                result = pool.apply_async(check, (dirname, dirs[dirname]))
+                pending.append((dirname, result))
+
+            total = max(len(self), 1)
+            done = 0
+            while pending:
+                dirname, result = pending.popleft()
+                while not result.ready():
+                    result.wait(0.01)
+                    yield None
+                dir_mtime, invalid = result.get()
+                for item in invalid:
+                    yield item
+                if dir_mtime:
+                    new_mtimes[dirname] = dir_mtime
+                done += len(dirs[dirname])
+                task.update(float(done) / total)
+                yield None
+        finally:
+            pool.terminate()
+
+        print_d("Checked %d directories, %d skipped." % (
+            len(dirs), len(set(old_mtimes.items()) &
+                           set(new_mtimes.items()))), self)
+
+        if filename is not None:
+            try:
+                dump_items(filename, new_mtimes)
+            except EnvironmentError:
+                print_w("Couldn't save directory mtimes to %r" % filename)
+
     def rebuild(self, paths, force=False, exclude=[], cofuncid=None):
         """Reload or remove songs if they have changed or been deleted.
 
@@ -668,10 +1161,18 @@ class FileLibrary(PicklingLibrary):
         if cofuncid:
             task.copool(cofuncid)
         changed, removed = set(), set()
-        for i, (key, item) in task.list(enumerate(sorted(self.items()))):
-            if key in self._contents and force or not item.valid():
+        if force:
+            items = sorted(self.values(), key=lambda item: item.key)
+            items = task.list(items)
+        else:
+            items = task.gen(self._check_items(task))
+        for i, item in enumerate(items):
+            if item is None:
+                yield True
+                continue
+            if item.key in self._contents:
                 self.reload(item, changed, removed)
-                # These numbers are pretty empirical. We should yield more
+            # These numbers are pretty empirical. We should yield more
             # often than we emit signals; that way the main loop stays
             # interactive and doesn't get bogged down in updates.
             if len(changed) > 100:
@@ -699,6 +1200,46 @@ class FileLibrary(PicklingLibrary):
         """
         raise NotImplementedError
 
+    def _scan_files(self, fullpath, exclude):
+        """Yields the paths of all supported files below `fullpath` which
+        aren't in the library yet. Yields None after each directory so
+        the caller gets a chance to yield.
+        """
+
+        for path, dnames, fnames in os.walk(fullpath):
+            for filename in fnames:
+                fullfilename = os.path.join(path, filename)
+                if filter(fullfilename.startswith, exclude):
+                    continue
+                if fullfilename not in self._contents:
+                    fullfilename = os.path.realpath(fullfilename)
+                    # skip unknown file extensions
+                    if not formats.filter(fullfilename):
+                        continue
+                    if filter(fullfilename.startswith, exclude):
+                        continue
+                    if fullfilename not in self._contents:
+                        yield fullfilename
+            yield None
+
+    def _load_files(self, filenames):
+        """Yields the loaded items for `filenames`, or None for files
+        which failed to load.
+        """
+
+        for filename in filenames:
+            if filename is None:
+                yield None
+            else:
+                yield self.add_filename(filename, False)
+
+    def _load_files_parallel(self, filenames, processes):
+        """Like _load_files, but may spread the work over `processes`
+        worker processes.
+        """
+
+        return self._load_files(filenames)
+
     def scan(self, paths, exclude=[], cofuncid=None):
         added = []
         exclude = [expanduser(path) for path in exclude if path]
@@ -717,6 +1258,13 @@ class FileLibrary(PicklingLibrary):
                 return True
             return False
 
+        processes = self.scan_processes
+        if processes < 0:
+            processes = multiprocessing.cpu_count()
+        # the workers get forked, not supported on Windows
+        if os.name == "nt":
+            processes = 0
+
         for fullpath in paths:
             print_d("Scanning %r." % fullpath, self)
             desc = _("Scanning %s") % (unexpand(fsdecode(fullpath)))
@@ -726,29 +1274,21 @@ class FileLibrary(PicklingLibrary):
                 fullpath = expanduser(fullpath)
                 if filter(fullpath.startswith, exclude):
                     continue
-                for path, dnames, fnames in os.walk(fullpath):
-                    for filename in fnames:
-                        fullfilename = os.path.join(path, filename)
-                        if filter(fullfilename.startswith, exclude):
-                            continue
-                        if fullfilename not in self._contents:
-                            fullfilename = os.path.realpath(fullfilename)
-                            # skip unknown file extensions
-                            if not formats.filter(fullfilename):
-                                continue
-                            if filter(fullfilename.startswith, exclude):
-                                continue
-                            if fullfilename not in self._contents:
-                                item = self.add_filename(fullfilename, False)
-                                if item is not None:
-                                    added.append(item)
-                                    if len(added) > 100 or need_added():
-                                        self.add(added)
-                                        added = []
-                                        task.pulse()
-                                        yield
-                                if added and need_yield():
-                                    yield
+                filenames = self._scan_files(fullpath, exclude)
+                if processes > 1:
+                    items = self._load_files_parallel(filenames, processes)
+                else:
+                    items = self._load_files(filenames)
+                for item in items:
+                    if item is not None and item.key not in self._contents:
+                        added.append(item)
+                    if len(added) > 100 or (added and need_added()):
+                        self.add(added)
+                        added = []
+                        task.pulse()
+                        yield
+                    elif need_yield():
+                        yield
                 if added:
                     self.add(added)
                     added = []
@@ -815,10 +1355,20 @@ class FileLibrary(PicklingLibrary):
         self._masked.pop(mount_point, {})
 
 
+def _load_songs(filenames):
+    """Loads songs in a scan worker process, see
+    SongFileLibrary._load_files_parallel.
+    """
+
+    return [MusicFile(filename) for filename in filenames]
+
+
 class SongFileLibrary(SongLibrary, FileLibrary):
     """A library containing song files.
     Pickles contents to disk as `FileLibrary`"""
 
+    SCAN_CHUNK_SIZE = 50
+
     def __init__(self, name=None):
         print_d("Initializing SongFileLibrary \"%s\"." % name)
         super(SongFileLibrary, self).__init__(name)
@@ -847,3 +1397,60 @@ class SongFileLibrary(SongLibrary, FileLibrary):
             song = self._contents[key]
 
         return song
+
+    def _load_files_parallel(self, filenames, processes):
+        """Reads the tags in `processes` worker processes. The files get
+        sent in chunks and the results collected without blocking, so
+        this can be driven by copool like _load_files.
+        """
+
+        pool = multiprocessing.Pool(processes)
+        pending = collections.deque()
+        chunk = []
+
+        def collect(limit):
+            # process finished chunks, wait for the oldest one
+            # while more than `limit` are pending
+            while pending and \
+                    (len(pending) > limit or pending[0][1].ready()):
+                chunk, result = pending[0]
+                while not result.ready():
+                    result.wait(0.01)
+                    yield None
+                pending.popleft()
+                try:
+                    items = result.get()
+                except Exception:
+                    util.print_exc()
+                    items = self._load_files(chunk)
+                for item in items:
+                    yield item
+
+        try:
+            for filename in filenames:
+                if filename is not None:
+                    chunk.append(filename)
+                if len(chunk) >= self.SCAN_CHUNK_SIZE or \
+                        (filename is None and chunk and not pending):
+                    result = pool.apply_async(_load_songs, (chunk,))
+                    pending.append((chunk, result))
+                    chunk = []
+                for item in collect(processes * 4):
+                    yield item
+                yield None
+            if chunk:
+                result = pool.apply_async(_load_songs, (chunk,))
+                pending.append((chunk, result))
+            for item in collect(0):
+                yield item
+        finally:
+            pool.terminate()
+
+
+class JournalingSongFileLibrary(JournalingMixin, SongFileLibrary):
+    """A SongFileLibrary which journals changes instead of pickling
+    all songs on each save (see `JournalingMixin`)"""
+
+    def __init__(self, name=None):
+        print_d("Using journaling persistence for library \"%s\"" % name)
+        super(JournalingSongFileLibrary, self).__init__(name)
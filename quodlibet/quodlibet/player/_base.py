@@ -139,6 +139,16 @@ class BasePlayer(GObject.GObject, Equalizer):
 
         self._reset_replaygain()
 
+    def source_changed(self):
+        """Call in case the song the source would switch to next might
+        have changed (the play order, repeat or the queue changed..)
+        """
+
+        self._source_changed()
+
+    def _source_changed(self):
+        pass
+
     @property
     def has_external_volume(self):
         """If setting the volume will affect anything outside of QL and
@@ -179,6 +179,11 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
         self.__bus_id = None
         self._runner = MainRunner()
 
+        # (source state, song, next song, next uri) looked up in advance
+        # for the streaming thread, or None
+        self._next_song = None
+        self.__next_id = None
+
     def __songs_changed(self, librarian, songs):
         # replaygain values might have changed, recalc volume
         if self.song and self.song in songs:
@@ -186,6 +191,9 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
 
     def _destroy(self):
         self._librarian.disconnect(self._lib_id)
+        if self.__next_id is not None:
+            GLib.source_remove(self.__next_id)
+            self.__next_id = None
         self._runner.abort()
         self.__destroy_pipeline()
 
@@ -550,9 +558,72 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
 
         return (True, self._source.current)
 
+    def _source_changed(self):
+        # don't hand out an outdated song until the new one is looked up
+        self._next_song = None
+        if self.__next_id is None:
+            # cheap, but needs to be done before the song ends; don't
+            # queue up behind redraws and other idle work
+            self.__next_id = GLib.idle_add(
+                self.__update_next_song, priority=GLib.PRIORITY_DEFAULT)
+
+    def __update_next_song(self):
+        """Looks up the song following the current one, so about-to-finish
+        doesn't have to wait for the main loop.
+        """
+
+        self.__next_id = None
+        self._next_song = None
+
+        # during a transition the source already points to the next song,
+        # _end() will trigger a new lookup
+        source, song = self._source, self.song
+        if source is None or song is None or song.multisong or \
+                self._in_gapless_transition:
+            return False
+
+        try:
+            next_song = source.peek_next_ended()
+        except NotImplementedError:
+            return False
+
+        if next_song is not None:
+            self._next_song = (
+                source.state, song, next_song, next_song("~uri"))
+        return False
+
+    def __gapless_commit(self, playbin, song, next_song):
+        """Moves the source on to the song about-to-finish has set"""
+
+        # the pipeline got replaced or another song started in the meantime
+        if self.bin is None or self.bin.bin is not playbin or \
+                self.song is not song or self._in_gapless_transition:
+            return False
+        self._in_gapless_transition = True
+
+        self._source.next_ended()
+        if self._source.current is not next_song:
+            # the source changed in the meantime, follow what gets played
+            self._source.go_to(next_song)
+        return False
+
     def __about_to_finish(self, playbin):
         print_d("About to finish (async)")
 
+        # Use the song looked up in advance if the source hasn't changed
+        # since, so a busy main loop can't break the gapless transition
+        next_, source = self._next_song, self._source
+        if next_ is not None and source is not None:
+            state, song, next_song, uri = next_
+            if song is self.song and state == source.state and \
+                    not config.getboolean("player", "gst_disable_gapless"):
+                self._next_song = None
+                print_d("About to finish (async): setting prepared uri")
+                playbin.set_property('uri', uri)
+                GLib.idle_add(self.__gapless_commit, playbin, song, next_song,
+                              priority=GLib.PRIORITY_HIGH)
+                return
+
         try:
             ok, song = self._runner.call(self.__about_to_finish_sync,
                                          priority=GLib.PRIORITY_HIGH,
@@ -767,6 +838,7 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
 
         self._in_gapless_transition = False
         self._refresh_seekable()
+        self._source_changed()
 
     def __tag(self, tags, librarian):
         if self.song and self.song.multisong:
@@ -49,6 +49,11 @@ class PlayOrderPlugin(quodlibet.qltk.playorder.Order):
         def previous_implicit(self, playlist, iter): ...
     There is also set_explicit, but no set_implicit.
 
+    If next_implicit doesn't change any state, define
+        def peek_implicit(self, playlist, iter): ...
+    returning the same result, so the player can prepare the next song
+    for gapless playback in advance.
+
     Finally, there is
         def reset(self, playlist): ...
     which is called when the playlist changes and state should be reset.
@@ -60,6 +65,11 @@ class PlayOrderPlugin(quodlibet.qltk.playorder.Order):
     accelerated_name = None
     priority = quodlibet.qltk.playorder.Order.priority
 
+    def peek_implicit(self, playlist, iter):
+        # plugins might override next() etc., so don't inherit the
+        # implementation of the mixins
+        raise NotImplementedError
+
 
 class PlayOrderRememberedMixin(quodlibet.qltk.playorder.OrderRemembered):
     name = None
@@ -110,13 +110,12 @@ class LibraryTagCompletion(EntryWordCompletion):
         model.clear()
 
         tags = set()
-        songs = list(library)
-        for count, song in enumerate(songs):
-            for tag in song.keys():
-                if not (tag.startswith("~#") or tag in MACHINE_TAGS):
-                    tags.add(tag)
+        names = library.tag_names()
+        for count, tag in enumerate(names):
+            if not (tag.startswith("~#") or tag in MACHINE_TAGS):
+                tags.add(tag)
 
-            if count % 500 == 0 or count + 1 == len(songs):
+            if count % 500 == 0 or count + 1 == len(names):
                 tags -= all_tags
                 for tag in tags:
                     model.append([tag])
@@ -167,11 +166,9 @@ class LibraryValueCompletion(Gtk.EntryCompletion):
         model.clear()
         yield True
         # Issue 439: pre-fill with valid values if available
+        values = library.tag_values(tag)
         if tag in massagers.tags:
-            values = massagers.tags[tag].options
-        else:
-            values = []
-        values = sorted(set(values + library.tag_values(tag)))
+            values = sorted(set(massagers.tags[tag].options + values))
         self.set_minimum_key_length(int(len(values) > 100))
         yield True
         for count, value in enumerate(values):
@@ -5,6 +5,8 @@
 # it under the terms of the GNU General Public License version 2 as
 # published by the Free Software Foundation
 
+import itertools
+
 from gi.repository import Gtk, GObject
 
 from quodlibet.qltk import pygobject_version
@@ -270,3 +272,380 @@ class ObjectStore(_ModelMixin, Gtk.ListStore):
 
     def prepend(self, row=None):
         return self.insert(0, row)
+
+
+class ObjectListModel(_ModelMixin, GObject.Object, Gtk.TreeModel):
+    """A single column object list model backed by a Python list.
+
+    Supports the ObjectStore API, but doesn't create a GTK row for each
+    value: rows only get looked up when the view asks for them. Filling
+    the model while no view (or anything else) is connected to it costs
+    about as much as extending a list.
+
+    Iters stay valid until their row gets removed.
+
+    Looking up the row of an iter goes through an id -> index map. Rows
+    which moved because of an insert or remove get fixed up when looked
+    up, by replaying the edits since; after MAX_PENDING edits the whole
+    map gets rebuilt once instead.
+    """
+
+    MAX_PENDING = 256
+    """Number of inserts/removes to replay on lookup before rebuilding the
+    index map"""
+
+    def __init__(self, *args):
+        if len(args) > 1:
+            raise ValueError
+        if args and object not in args and GObject.TYPE_PYOBJECT not in args:
+            raise ValueError
+        super(ObjectListModel, self).__init__()
+
+        self.__stamp = id(self) & 0x7fffffff | 1
+        self.__values = []
+        # a unique id for each row, stored in the iters
+        self.__ids = []
+        self.__next_id = 1
+        # id -> (index, number of edits already applied to index),
+        # contains all rows if __complete
+        self.__index = {}
+        self.__complete = True
+        # (position, count) for each insert (count > 0) and remove
+        self.__edits = []
+        self.__signal_ids = [
+            GObject.signal_lookup(name, Gtk.TreeModel.__gtype__)
+            for name in ("row-inserted", "row-deleted")]
+
+    def __len__(self):
+        return len(self.__values)
+
+    def __has_listeners(self):
+        """If anything (a view for example) is connected to the model and
+        needs per row change signals.
+        """
+
+        for signal_id in self.__signal_ids:
+            if GObject.signal_has_handler_pending(self, signal_id, 0, False):
+                return True
+        return False
+
+    def __create_iter(self, id_):
+        iter_ = Gtk.TreeIter()
+        iter_.stamp = self.__stamp
+        iter_.user_data = id_
+        return iter_
+
+    def __iter_for_index(self, index):
+        if 0 <= index < len(self.__ids):
+            return self.__create_iter(self.__ids[index])
+
+    def __get_index(self, iter_):
+        """The current index of the row iter_ points to or None"""
+
+        if iter_ is None or iter_.stamp != self.__stamp:
+            return
+
+        if not self.__complete:
+            self.__rebuild_index()
+
+        id_ = iter_.user_data
+        entry = self.__index.get(id_)
+        if entry is None:
+            return
+
+        index, applied = entry
+        edits = self.__edits
+        if applied != len(edits):
+            for position, count in itertools.islice(edits, applied, None):
+                if index >= position:
+                    index += count
+            self.__index[id_] = (index, len(edits))
+        return index
+
+    def __rebuild_index(self):
+        self.__index = dict(
+            (id_, (i, 0)) for i, id_ in enumerate(self.__ids))
+        del self.__edits[:]
+        self.__complete = True
+
+    def __add_edit(self, position, count):
+        """Record an insert (count > 0) or remove (count < 0) at position,
+        for the rows in the index after it
+        """
+
+        if not self.__complete:
+            return False
+        if len(self.__edits) >= self.MAX_PENDING:
+            # rebuild on the next lookup
+            self.__complete = False
+            self.__index.clear()
+            del self.__edits[:]
+            return False
+        self.__edits.append((position, count))
+        return True
+
+    def __insert(self, position, values):
+        """Insert values and return the position of the first one"""
+
+        if position < 0 or position > len(self.__values):
+            position = len(self.__values)
+
+        if not values:
+            return position
+
+        start = self.__next_id
+        self.__next_id += len(values)
+        self.__values[position:position] = values
+        self.__ids[position:position] = xrange(start, self.__next_id)
+        self.__index_inserted(position, len(values))
+        return position
+
+    def __index_inserted(self, position, count):
+        """Update the index for `count` rows inserted at position"""
+
+        if position == len(self.__ids) - count:
+            # appended, nothing moved
+            if count > 1:
+                # filled in bulk, index on the next lookup
+                self.__complete = False
+            indexed = self.__complete
+        else:
+            indexed = self.__add_edit(position, count)
+
+        if indexed:
+            applied = len(self.__edits)
+            ids = self.__ids
+            index = self.__index
+            for i in xrange(position, position + count):
+                index[ids[i]] = (i, applied)
+
+    def __insert_emit(self, position, values):
+        """Insert values at position, emitting row-inserted for each if
+        needed. Returns the iter of the last inserted row or None.
+        """
+
+        if not values:
+            return
+        elif not self.__has_listeners():
+            position = self.__insert(position, values)
+            return self.__iter_for_index(position + len(values) - 1)
+
+        iter_ = None
+        for value in values:
+            position = self.__insert(position, [value])
+            iter_ = self.__create_iter(self.__ids[position])
+            self.row_inserted(Gtk.TreePath((position,)), iter_)
+            position += 1
+        return iter_
+
+    def __remove_index(self, index):
+        del self.__values[index]
+        self.__index.pop(self.__ids.pop(index), None)
+        if index != len(self.__ids):
+            self.__add_edit(index, -1)
+
+    def do_get_flags(self):
+        return Gtk.TreeModelFlags.LIST_ONLY | Gtk.TreeModelFlags.ITERS_PERSIST
+
+    def do_get_n_columns(self):
+        return 1
+
+    def do_get_column_type(self, index):
+        return GObject.TYPE_PYOBJECT
+
+    def do_get_iter(self, path):
+        indices = path.get_indices()
+        if len(indices) == 1:
+            iter_ = self.__iter_for_index(indices[0])
+            if iter_ is not None:
+                return True, iter_
+        return False, None
+
+    def do_get_path(self, iter_):
+        index = self.__get_index(iter_)
+        if index is not None:
+            return Gtk.TreePath((index,))
+
+    def do_get_value(self, iter_, column):
+        index = self.__get_index(iter_)
+        if index is not None:
+            return self.__values[index]
+
+    def __move_iter(self, iter_, offset):
+        index = self.__get_index(iter_)
+        if index is None:
+            return False
+        index += offset
+        if not 0 <= index < len(self.__ids):
+            return False
+        iter_.user_data = self.__ids[index]
+        return True
+
+    def do_iter_next(self, iter_):
+        return self.__move_iter(iter_, 1)
+
+    def do_iter_previous(self, iter_):
+        return self.__move_iter(iter_, -1)
+
+    def do_iter_children(self, parent):
+        if parent is None:
+            iter_ = self.__iter_for_index(0)
+            if iter_ is not None:
+                return True, iter_
+        return False, None
+
+    def do_iter_has_child(self, iter_):
+        return False
+
+    def do_iter_n_children(self, iter_):
+        if iter_ is None:
+            return len(self.__values)
+        return 0
+
+    def do_iter_nth_child(self, parent, n):
+        if parent is None:
+            iter_ = self.__iter_for_index(n)
+            if iter_ is not None:
+                return True, iter_
+        return False, None
+
+    def do_iter_parent(self, child):
+        return False, None
+
+    def get_value(self, iter_, column=0):
+        return self.__values[self.__get_index(iter_)]
+
+    def set_value(self, iter_, column, value):
+        index = self.__get_index(iter_)
+        self.__values[index] = value
+        self.row_changed(Gtk.TreePath((index,)), iter_)
+
+    def itervalues(self, iter_=None):
+        """Yields all values"""
+
+        if iter_ is None:
+            return iter(list(self.__values))
+        return iter([])
+
+    def iterrows(self, iter_=None):
+        """Yields (iter, value) tuples"""
+
+        if iter_ is not None:
+            return
+        create_iter = self.__create_iter
+        for id_, value in zip(self.__ids, self.__values):
+            yield create_iter(id_), value
+
+    def is_empty(self):
+        return not self.__values
+
+    def iter_is_valid(self, iter_):
+        return self.__get_index(iter_) is not None
+
+    def clear(self):
+        if not self.__has_listeners():
+            del self.__values[:]
+            del self.__ids[:]
+            self.__index.clear()
+            del self.__edits[:]
+            self.__complete = True
+            return
+
+        # remove from the end, so no other row has to move
+        for index in xrange(len(self.__values) - 1, -1, -1):
+            self.__remove_index(index)
+            self.row_deleted(Gtk.TreePath((index,)))
+
+    def remove(self, iter_):
+        """Removes the row and moves iter_ to the next one.
+        Returns False if there is no next row.
+        """
+
+        index = self.__get_index(iter_)
+        if index is None:
+            return False
+        self.__remove_index(index)
+        self.row_deleted(Gtk.TreePath((index,)))
+        if index < len(self.__ids):
+            iter_.user_data = self.__ids[index]
+            return True
+        iter_.stamp = 0
+        return False
+
+    def append(self, row=None):
+        if not row:
+            assert not self.ATOMIC
+            row = [None]
+        return self.__insert_emit(-1, [row[0]])
+
+    def insert(self, position, row=None):
+        if not row:
+            assert not self.ATOMIC
+            row = [None]
+        return self.__insert_emit(position, [row[0]])
+
+    def prepend(self, row=None):
+        return self.insert(0, row)
+
+    def insert_before(self, sibling, row=None):
+        if sibling is None:
+            position = -1
+        else:
+            position = self.__get_index(sibling)
+        return self.insert(position, row)
+
+    def insert_after(self, sibling, row=None):
+        if sibling is None:
+            position = 0
+        else:
+            position = self.__get_index(sibling) + 1
+        return self.insert(position, row)
+
+    def iter_append_many(self, objects):
+        """Append a list of python objects, yield iters"""
+
+        objects = list(objects)
+        self.__insert_emit(-1, objects)
+        ids = self.__ids[len(self.__ids) - len(objects):]
+        create_iter = self.__create_iter
+        for id_ in ids:
+            yield create_iter(id_)
+
+    def append_many(self, objects):
+        """Append a list of python objects"""
+
+        self.__insert_emit(-1, list(objects))
+
+    def insert_many(self, position, objects):
+        self.__insert_emit(position, list(objects))
+
+    def __move(self, iter_, position):
+        index = self.__get_index(iter_)
+        if index is None:
+            return
+        if index < position:
+            position -= 1
+        id_ = self.__ids[index]
+        value = self.__values[index]
+        self.__remove_index(index)
+        self.row_deleted(Gtk.TreePath((index,)))
+
+        # keep the id, so iters pointing to the row stay valid
+        self.__values.insert(position, value)
+        self.__ids.insert(position, id_)
+        self.__index_inserted(position, 1)
+        self.row_inserted(Gtk.TreePath((position,)), iter_)
+
+    def move_before(self, iter_, position):
+        if position is None:
+            index = len(self.__values)
+        else:
+            index = self.__get_index(position)
+        self.__move(iter_, index)
+
+    def move_after(self, iter_, position):
+        if position is None:
+            index = 0
+        else:
+            index = self.__get_index(position) + 1
+        self.__move(iter_, index)
@@ -50,6 +50,12 @@ class Order(object):
     def next_implicit(self, playlist, iter):
         return self.next(playlist, iter)
 
+    # Returns what next_implicit would return, without switching to it,
+    # so the player can prepare the next song in advance.
+    # Raises NotImplementedError if that can't be known beforehand.
+    def peek_implicit(self, playlist, iter):
+        raise NotImplementedError
+
     # Called when the user presses a "Previous" button.
     def previous_explicit(self, playlist, iter):
         return self.previous(playlist, iter)
@@ -65,10 +71,118 @@ class Order(object):
     def set_implicit(self, playlist, iter):
         return self.set(playlist, iter)
 
+    # Called when the content of a row (at iter) has changed, e.g.
+    # the song's rating.
+    def changed(self, playlist, iter):
+        pass
+
     def reset(self, playlist):
         pass
 
 
+class _ShufflePool(object):
+    """The indices 0..size-1, split into used and remaining ones.
+
+    Sampling and moving indices between the two is O(1): the indices are
+    kept in a lazily created permutation (only swapped positions get
+    stored) where the used ones come first.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._used = 0
+        self._perm = {}
+        self._pos = {}
+
+    def __len__(self):
+        """The number of remaining indices"""
+
+        return self.size - self._used
+
+    def _swap(self, pos1, pos2):
+        perm, pos = self._perm, self._pos
+        index1 = perm.get(pos1, pos1)
+        index2 = perm.get(pos2, pos2)
+        perm[pos1], perm[pos2] = index2, index1
+        pos[index2], pos[index1] = pos1, pos2
+
+    def sample(self):
+        """Returns a random remaining index or None"""
+
+        if not len(self):
+            return None
+        pos = random.randrange(self._used, self.size)
+        return self._perm.get(pos, pos)
+
+    def use(self, index):
+        """Marks an index as used"""
+
+        if not 0 <= index < self.size:
+            return
+        pos = self._pos.get(index, index)
+        if pos >= self._used:
+            self._swap(pos, self._used)
+            self._used += 1
+
+
+class _WeightTree(object):
+    """A Fenwick tree of weights, for weighted random selection and
+    updating single weights in O(log n).
+    """
+
+    def __init__(self, weights):
+        self._weights = list(weights)
+        self._tree = tree = list(self._weights)
+        size = len(tree)
+        for i in xrange(size):
+            j = i | (i + 1)
+            if j < size:
+                tree[j] += tree[i]
+
+    def __len__(self):
+        return len(self._tree)
+
+    @property
+    def total(self):
+        """The sum of all weights"""
+
+        tree = self._tree
+        total = 0
+        i = len(tree)
+        while i > 0:
+            total += tree[i - 1]
+            i &= i - 1
+        return total
+
+    def set(self, index, weight):
+        diff = weight - self._weights[index]
+        self._weights[index] = weight
+        tree = self._tree
+        while index < len(tree):
+            tree[index] += diff
+            index |= index + 1
+
+    def find(self, value):
+        """Returns the first index for which the sum of the weights up to
+        and including it is >= value, or None if empty.
+        """
+
+        tree = self._tree
+        size = len(tree)
+        if not size:
+            return None
+
+        pos = 0
+        bit = 1 << (size.bit_length() - 1)
+        while bit:
+            next_ = pos + bit
+            if next_ <= size and tree[next_ - 1] < value:
+                pos = next_
+                value -= tree[next_ - 1]
+            bit >>= 1
+        return min(pos, size - 1)
+
+
 class OrderInOrder(Order):
     name = "inorder"
     display_name = _("In Order")
@@ -85,6 +199,10 @@ class OrderInOrder(Order):
                 next = playlist.get_iter_first()
             return next
 
+    def peek_implicit(self, playlist, iter):
+        # next/next_implicit don't keep any state here
+        return self.next_implicit(playlist, iter)
+
     def previous(self, playlist, iter):
         if len(playlist) == 0:
             return None
@@ -136,20 +254,86 @@ class OrderShuffle(OrderRemembered):
     is_shuffle = True
     priority = 1
 
-    def next(self, playlist, iter):
-        super(OrderShuffle, self).next(playlist, iter)
-        played = set(self._played)
-        songs = set(range(len(playlist)))
-        remaining = songs.difference(played)
+    def __init__(self, playlist):
+        super(OrderShuffle, self).__init__(playlist)
+        self._pool = None
+        # ((current index, repeat), next index) drawn by peek_implicit
+        self._next = None
+
+    def _get_pool(self, playlist):
+        """Returns a _ShufflePool where all played songs are used"""
+
+        pool = self._pool
+        if pool is None or pool.size != len(playlist):
+            pool = self._pool = _ShufflePool(len(playlist))
+            for index in self._played:
+                pool.use(index)
+        elif self._played:
+            pool.use(self._played[-1])
+        return pool
+
+    def __sample(self, playlist, iter):
+        """Returns the index of a random song following `iter` or None"""
+
+        pool = self._get_pool(playlist)
+        if iter is not None:
+            pool.use(playlist.get_path(iter).get_indices()[0])
+        index = pool.sample()
+        if index is None and playlist.repeat and not playlist.is_empty():
+            # all played, __next() starts over
+            index = random.randrange(len(playlist))
+        return index
 
-        if remaining:
-            return playlist.get_iter((random.choice(list(remaining)),))
-        elif playlist.repeat and not playlist.is_empty():
-            del(self._played[:])
-            return playlist.get_iter((random.choice(list(songs)),))
-        else:
+    def __peek(self, playlist, iter):
+        """Returns the next index, drawn only once per song"""
+
+        current = None
+        if iter is not None:
+            current = playlist.get_path(iter).get_indices()[0]
+        key = (current, playlist.repeat)
+        if self._next is None or self._next[0] != key:
+            self._next = (key, self.__sample(playlist, iter))
+        return self._next[1]
+
+    def __next(self, playlist, iter, index):
+        self._next = None
+        super(OrderShuffle, self).next(playlist, iter)
+        if not len(self._get_pool(playlist)):
+            # all played, start over
             del(self._played[:])
-            return None
+            self._pool = None
+        if index is not None:
+            return playlist.get_iter((index,))
+
+    def next(self, playlist, iter):
+        return self.__next(playlist, iter, self.__sample(playlist, iter))
+
+    def next_implicit(self, playlist, iter):
+        return self.__next(playlist, iter, self.__peek(playlist, iter))
+
+    def peek_implicit(self, playlist, iter):
+        index = self.__peek(playlist, iter)
+        if index is not None:
+            return playlist.get_iter((index,))
+
+    def previous(self, playlist, iter):
+        # the song can be played again, start over using _played
+        self._pool = None
+        self._next = None
+        return super(OrderShuffle, self).previous(playlist, iter)
+
+    def set(self, playlist, iter):
+        self._next = None
+        iter = super(OrderShuffle, self).set(playlist, iter)
+        if self._pool is not None and iter is not None:
+            # mark it as used
+            self._get_pool(playlist)
+        return iter
+
+    def reset(self, playlist):
+        super(OrderShuffle, self).reset(playlist)
+        self._pool = None
+        self._next = None
 
 
 class OrderWeighted(OrderRemembered):
@@ -159,18 +343,68 @@ class OrderWeighted(OrderRemembered):
     is_shuffle = True
     priority = 2
 
-    def next(self, playlist, iter):
+    def __init__(self, playlist):
+        super(OrderWeighted, self).__init__(playlist)
+        self._weights = None
+        # the next index drawn by peek_implicit
+        self._next = None
+
+    def _get_weights(self, playlist):
+        if self._weights is None or len(self._weights) != len(playlist):
+            self._weights = _WeightTree(
+                [song("~#rating") for song in playlist.get()])
+        return self._weights
+
+    def __sample(self, playlist):
+        weights = self._get_weights(playlist)
+        return weights.find(random.random() * weights.total)
+
+    def __peek(self, playlist):
+        """Returns the next index, drawn only once per song"""
+
+        if self._next is None:
+            self._next = self.__sample(playlist)
+        return self._next
+
+    def __next(self, playlist, iter, index):
+        self._next = None
         super(OrderWeighted, self).next(playlist, iter)
-        songs = playlist.get()
-        max_score = sum([song('~#rating') for song in songs])
-        choice = random.random() * max_score
-        current = 0.0
-        for i, song in enumerate(songs):
-            current += song("~#rating")
-            if current >= choice:
-                return playlist.get_iter((i,))
-        else:
+        if index is None:
+            return playlist.get_iter_first()
+        return playlist.get_iter((index,))
+
+    def next(self, playlist, iter):
+        return self.__next(playlist, iter, self.__sample(playlist))
+
+    def next_implicit(self, playlist, iter):
+        return self.__next(playlist, iter, self.__peek(playlist))
+
+    def peek_implicit(self, playlist, iter):
+        index = self.__peek(playlist)
+        if index is None:
             return playlist.get_iter_first()
+        return playlist.get_iter((index,))
+
+    def previous(self, playlist, iter):
+        self._next = None
+        return super(OrderWeighted, self).previous(playlist, iter)
+
+    def set(self, playlist, iter):
+        self._next = None
+        return super(OrderWeighted, self).set(playlist, iter)
+
+    def changed(self, playlist, iter):
+        weights = self._weights
+        if weights is not None:
+            index = playlist.get_path(iter).get_indices()[0]
+            if index < len(weights):
+                song = playlist.get_value(iter)
+                weights.set(index, song("~#rating"))
+
+    def reset(self, playlist):
+        super(OrderWeighted, self).reset(playlist)
+        self._weights = None
+        self._next = None
 
 
 class OrderOneSong(OrderInOrder):
@@ -363,6 +597,7 @@ class PlayOrder(Gtk.Box, PluginHandler):
 
         self._player.replaygain_profiles[2] = order_cls.replaygain_profiles
         self._player.reset_replaygain()
+        self._player.source_changed()
         self.emit("changed")
 
     def _refresh_menu(self):
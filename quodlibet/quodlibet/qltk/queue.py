@@ -104,7 +104,8 @@ class QueueExpander(Gtk.Expander):
 
         cb = ConfigCheckButton(
             _("_Random"), "memory", "shufflequeue")
-        cb.connect('toggled', self.__queue_shuffle, self.queue.model)
+        cb.connect('toggled', self.__queue_shuffle, self.queue.model,
+                   player)
         cb.set_active(config.getboolean("memory", "shufflequeue"))
         left.pack_start(cb, False, True, 0)
 
@@ -197,11 +198,12 @@ class QueueExpander(Gtk.Expander):
     def __drag_data_received(self, expander, *args):
         self.queue.emit('drag-data-received', *args)
 
-    def __queue_shuffle(self, button, model):
+    def __queue_shuffle(self, button, model, player):
         if not button.get_active():
             model.order = OrderInOrder(model)
         else:
             model.order = OrderShuffle(model)
+        player.source_changed()
 
     def __expand(self, cb, prop, clear):
         cb.set_property('visible', self.get_expanded())
@@ -37,7 +37,8 @@ from quodlibet.qltk.properties import SongProperties
 from quodlibet.qltk.prefs import PreferencesWindow
 from quodlibet.qltk.queue import QueueExpander
 from quodlibet.qltk.songlist import SongList, get_columns, set_columns
-from quodlibet.qltk.songmodel import PlaylistMux
+from quodlibet.qltk.songmodel import PlaylistMux, PlaylistModel, \
+    LazyPlaylistModel
 from quodlibet.qltk.x import ConfigRVPaned, Align, ScrolledWindow, Action
 from quodlibet.qltk.x import SymbolicIconImage, CellRendererPixbuf, \
     ToggleAction, RadioAction
@@ -106,7 +107,12 @@ class MainSongList(SongList):
     _activated = False
 
     def __init__(self, library, player):
-        super(MainSongList, self).__init__(library, player, update=True)
+        if config.getboolean("settings", "lazy_song_list"):
+            model_cls = LazyPlaylistModel
+        else:
+            model_cls = PlaylistModel
+        super(MainSongList, self).__init__(
+            library, player, update=True, model_cls=model_cls)
         self.set_first_column_type(CurrentColumn)
 
         self.connect('row-activated', self.__select_song, player)
@@ -258,14 +264,15 @@ class StatusBarBox(Gtk.HBox):
 
         self.repeat = repeat = ReapeatButton()
         self.pack_start(repeat, False, True, 0)
-        repeat.connect('toggled', self.__repeat, model)
+        repeat.connect('toggled', self.__repeat, model, player)
         model.repeat = repeat.get_active()
 
         self.statusbar = StatusBar(TaskController.default_instance)
         self.pack_start(self.statusbar, True, True, 0)
 
-    def __repeat(self, button, model):
+    def __repeat(self, button, model, player):
         model.repeat = button.get_active()
+        player.source_changed()
 
 
 class AppMenu(object):
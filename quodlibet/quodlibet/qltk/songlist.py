@@ -8,6 +8,8 @@
 # it under the terms of the GNU General Public License version 2 as
 # published by the Free Software Foundation
 
+import bisect
+
 from gi.repository import Gtk, GLib, Gdk, GObject
 
 from quodlibet import app
@@ -327,6 +329,33 @@ class SongListDnDMixin(object):
         return window.browser.dropped(songs)
 
 
+class ReverseKey(object):
+    """Wraps a sort key and reverses its order"""
+
+    __slots__ = ["key"]
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __ne__(self, other):
+        return self.key != other.key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __gt__(self, other):
+        return other.key > self.key
+
+    def __le__(self, other):
+        return other.key <= self.key
+
+    def __ge__(self, other):
+        return other.key >= self.key
+
+
 class SongList(AllTreeView, SongListDnDMixin, DragScroll,
                util.InstanceTracker):
     # A TreeView containing a list of songs.
@@ -382,6 +411,13 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
         # A priority list of how to apply the sort keys.
         # might contain column header names not present...
         self._sort_sequence = []
+        # song -> sort key for the current sort orders, see add_songs()
+        self.__sort_keys = {}
+        # tag -> {song -> sort key}, see __get_tag_key_func()
+        self.__tag_keys = {}
+        # the last result of sorting by the default sort key
+        self.__default_order = None
+        self.connect("orders-changed", self.__orders_changed)
         self.set_column_headers(self.headers)
         librarian = library.librarian or library
 
@@ -546,6 +582,9 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
     def __destroy(self, *args):
         self.info.destroy()
         self.info = None
+        self.__sort_keys.clear()
+        self.__tag_keys.clear()
+        self.__default_order = None
         self.handler_block(self.__csig)
         for column in self.get_columns():
             self.remove_column(column)
@@ -733,7 +772,7 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             # always sort using the default sort key first
             if first:
                 first = False
-                songs.sort(key=lambda s: s.sort_key, reverse=reverse)
+                self.__sort_default(songs, reverse)
                 last_order = reverse
                 last_tag = ""
 
@@ -746,8 +785,106 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             if tag == "":
                 songs.sort(key=lambda s: s.sort_key, reverse=reverse)
             else:
-                sort_func = AudioFile.sort_by_func(tag)
-                songs.sort(key=sort_func, reverse=reverse)
+                songs.sort(key=self.__get_tag_key_func(tag), reverse=reverse)
+
+    def __sort_default(self, songs, reverse):
+        """Sort songs in place by their default sort key.
+
+        Comparing the default sort keys is what makes sorting expensive,
+        so the result gets reused as long as the same songs get sorted
+        and none of them changes.
+        """
+
+        ids = set(map(id, songs))
+        cached = self.__default_order
+        if cached is not None:
+            order, order_ids, order_reverse = cached
+            if order_reverse == reverse and len(order) == len(songs) and \
+                    order_ids == ids:
+                songs[:] = order
+                return
+
+        songs.sort(key=lambda s: s.sort_key, reverse=reverse)
+        # with duplicates the ids don't identify the list content
+        if len(ids) == len(songs):
+            self.__default_order = (list(songs), ids, reverse)
+        else:
+            self.__default_order = None
+
+    def __get_tag_key_func(self, tag):
+        """Like AudioFile.sort_by_func(tag), but caches the keys until
+        the songs change.
+        """
+
+        cache = self.__tag_keys.setdefault(tag, {})
+        sort_func = AudioFile.sort_by_func(tag)
+
+        def func(song):
+            try:
+                return cache[song]
+            except KeyError:
+                key = cache[song] = sort_func(song)
+                return key
+
+        return func
+
+    def _get_sort_key(self):
+        """Returns a (key, reverse) tuple to sort songs with a single
+        list.sort() in the same order as _sort_songs() does.
+        """
+
+        # the sort passes of _sort_songs(), the last one has the
+        # highest priority
+        passes = []
+        for tag, reverse in self.get_sort_orders():
+            tag = get_sort_tag(tag)
+            if not passes:
+                passes.append(("", reverse))
+            if passes[-1] != (tag, reverse):
+                passes.append((tag, reverse))
+
+        if not passes:
+            return None, False
+
+        passes.reverse()
+        reverse = passes[0][1]
+        funcs = []
+        for tag, order in passes:
+            if tag == "":
+                func = lambda s: s.sort_key
+            else:
+                func = self.__get_tag_key_func(tag)
+            funcs.append((func, order != reverse))
+
+        if len(funcs) == 1:
+            return funcs[0][0], reverse
+
+        def key(song):
+            return tuple([ReverseKey(f(song)) if flip else f(song)
+                          for f, flip in funcs])
+
+        return key, reverse
+
+    def __orders_changed(self, songlist):
+        self.__sort_keys.clear()
+        # only keep the key caches of columns still in use
+        tags = {get_sort_tag(tag) for tag, order in self.get_sort_orders()}
+        for tag in self.__tag_keys.keys():
+            if tag not in tags:
+                del self.__tag_keys[tag]
+
+    def __forget_sort_keys(self, songs):
+        if self.__default_order is not None:
+            ids = self.__default_order[1]
+            for song in songs:
+                if id(song) in ids:
+                    self.__default_order = None
+                    break
+
+        for cache in [self.__sort_keys] + self.__tag_keys.values():
+            if cache:
+                for song in songs:
+                    cache.pop(song, None)
 
     def add_songs(self, songs):
         """Add songs to the list in the right order and position"""
@@ -764,14 +901,42 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             model.append_many(songs)
             return
 
-        # FIXME: Replace with something fast
-        old_songs = self.get_songs()
-        old_songs.extend(songs)
+        sort_key, reverse = self._get_sort_key()
+        sort_keys = self.__sort_keys
 
-        self._sort_songs(old_songs)
+        def get_key(song):
+            try:
+                return sort_keys[song]
+            except KeyError:
+                key = sort_keys[song] = sort_key(song)
+                return key
+
+        keys = map(get_key, self.get_songs())
+        if reverse:
+            # bisect needs ascending keys, inserting after equal
+            # songs in the reversed list means before them here
+            keys.reverse()
+            search = bisect.bisect_left
+        else:
+            search = bisect.bisect_right
 
-        for index, song in sorted(zip(map(old_songs.index, songs), songs)):
-            model.insert(index, row=[song])
+        songs = sorted(songs, key=get_key, reverse=reverse)
+        count = len(keys)
+        positions = []
+        for song in songs:
+            position = search(keys, get_key(song))
+            if reverse:
+                position = count - position
+            positions.append(position)
+
+        # insert runs of songs which go to the same position at once
+        offset = 0
+        start = 0
+        for i in xrange(1, len(songs) + 1):
+            if i == len(songs) or positions[i] != positions[start]:
+                model.insert_many(positions[start] + offset, songs[start:i])
+                offset += i - start
+                start = i
 
     def set_songs(self, songs, sorted=False, scroll=True, scroll_select=False):
         """Fill the song list.
@@ -877,6 +1042,8 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
         Warning: This makes the row-changed signal useless.
         """
 
+        self.__forget_sort_keys(songs)
+
         vrange = self.get_visible_range()
         if vrange is None:
             return
@@ -901,6 +1068,8 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             for song in songs:
                 player.remove(song)
 
+        self.__forget_sort_keys(songs)
+
         # The selected songs are removed from the library and should
         # be removed from the view.
 
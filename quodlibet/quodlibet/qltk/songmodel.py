@@ -10,7 +10,7 @@ import itertools
 from gi.repository import Gtk
 
 from quodlibet.qltk.playorder import ORDERS
-from quodlibet.qltk.models import ObjectStore
+from quodlibet.qltk.models import ObjectStore, ObjectListModel
 
 
 class PlaylistMux(object):
@@ -26,8 +26,14 @@ class PlaylistMux(object):
         self._id = player.connect('song-started', self.__song_started)
         self._player = player
 
+        # not the row signals, these would force per row work on the models
+        for model in [q, pl]:
+            model.rows_changed_func = player.source_changed
+
     def destroy(self):
         self._player.disconnect(self._id)
+        for model in [self.q, self.pl]:
+            model.rows_changed_func = None
 
     def __song_started(self, player, song):
         if song is not None and self.q.sourced:
@@ -37,6 +43,25 @@ class PlaylistMux(object):
                 # we don't call _check_sourced here since we want the queue
                 # to stay sourced even if no current song is left
 
+    @property
+    def state(self):
+        """A value which changes whenever the song next_ended() would
+        switch to might have changed. Safe to read from any thread.
+        """
+
+        return (self.q.state, self.pl.state)
+
+    def peek_next_ended(self):
+        """Returns the song next_ended() would switch to, without switching.
+
+        Raises NotImplementedError if the play order can't tell in advance.
+        """
+
+        if self.q.is_empty():
+            return self.pl.peek_next_ended()
+        else:
+            return self.q.peek_next_ended()
+
     @property
     def current(self):
         """The current song or None"""
@@ -53,6 +78,7 @@ class PlaylistMux(object):
         else:
             self.q.sourced = False
             self.pl.sourced = True
+        self._player.source_changed()
 
     def next(self):
         """Switch to the next song"""
@@ -117,10 +143,13 @@ class PlaylistMux(object):
             q.remove(iter_)
 
 
-class TrackCurrentModel(ObjectStore):
+class TrackCurrentMixin(object):
+    """Keeps track of the current song, for models providing the
+    ObjectStore API.
+    """
 
     def __init__(self, *args, **kwargs):
-        super(TrackCurrentModel, self).__init__(*args, **kwargs)
+        super(TrackCurrentMixin, self).__init__(*args, **kwargs)
         self.__iter = None
 
     last_current = None
@@ -135,13 +164,17 @@ class TrackCurrentModel(ObjectStore):
 
         print_d("Setting %d songs." % len(songs))
 
-        oldsong = self.last_current
-        for iter_, song in itertools.izip(self.iter_append_many(songs), songs):
-            if song is oldsong:
-                self.__iter = iter_
+        self.__iter = self._append_find(songs, self.last_current)
 
         print_d("Done filling model.")
 
+    def _append_find(self, songs, song):
+        """Append songs and return the iter of the last occurrence of song
+        or None.
+        """
+
+        raise NotImplementedError
+
     def get(self):
         """A list of all contained songs"""
 
@@ -207,18 +240,56 @@ class TrackCurrentModel(ObjectStore):
     def remove(self, iter_):
         if self.__iter and self[iter_].path == self[self.__iter].path:
             self.__iter = None
-        super(TrackCurrentModel, self).remove(iter_)
+        super(TrackCurrentMixin, self).remove(iter_)
 
     def clear(self):
         self.__iter = None
-        super(TrackCurrentModel, self).clear()
+        super(TrackCurrentMixin, self).clear()
 
     def __contains__(self, song):
         return bool(self.find(song))
 
 
-class PlaylistModel(TrackCurrentModel):
-    """A play list model for song lists"""
+class TrackCurrentModel(TrackCurrentMixin, ObjectStore):
+
+    def _append_find(self, songs, song):
+        found = None
+        iters = self.iter_append_many(songs)
+        for iter_, value in itertools.izip(iters, songs):
+            if value is song:
+                found = iter_
+        return found
+
+
+class LazyTrackCurrentModel(TrackCurrentMixin, ObjectListModel):
+    """Like TrackCurrentModel, but based on ObjectListModel, which makes
+    setting large amounts of songs cheap.
+    """
+
+    def _append_find(self, songs, song):
+        self.append_many(songs)
+        for index in xrange(len(songs) - 1, -1, -1):
+            if songs[index] is song:
+                return self.iter_nth_child(None, index)
+
+    def find(self, song):
+        if self.current == song:
+            return self.current_iter
+
+        for index, value in enumerate(self.itervalues()):
+            if value == song:
+                return self.iter_nth_child(None, index)
+
+    def find_all(self, songs):
+        songs = set(songs)
+        nth_child = self.iter_nth_child
+        return [nth_child(None, index)
+                for index, value in enumerate(self.itervalues())
+                if value in songs]
+
+
+class PlaylistMixin(TrackCurrentMixin):
+    """Play order handling for song list models"""
 
     order = None
     """The active play order"""
@@ -226,37 +297,73 @@ class PlaylistModel(TrackCurrentModel):
     repeat = False
     """If the playlist should be repeated after it ended"""
 
+    rows_changed_func = None
+    """Called without arguments after rows got inserted, removed or
+    reordered, or the model content got replaced by set()
+    """
+
     sourced = False
     """True in case this model is the source of the currently playing song"""
 
     def __init__(self):
-        super(PlaylistModel, self).__init__(object)
+        super(PlaylistMixin, self).__init__(object)
         self.order = ORDERS[0](self)
+        self._generation = 0
 
         # The playorder plugins use paths atm to remember songs so
         # we need to reset them if the paths change somehow.
         self.__sigs = []
         for sig in ['row-deleted', 'row-inserted', 'rows-reordered']:
-            s = self.connect(sig, lambda pl, *x: self.order.reset(pl))
+            s = self.connect(sig, lambda pl, *x: self.__rows_changed())
             self.__sigs.append(s)
+        s = self.connect('row-changed',
+                         lambda pl, path, it: self.order.changed(pl, it))
+        self.__sigs.append(s)
+
+    def __rows_changed(self):
+        self._generation += 1
+        self.order.reset(self)
+        if self.rows_changed_func is not None:
+            self.rows_changed_func()
+
+    @property
+    def state(self):
+        """A value which changes whenever the song next_ended() would
+        switch to might have changed. Safe to read from any thread.
+        """
+
+        return (self._generation, self.order, self.repeat)
 
     def next(self):
         """Switch to the next song"""
 
         iter_ = self.current_iter
         self.current_iter = self.order.next_explicit(self, iter_)
+        self._generation += 1
 
     def next_ended(self):
         """Switch to the next song (action comes from the user)"""
 
         iter_ = self.current_iter
         self.current_iter = self.order.next_implicit(self, iter_)
+        self._generation += 1
+
+    def peek_next_ended(self):
+        """Returns the song next_ended() would switch to, without switching.
+
+        Raises NotImplementedError if the play order can't tell in advance.
+        """
+
+        iter_ = self.order.peek_implicit(self, self.current_iter)
+        if iter_ is not None:
+            return self.get_value(iter_)
 
     def previous(self):
         """Go to the previous song"""
 
         iter_ = self.current_iter
         self.current_iter = self.order.previous_explicit(self, iter_)
+        self._generation += 1
 
     def go_to(self, song_or_iter, explicit=False, source=None):
         """Switch the current active song to song.
@@ -285,6 +392,7 @@ class PlaylistModel(TrackCurrentModel):
             self.current_iter = self.order.set_explicit(self, iter_)
         else:
             self.current_iter = self.order.set_implicit(self, iter_)
+        self._generation += 1
 
         return self.current_iter
 
@@ -292,11 +400,14 @@ class PlaylistModel(TrackCurrentModel):
         """Clear the model and add the passed songs"""
 
         self.order.reset(self)
+        self._generation += 1
         for signal_id in self.__sigs:
             self.handler_block(signal_id)
-        super(PlaylistModel, self).set(songs)
+        super(PlaylistMixin, self).set(songs)
         for signal_id in self.__sigs:
             self.handler_unblock(signal_id)
+        if self.rows_changed_func is not None:
+            self.rows_changed_func()
 
     def reset(self):
         """Switch to the first song"""
@@ -305,3 +416,13 @@ class PlaylistModel(TrackCurrentModel):
         self.order.reset(self)
         if not self.is_empty():
             self.next()
+
+
+class PlaylistModel(PlaylistMixin, TrackCurrentModel):
+    """A play list model for song lists"""
+
+
+class LazyPlaylistModel(PlaylistMixin, LazyTrackCurrentModel):
+    """A play list model for song lists which doesn't create a GTK row
+    for each song.
+    """
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from ._query import Query, QueryType
+from ._index import QueryIndex
 
 
-Query, QueryType
+Query, QueryType, QueryIndex
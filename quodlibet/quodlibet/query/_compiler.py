@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# Copyright 2015 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+import operator
+
+from . import _match as match
+
+
+OPERATORS = {
+    operator.lt: "<",
+    operator.le: "<=",
+    operator.gt: ">",
+    operator.ge: ">=",
+    operator.eq: "==",
+    operator.ne: "!=",
+}
+
+
+def _cost(node):
+    """A rough estimate of how expensive it is to evaluate a node"""
+
+    if isinstance(node, match.True_):
+        return 0
+    elif isinstance(node, match.Numcmp):
+        # song(key) is slower than a plain dict lookup
+        return 3
+    elif isinstance(node, match.Tag):
+        cost = 0
+        for name in node.names:
+            if name[:1] == "~" or name == "filename":
+                cost += 5
+            else:
+                cost += 2
+        pattern = getattr(node.res, "pattern", None)
+        if pattern is None:
+            cost *= 2
+        else:
+            cost += len(pattern) // 50
+        return cost
+    elif isinstance(node, match.FoldedTag):
+        return sum(5 if n[:1] == "~" or n == "filename" else 2
+                   for n in node.names)
+    elif isinstance(node, (match.Inter, match.Union)):
+        return sum(map(_cost, node.res))
+    elif isinstance(node, match.Neg):
+        return _cost(node.res)
+    return 10
+
+
+class QueryCompiler(object):
+    """Compiles a match tree into a single function behaving like
+    the tree's search() method.
+
+    Tag values needed by multiple nodes get fetched only once, regex
+    search methods get pre-bound and the children of intersections and
+    unions get evaluated cheapest first.
+    """
+
+    def __init__(self, root):
+        self.__root = root._unpack()
+
+    def compile(self):
+        """Returns the search function"""
+
+        scope = {
+            "u": unicode,
+            "t": match.get_tag_text,
+            "d": match.cached_fold,
+        }
+        content = [
+            "def f(s):",
+            "  g = s.get"]
+        for line in self.__node(self.__root, "m", {}, scope):
+            content.append("  " + line)
+        content.append("  return m")
+        code = "\n".join(content)
+
+        exec compile(code, "<query>", "exec") in scope
+        return scope["f"]
+
+    def __bind(self, scope, obj, prefix):
+        var = "%s%d" % (prefix, len(scope))
+        scope[var] = obj
+        return var
+
+    def __get_text(self, text, values, name):
+        key = "t" + name
+        if key not in values:
+            var = values[key] = "v%d" % len(values)
+            if name[:1] == "~" or name == "filename":
+                text.append("%s = t(s, %r)" % (var, name))
+            else:
+                text.append("%s = g(%r)" % (var, name))
+                text.append("if %s is None:" % var)
+                text.append("  %s = g(%r, u'')" % (var, "~" + name))
+                text.append("%s = u(%s)" % (var, var))
+        return values[key]
+
+    def __get_number(self, text, values, key):
+        key = "n" + key
+        if key not in values:
+            var = values[key] = "v%d" % len(values)
+            text.append("%s = s(%r, None)" % (var, key[1:]))
+        return values[key]
+
+    def __node(self, node, target, values, scope):
+        """Returns lines which assign the result for `node` to `target`.
+
+        `values` maps already fetched tag values to variable names and
+        gets updated, `scope` maps global names to objects.
+        """
+
+        text = []
+        node = node._unpack()
+        if isinstance(node, match.True_):
+            text.append("%s = True" % target)
+        elif isinstance(node, (match.Tag, match.FoldedTag)):
+            if isinstance(node, match.FoldedTag):
+                needle = self.__bind(scope, node.text, "k")
+                check = "%s = %s in d(%%s)" % (target, needle)
+            else:
+                func = self.__bind(scope, node.res.search, "r")
+                check = "%s = %s(%%s)" % (target, func)
+                if hasattr(node.res, "pattern"):
+                    # a regex, returns a match object or None
+                    check += " is not None"
+
+            indent = ""
+            names = sorted(node.names, key=lambda n: n[:1] == "~")
+            for i, name in enumerate(names):
+                if i:
+                    text.append(indent + "if not %s:" % target)
+                    indent += "  "
+                    values = dict(values)
+                lines = []
+                var = self.__get_text(lines, values, name)
+                lines.append(check % var)
+                text.extend(indent + l for l in lines)
+        elif isinstance(node, match.Numcmp):
+            var = self.__get_number(text, values, node.key)
+            value = self.__bind(scope, node.value, "k")
+            op = OPERATORS.get(node.op)
+            if op is None:
+                op = self.__bind(scope, node.op, "o")
+                text.append("%s = %s is not None and %s(round(%s, 2), %s)" % (
+                    target, var, op, var, value))
+            else:
+                text.append("%s = %s is not None and round(%s, 2) %s %s" % (
+                    target, var, var, op, value))
+        elif isinstance(node, match.Neg):
+            text.extend(self.__node(node.res, target, values, scope))
+            text.append("%s = not %s" % (target, target))
+        elif isinstance(node, (match.Inter, match.Union)):
+            is_inter = isinstance(node, match.Inter)
+            if not node.res:
+                text.append("%s = %r" % (target, is_inter))
+            if is_inter:
+                cond = "if %s:" % target
+            else:
+                cond = "if not %s:" % target
+            indent = ""
+            for i, child in enumerate(sorted(node.res, key=_cost)):
+                if i:
+                    text.append(indent + cond)
+                    indent += "  "
+                    values = dict(values)
+                for line in self.__node(child, target, values, scope):
+                    text.append(indent + line)
+        else:
+            func = self.__bind(scope, node.search, "q")
+            text.append("%s = %s(s)" % (target, func))
+        return text
+
+
+def compile_query(node):
+    """Returns a function behaving like node.search, or node.search
+    itself if compiling fails.
+    """
+
+    try:
+        return QueryCompiler(node).compile()
+    except (SyntaxError, RuntimeError, MemoryError):
+        return node._unpack().search
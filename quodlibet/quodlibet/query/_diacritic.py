@@ -27,7 +27,7 @@ import sre_parse
 import unicodedata
 import sys
 
-from quodlibet.util import re_escape
+from quodlibet.util import re_escape, SortKeyCache
 
 
 _DIACRITIC_CACHE = {
@@ -371,3 +371,71 @@ def re_add_variants(text):
     assert isinstance(text, unicode)
 
     return re_replace_literals(text, _mapping)
+
+
+def _generate_fold_table(mapping):
+    """Returns a unicode.translate() table which maps lower case
+    variants to the lower case character they are a variant of.
+
+    Variants of more than one character are left alone, unless all but
+    one of those are variants themselves ("ǿ" is a variant of "ø"
+    and "o", but "ø" is one of "o").
+    """
+
+    bases = {}
+    for char, variants in mapping.iteritems():
+        for variant in variants:
+            bases.setdefault(variant.lower(), set()).add(char.lower())
+
+    table = {}
+    for variant, chars in bases.iteritems():
+        if len(chars) > 1:
+            chars = {c for c in chars if c not in bases}
+        if len(chars) == 1:
+            table[ord(variant)] = chars.pop()
+    return table
+
+
+_fold_table = _generate_fold_table(_mapping)
+_foldable = {}
+
+
+def fold(text):
+    """Returns the text lower cased and with all characters which have a
+    diacritic mark replaced by the character they are a variant of.
+
+    u"Múm" -> u"mum"
+    """
+
+    return text.lower().translate(_fold_table)
+
+
+cached_fold = SortKeyCache(fold, max_size=100000)
+"""Like fold(), but remembers the results for recently used texts"""
+
+
+def _can_fold_char(char):
+    res = _foldable.get(char)
+    if res is None:
+        lower = char.lower()
+        # what the regex created by re_add_variants() would match
+        matches = {v.lower() for v in char + _mapping.get(char, u"")}
+        # what matches in folded text
+        folded = {lower}
+        for variant, base in _fold_table.iteritems():
+            if base == lower:
+                folded.add(unichr(variant))
+        res = _foldable[char] = \
+            fold(char) == lower and matches == folded
+    return res
+
+
+def can_fold(text):
+    """Whether searching the lower cased text in folded text gives the
+    same result as a case insensitive search using
+    re_add_variants(re_escape(text)).
+    """
+
+    assert isinstance(text, unicode)
+
+    return all(_can_fold_char(c) for c in text)
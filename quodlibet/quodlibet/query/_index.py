@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+# Copyright 2015 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+import re
+import sre_parse
+import operator
+from bisect import bisect_left, bisect_right
+
+from . import _match as match
+from ._compiler import compile_query
+from ._diacritic import fold
+
+
+VOLATILE_KEYS = ["~rating", "~#rating", "~lyrics", "~playlists"]
+"""Tags which depend on more than the song content and can't be indexed"""
+
+_NUMERIC_OPS = (operator.lt, operator.le, operator.gt, operator.ge,
+                operator.eq, operator.ne)
+"""Comparisons _NumericIndex can answer"""
+
+
+def get_literal(regex):
+    """Returns (literal, exact) if the compiled regex only matches
+    a case insensitive literal at the start of a line (exact if it also
+    has to match up to the end of the line) or None otherwise.
+    """
+
+    if not hasattr(regex, "pattern"):
+        return
+    flags = regex.flags
+    needed = re.IGNORECASE | re.UNICODE
+    if flags & re.LOCALE or flags & needed != needed:
+        return
+
+    try:
+        parsed = list(sre_parse.parse(regex.pattern, flags))
+    except (re.error, TypeError):
+        return
+
+    if not parsed or parsed[0] != (sre_parse.AT, sre_parse.AT_BEGINNING):
+        return
+    parsed = parsed[1:]
+    exact = bool(parsed) and parsed[-1] == (sre_parse.AT, sre_parse.AT_END)
+    if exact:
+        parsed = parsed[:-1]
+
+    chars = []
+    for op, av in parsed:
+        if op != sre_parse.LITERAL:
+            return
+        chars.append(unichr(av))
+    literal = u"".join(chars)
+    if u"\n" in literal:
+        return
+    return literal.lower(), exact
+
+
+class _TextIndex(object):
+    """text -> songs for one tag"""
+
+    def __init__(self, name):
+        self.name = name
+        self.songs = {}
+        self.texts = {}
+        self._sorted = None
+        # text -> folded text, filled on demand
+        self._folded = {}
+
+    def add(self, song):
+        text = match.get_tag_text(song, self.name)
+        self.texts[song] = text
+        entry = self.songs.get(text)
+        if entry is None:
+            self.songs[text] = song
+            self._sorted = None
+        elif isinstance(entry, set):
+            entry.add(song)
+        else:
+            self.songs[text] = {entry, song}
+
+    def remove(self, song):
+        text = self.texts.pop(song)
+        entry = self.songs[text]
+        if isinstance(entry, set):
+            entry.discard(song)
+            if len(entry) == 1:
+                self.songs[text] = entry.pop()
+        else:
+            del self.songs[text]
+            self._folded.pop(text, None)
+            self._sorted = None
+
+    def _get_sorted(self):
+        """Returns a sorted list of lower cased single line texts, their
+        original texts and a list of all multi line ones.
+        """
+
+        if self._sorted is None:
+            single = []
+            multi = []
+            for text in self.songs:
+                if u"\n" in text:
+                    multi.append(text)
+                else:
+                    single.append((text.lower(), text))
+            single.sort()
+            lower = [l for l, t in single]
+            texts = [t for l, t in single]
+            self._sorted = (lower, texts, multi)
+        return self._sorted
+
+    def search_texts(self, res):
+        """Returns all texts matching `res`"""
+
+        literal = get_literal(res)
+        if literal is None:
+            search = res.search
+            return [t for t in self.songs if search(t)]
+
+        literal, exact = literal
+        lower, texts, multi = self._get_sorted()
+        start = bisect_left(lower, literal)
+        if exact:
+            end = bisect_right(lower, literal, start)
+        else:
+            end = start
+            while end < len(lower) and lower[end].startswith(literal):
+                end += 1
+        search = res.search
+        return texts[start:end] + [t for t in multi if search(t)]
+
+    def search_folded(self, needle):
+        """Returns all songs whose folded text contains needle"""
+
+        folded = self._folded
+        if len(folded) != len(self.songs):
+            for text in self.songs:
+                if text not in folded:
+                    folded[text] = fold(text)
+        return self._get_songs(
+            [t for t, f in folded.iteritems() if needle in f])
+
+    def search(self, res):
+        return self._get_songs(self.search_texts(res))
+
+    def _get_songs(self, texts):
+        result = set()
+        songs = self.songs
+        for text in texts:
+            entry = songs[text]
+            if isinstance(entry, set):
+                result |= entry
+            else:
+                result.add(entry)
+        return result
+
+
+class _NumericIndex(object):
+    """song -> value for one numeric tag with a sorted view"""
+
+    def __init__(self, key):
+        self.key = key
+        self.values = {}
+        self._sorted = None
+
+    def add(self, song):
+        num = song(self.key, None)
+        if num is not None:
+            value = self.values[song] = round(num, 2)
+            if self._sorted is not None:
+                values, songs = self._sorted
+                pos = bisect_right(values, value)
+                values.insert(pos, value)
+                songs.insert(pos, song)
+
+    def remove(self, song):
+        value = self.values.pop(song, None)
+        if value is not None and self._sorted is not None:
+            values, songs = self._sorted
+            pos = bisect_left(values, value)
+            while songs[pos] is not song:
+                pos += 1
+            del values[pos]
+            del songs[pos]
+
+    def invalidate(self):
+        """Drops the sorted view, so it gets rebuilt on the next search"""
+
+        self._sorted = None
+
+    def _get_sorted(self):
+        if self._sorted is None:
+            items = sorted(self.values.iteritems(),
+                           key=operator.itemgetter(1))
+            self._sorted = ([v for s, v in items], [s for s, v in items])
+        return self._sorted
+
+    def search(self, op, value):
+        values, songs = self._get_sorted()
+        if op is operator.lt:
+            return set(songs[:bisect_left(values, value)])
+        elif op is operator.le:
+            return set(songs[:bisect_right(values, value)])
+        elif op is operator.gt:
+            return set(songs[bisect_right(values, value):])
+        elif op is operator.ge:
+            return set(songs[bisect_left(values, value):])
+
+        start = bisect_left(values, value)
+        end = bisect_right(values, value, start)
+        if op is operator.eq:
+            return set(songs[start:end])
+        elif op is operator.ne:
+            return set(songs[:start]).union(songs[end:])
+
+
+class QueryIndex(object):
+    """An inverted index over songs for evaluating queries without
+    testing every song.
+
+    Text tags map each distinct tag text to the songs having it, so a
+    regex only has to be tested once per distinct text (literal
+    and prefix matches use a sorted array instead). Numeric tags keep a
+    sorted array of values, so comparisons become a bisect.
+
+    The index for a tag gets created the first time a query needs it.
+    Parts of the query which can't be resolved with the index get
+    tested against the remaining songs.
+
+    The owner has to call add(), remove() and change() to keep it
+    up to date.
+    """
+
+    BULK_SIZE = 100
+    """For more changed songs than this the sorted numeric values get
+    rebuilt on the next search instead of being updated song by song"""
+
+    def __init__(self, songs=None):
+        self._songs = set()
+        self._text = {}
+        self._numeric = {}
+        if songs is not None:
+            self.add(songs)
+
+    def __len__(self):
+        return len(self._songs)
+
+    def clear(self):
+        self._songs.clear()
+        self._text.clear()
+        self._numeric.clear()
+
+    def add(self, songs):
+        songs = [s for s in songs if s not in self._songs]
+        self._songs.update(songs)
+        self._check_bulk(songs)
+        for index in self._indices():
+            for song in songs:
+                index.add(song)
+
+    def remove(self, songs):
+        songs = [s for s in songs if s in self._songs]
+        self._songs.difference_update(songs)
+        self._check_bulk(songs)
+        for index in self._indices():
+            for song in songs:
+                index.remove(song)
+
+    def change(self, songs):
+        songs = [s for s in songs if s in self._songs]
+        self._check_bulk(songs)
+        for index in self._indices():
+            for song in songs:
+                index.remove(song)
+                index.add(song)
+
+    def _check_bulk(self, songs):
+        if len(songs) > self.BULK_SIZE:
+            for index in self._numeric.itervalues():
+                index.invalidate()
+
+    def _indices(self):
+        return self._text.values() + self._numeric.values()
+
+    def _get_text_index(self, name):
+        index = self._text.get(name)
+        if index is None:
+            index = self._text[name] = _TextIndex(name)
+            for song in self._songs:
+                index.add(song)
+        return index
+
+    def _get_numeric_index(self, key):
+        index = self._numeric.get(key)
+        if index is None:
+            index = self._numeric[key] = _NumericIndex(key)
+            for song in self._songs:
+                index.add(song)
+        return index
+
+    def _can_resolve(self, node):
+        """If _resolve() will return a result for the node"""
+
+        node = node._unpack()
+
+        if isinstance(node, match.True_):
+            return True
+        elif isinstance(node, match.Inter):
+            return any(map(self._can_resolve, node.res))
+        elif isinstance(node, match.Union):
+            return all(map(self._can_resolve, node.res))
+        elif isinstance(node, match.Neg):
+            return self._can_resolve(node.res)
+        elif isinstance(node, (match.Tag, match.FoldedTag)):
+            return not set(node.names) & set(VOLATILE_KEYS)
+        elif isinstance(node, match.Numcmp):
+            return node.key not in VOLATILE_KEYS
+        return False
+
+    def can_resolve(self, query):
+        """If search() can answer the query using the index alone,
+        without testing songs against (parts of) the query.
+        """
+
+        node = query._unpack()
+
+        if isinstance(node, (match.Inter, match.Union)):
+            return bool(node.res) and all(map(self.can_resolve, node.res))
+        elif isinstance(node, match.Neg):
+            return self.can_resolve(node.res)
+        elif isinstance(node, match.Numcmp):
+            return node.op in _NUMERIC_OPS and self._can_resolve(node)
+        return self._can_resolve(node)
+
+    def _resolve(self, node):
+        """Returns the set of matching songs or None if the node
+        can't be resolved using the index.
+        """
+
+        node = node._unpack()
+
+        if not self._can_resolve(node):
+            return
+        elif isinstance(node, match.True_):
+            return set(self._songs)
+        elif isinstance(node, match.Inter):
+            resolved = []
+            residual = []
+            for child in node.res:
+                if self._can_resolve(child):
+                    resolved.append(self._resolve(child))
+                else:
+                    residual.append(child)
+            resolved.sort(key=len)
+            result = resolved[0].intersection(*resolved[1:])
+            for child in residual:
+                result = set(filter(compile_query(child), result))
+            return result
+        elif isinstance(node, match.Union):
+            result = set()
+            for child in node.res:
+                result |= self._resolve(child)
+            return result
+        elif isinstance(node, match.Neg):
+            return self._songs - self._resolve(node.res)
+        elif isinstance(node, match.Tag):
+            result = set()
+            for name in node.names:
+                result |= self._get_text_index(name).search(node.res)
+            return result
+        elif isinstance(node, match.FoldedTag):
+            result = set()
+            for name in node.names:
+                result |= self._get_text_index(name).search_folded(node.text)
+            return result
+        elif isinstance(node, match.Numcmp):
+            songs = self._get_numeric_index(node.key).search(
+                node.op, node.value)
+            if songs is None:
+                # unknown operator
+                songs = set(filter(node.search, self._songs))
+            return songs
+
+    def search(self, query):
+        """Returns a list of all indexed songs matching the Query (or any
+        other match tree node).
+        """
+
+        songs = self._resolve(query)
+        if songs is None:
+            return filter(compile_query(query), self._songs)
+        return list(songs)
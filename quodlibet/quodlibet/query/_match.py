@@ -11,6 +11,7 @@ import operator
 
 from quodlibet.util.path import fsdecode
 from quodlibet.util import date_key, validate_query_date, parse_date
+from ._diacritic import cached_fold
 
 
 class error(ValueError):
@@ -174,6 +175,21 @@ class Numcmp(Node):
         self.__ftag = "~#" + self.__tag
         self.__op, self.__value = map_numeric_op(self.__tag, op, value)
 
+    @property
+    def key(self):
+        """The numeric tag, e.g. '~#playcount'"""
+        return self.__ftag
+
+    @property
+    def op(self):
+        """The comparison function"""
+        return self.__op
+
+    @property
+    def value(self):
+        """The value the tag value gets compared to"""
+        return self.__value
+
     def search(self, data):
         num = data(self.__ftag, None)
         if num is not None:
@@ -227,6 +243,11 @@ class Tag(Node):
             else:
                 self.__names.append(name)
 
+    @property
+    def names(self):
+        """All (normalized) tag names which get searched"""
+        return self.__names + self.__intern + self.__fs
+
     def search(self, data):
         for name in self.__names:
             val = data.get(name)
@@ -267,6 +288,63 @@ class Tag(Node):
         return Union([self, other])
 
 
+class FoldedTag(Node):
+    """Like a Tag with a /text/d regex, but searches the lower case text
+    in the folded (see _diacritic.fold) tag values, which is faster.
+    """
+
+    def __init__(self, names, text):
+        # for normalizing the names
+        self.__tag = Tag(names, None)
+        self.text = text.lower()
+
+    @property
+    def names(self):
+        """All (normalized) tag names which get searched"""
+        return self.__tag.names
+
+    def search(self, data):
+        text = self.text
+        for name in self.names:
+            if text in cached_fold(get_tag_text(data, name)):
+                return True
+        return False
+
+    def __repr__(self):
+        return "<FoldedTag names=%r, text=%r>" % (self.names, self.text)
+
+    def __and__(self, other):
+        other = other._unpack()
+        if isinstance(other, True_):
+            return other.__and__(self)
+        return Inter([self, other])
+
+    def __or__(self, other):
+        other = other._unpack()
+        if isinstance(other, True_):
+            return other.__or__(self)
+        return Union([self, other])
+
+
+def get_tag_text(data, name):
+    """Returns the text Tag.search() matches against for the normalized
+    tag `name`.
+    """
+
+    if name[:1] == "~":
+        if name in FS_KEYS:
+            return fsdecode(data(name))
+        return unicode(data(name))
+
+    val = data.get(name)
+    if val is None:
+        if name == "filename":
+            val = fsdecode(data.get("~filename", ""))
+        else:
+            val = data.get("~" + name, "")
+    return unicode(val)
+
+
 def map_numeric_op(tag, op, value, time_=None):
     """Maps a human readable numeric comparison to something we can use.
 
@@ -9,6 +9,9 @@
 from . import _match as match
 from ._match import error, Node
 from ._parser import QueryLexer, QueryParser
+from ._compiler import compile_query
+from ._refine import implies, depends_on_time
+from ._diacritic import can_fold
 from quodlibet.util import re_escape, enum, cached_property
 
 
@@ -74,7 +77,8 @@ class Query(Node):
 
         # normal string, put it in a intersection to get a value list
         if not set("#=").intersection(string):
-            parts = ["/%s/" % re_escape(s) for s in string.split()]
+            words = string.split()
+            parts = ["/%s/" % re_escape(s) for s in words]
             if dumb_match_diacritics:
                 parts = [p + "d" for p in parts]
             string = "&(" + ",".join(parts) + ")"
@@ -84,13 +88,43 @@ class Query(Node):
                 self.type = QueryType.TEXT
                 self._match = QueryParser(
                     QueryLexer(string)).StartStarQuery(star)
-                return
             except error:
                 pass
+            else:
+                if dumb_match_diacritics:
+                    self._match = self._fold_words(self._match, words, star)
+                return
 
         self.type = QueryType.VALID
         self._match = QueryParser(QueryLexer(string)).StartQuery()
 
+    @staticmethod
+    def _fold_words(node, words, star):
+        """Replaces the tags matching words with diacritic variants by
+        FoldedTag where the result doesn't change.
+        """
+
+        if isinstance(node, match.Inter):
+            tags = node.res
+        elif isinstance(node, match.Tag):
+            # a single word doesn't get an intersection
+            tags = [node]
+        else:
+            return node
+
+        if len(tags) != len(words):
+            return node
+
+        res = []
+        for word, tag in zip(words, tags):
+            if can_fold(word):
+                tag = match.FoldedTag(star, word)
+            res.append(tag)
+
+        if len(res) == 1:
+            return res[0]
+        return match.Inter(res)
+
     @classmethod
     def StrictQueryMatcher(cls, string):
         """Returns a Matcher for a strict, valid (non-freetext) Query,
@@ -110,8 +144,30 @@ class Query(Node):
         return self._match.search
 
     @cached_property
-    def filter(self):
-        return self._match.filter
+    def compiled(self):
+        """A function returning the same as search(), but compiled into
+        a single Python function. Faster if used for many songs.
+        """
+
+        return compile_query(self._match)
+
+    def filter(self, sequence):
+        return filter(self.compiled, sequence)
+
+    def is_refinement_of(self, other):
+        """Whether all songs matching this query are known to also match
+        `other` (a Query or match node), for example "beatl" and "beat".
+
+        False if it can't be determined.
+        """
+
+        return implies(self._match, other)
+
+    @cached_property
+    def depends_on_time(self):
+        """If the result can change over time, even if the songs don't"""
+
+        return depends_on_time(self._match)
 
     @classmethod
     def is_valid(cls, string):
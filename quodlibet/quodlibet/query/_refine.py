@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# Copyright 2015 Quod Libet contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation
+
+import re
+import operator
+import sre_parse
+
+from . import _match as match
+
+
+_SINGLE_CHAR = (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN,
+                sre_parse.ANY)
+"""Regex tokens which always match exactly one character"""
+
+_LOWER = (operator.gt, operator.ge)
+_UPPER = (operator.lt, operator.le)
+
+
+def _unpack(node):
+    if isinstance(node, match.Node):
+        return node._unpack()
+    return node
+
+
+def _regex_implies(regex, other):
+    """If `other` is a sequence of single character tokens, checks if it
+    is part of the top level token sequence of `regex`.
+    """
+
+    if regex.flags != other.flags:
+        return False
+    if regex.pattern == other.pattern:
+        return True
+
+    try:
+        tokens = list(sre_parse.parse(regex.pattern, regex.flags))
+        other_tokens = list(sre_parse.parse(other.pattern, other.flags))
+    except (re.error, TypeError):
+        return False
+
+    if not other_tokens:
+        return True
+
+    for op, av in other_tokens:
+        if op not in _SINGLE_CHAR:
+            return False
+
+    count = len(other_tokens)
+    for i in xrange(len(tokens) - count + 1):
+        if tokens[i:i + count] == other_tokens:
+            return True
+    return False
+
+
+def _numcmp_implies(node, other):
+    if node.key != other.key:
+        return False
+
+    op, value = node.op, node.value
+    other_op, other_value = other.op, other.value
+    if op is operator.eq:
+        return bool(other_op(value, other_value))
+    elif op is other_op and value == other_value:
+        return True
+
+    for ops in (_LOWER, _UPPER):
+        if op in ops and other_op in ops:
+            if value == other_value:
+                # x >= 3 doesn't imply x > 3, the other way around it does
+                return op not in (operator.ge, operator.le) or \
+                    other_op in (operator.ge, operator.le)
+            return bool(other_op(value, other_value))
+    return False
+
+
+def implies(node, other):
+    """Returns True if everything matching `node` is known to also match
+    `other`. False means it might not.
+
+    Works for query nodes as well as for the regexes in them.
+    """
+
+    node = _unpack(node)
+    other = _unpack(other)
+
+    if node is other or isinstance(other, match.True_):
+        return True
+    elif isinstance(other, match.Inter):
+        return all(implies(node, o) for o in other.res)
+    elif isinstance(node, match.Union):
+        return all(implies(n, other) for n in node.res)
+    elif isinstance(node, match.Inter) and \
+            any(implies(n, other) for n in node.res):
+        return True
+    elif isinstance(other, match.Union) and \
+            any(implies(node, o) for o in other.res):
+        return True
+    elif isinstance(node, match.Neg) and isinstance(other, match.Neg):
+        return implies(other.res, node.res)
+    elif isinstance(node, match.Tag) and isinstance(other, match.Tag):
+        return set(node.names) <= set(other.names) and \
+            implies(node.res, other.res)
+    elif isinstance(node, match.FoldedTag) and \
+            isinstance(other, match.FoldedTag):
+        return set(node.names) <= set(other.names) and \
+            other.text in node.text
+    elif isinstance(node, match.Numcmp) and isinstance(other, match.Numcmp):
+        return _numcmp_implies(node, other)
+    elif hasattr(node, "pattern") and hasattr(other, "pattern"):
+        return _regex_implies(node, other)
+    return False
+
+
+def depends_on_time(node):
+    """Returns True if the result of the query changes over time, because
+    it compares timestamps like ~#lastplayed (the reference time gets
+    fixed when the query is parsed).
+    """
+
+    node = _unpack(node)
+    if isinstance(node, match.Numcmp):
+        return node.key[2:] in match.TIME_KEYS
+    elif isinstance(node, (match.Inter, match.Union)):
+        return any(depends_on_time(n) for n in node.res)
+    elif isinstance(node, match.Neg):
+        return depends_on_time(node.res)
+    return False
@@ -7,6 +7,7 @@
 # published by the Free Software Foundation
 
 import os
+import cPickle as pickle
 import random
 import re
 import ctypes
@@ -31,7 +32,7 @@ from quodlibet.util.path import iscommand, is_fsnative
 from quodlibet.util.string.titlecase import title
 
 from quodlibet.const import SUPPORT_EMAIL, COPYRIGHT
-from quodlibet.util.dprint import print_d, print_
+from quodlibet.util.dprint import print_d, print_, print_w
 from .misc import environ, argv, cached_func, get_locale_encoding, \
     get_fs_encoding
 from .environment import *
@@ -418,13 +419,115 @@ def _split_numeric_sortkey(s, limit=10,
             _split_numeric_sortkey(s[end:], limit - 1))
 
 
-def human_sort_key(s, normalize=unicodedata.normalize):
+def _human_sort_key(s, normalize=unicodedata.normalize):
     if not isinstance(s, unicode):
         s = s.decode("utf-8")
     s = normalize("NFD", s.lower())
     return s and _split_numeric_sortkey(s)
 
 
+class SortKeyCache(object):
+    """A bounded cache for sort keys of strings.
+
+    The keys are kept in two generations: once the newer one is full it
+    replaces the older one, so at most `max_size` keys are kept and keys
+    which are in use survive.
+    """
+
+    def __init__(self, func, max_size=200000):
+        self._func = func
+        self._max_gen = max(max_size // 2, 1)
+        self._new = {}
+        self._old = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._new) + len(self._old)
+
+    def __call__(self, text):
+        try:
+            key = self._new[text]
+        except KeyError:
+            try:
+                key = self._old[text]
+            except KeyError:
+                self.misses += 1
+                key = self._func(text)
+            else:
+                self.hits += 1
+            if len(self._new) >= self._max_gen:
+                self._old = self._new
+                self._new = {}
+            self._new[text] = key
+        else:
+            self.hits += 1
+        return key
+
+    def clear(self):
+        """Remove all keys and reset the statistics"""
+
+        self._new.clear()
+        self._old.clear()
+        self.hits = self.misses = 0
+
+    def get_stats(self):
+        """Returns a dict containing the number of hits, misses and
+        cached keys.
+        """
+
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+    def load(self, filename):
+        """Adds the keys stored in `filename` using save()"""
+
+        try:
+            with open(filename, "rb") as h:
+                keys = pickle.load(h)
+        except (EnvironmentError, EOFError, pickle.UnpicklingError):
+            return
+        except Exception:
+            print_exc()
+            return
+
+        if not isinstance(keys, dict):
+            # outdated or not written by us
+            return
+
+        keys.update(self._old)
+        self._old = keys
+
+    def save(self, filename):
+        """Stores up to `max_size` / 2 of the most recently used keys
+        in `filename`.
+        """
+
+        keys = dict(self._new)
+        for text, key in self._old.iteritems():
+            if len(keys) >= self._max_gen:
+                break
+            keys.setdefault(text, key)
+
+        try:
+            with atomic_save(filename, ".tmp", "wb") as h:
+                pickle.dump(keys, h, 2)
+        except EnvironmentError:
+            print_w("Couldn't save sort keys to %r" % filename)
+
+
+sort_key_cache = SortKeyCache(_human_sort_key)
+"""Shared cache for human_sort_key()"""
+
+
+def human_sort_key(s):
+    """Returns a key for sorting strings the way humans would: case
+    insensitive and numbers by value. Results are cached in
+    `sort_key_cache`.
+    """
+
+    return sort_key_cache(s)
+
+
 def website(site):
     """Open the given URL in the user's default browser"""
 
@@ -249,7 +249,7 @@ class Collection(object):
                     return None
                 return util.format_rating(rating)
             elif key == "cover":
-                return ((self.cover != type(self).cover) and "y") or None
+                return ((self.cover is not None) and "y") or None
             elif numkey == "filesize":
                 size = self.__get_value("~#" + key)
                 return None if size is None else util.format_size(size)
@@ -273,8 +273,38 @@ class Album(Collection):
 
     COVER_SIZE = 48
 
-    cover = None
     scanned = False
+    _cover_key = None
+
+    @property
+    def cover(self):
+        """The pixbuf found by scan_cover() or None.
+
+        The pixbuf is kept in the shared pixbuf cache, if it got removed
+        from there the album has to be scanned again.
+        """
+
+        if self._cover_key is None:
+            return None
+
+        from quodlibet.util.thumbnails import pixbuf_cache
+        pixbuf = pixbuf_cache.get(self._cover_key)
+        if pixbuf is None:
+            self._cover_key = None
+            self.scanned = False
+        return pixbuf
+
+    @cover.setter
+    def cover(self, pixbuf):
+        from quodlibet.util.thumbnails import pixbuf_cache
+        if pixbuf is None:
+            if self._cover_key is not None:
+                pixbuf_cache.set(self._cover_key, None)
+                self._cover_key = None
+            return
+        if self._cover_key is None:
+            self._cover_key = object()
+        pixbuf_cache.set(self._cover_key, pixbuf)
 
     @util.cached_property
     def peoplesort(self):
@@ -7,12 +7,109 @@
 
 import os.path
 import re
+import threading
+import collections
+import cPickle as pickle
 
 from quodlibet.plugins.cover import CoverSourcePlugin
-from quodlibet.util.path import fsdecode
+from quodlibet.util.path import fsdecode, mtime
+from quodlibet.util import atomic_save, print_exc
 from quodlibet import config
 
 
+class CoverPathCache(object):
+    """Remembers which image FilesystemCover picked for a song.
+
+    Entries are only valid as long as the modification times of the
+    directories searched don't change. The least recently used entries
+    get dropped once there are more than `max_size`.
+    """
+
+    def __init__(self, max_size=20000):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns (found, path), path being None if there was no cover"""
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False, None
+            self._entries[key] = entry
+
+        mtimes, path = entry
+        for dir_, dir_mtime in mtimes:
+            if mtime(dir_) != dir_mtime:
+                self.remove(key)
+                return False, None
+        return True, path
+
+    def set(self, key, mtimes, path):
+        """Stores the resulting `path` (or None) for `key`, `mtimes`
+        being (directory, mtime) pairs taken before searching.
+        """
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (tuple(mtimes), path)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def remove(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, dirs):
+        """Removes all entries for songs in `dirs`"""
+
+        dirs = set(dirs)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in dirs]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def load(self, filename):
+        """Adds the entries stored in `filename` using save()"""
+
+        try:
+            with open(filename, "rb") as h:
+                entries = pickle.load(h)
+        except (EnvironmentError, EOFError, pickle.UnpicklingError):
+            return
+        except Exception:
+            print_exc()
+            return
+
+        with self._lock:
+            for key, entry in entries:
+                self._entries.setdefault(key, entry)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def save(self, filename):
+        with self._lock:
+            entries = self._entries.items()
+
+        try:
+            with atomic_save(filename, ".tmp", "wb") as h:
+                pickle.dump(entries, h, 2)
+        except EnvironmentError:
+            print_w("Couldn't save cover paths to %r" % filename)
+
+
+path_cache = CoverPathCache()
+"""Used by FilesystemCover, invalidated through
+CoverManager.cover_changed()"""
+
+
 class EmbedCover(CoverSourcePlugin):
     PLUGIN_ID = "embed-cover"
     PLUGIN_NAME = _("Embed cover")
@@ -64,6 +161,11 @@ class FilesystemCover(CoverSourcePlugin):
     def priority():
         return 0.80
 
+    def _get_key(self):
+        song = self.song
+        return (song("~dirname"), song.get("labelid", ""), song("artist"),
+                song("albumartist"), song("album"))
+
     @property
     def cover(self):
         # TODO: Deserves some refactoring
@@ -78,62 +180,80 @@ class FilesystemCover(CoverSourcePlugin):
             path = os.path.join(base, config.get("albumart", "filename"))
             if os.path.isfile(path):
                 images = [(100, path)]
-        else:
-            get_ext = lambda s: os.path.splitext(s)[1].lstrip('.')
+            return self._open_first(images)
 
-            entries = []
-            try:
-                entries = os.listdir(base)
-            except EnvironmentError:
-                pass
-
-            fns = []
-            for entry in entries:
-                lentry = entry.lower()
-                if get_ext(lentry) in self.cover_exts:
-                    fns.append((None, entry))
-                if lentry in self.cover_subdirs:
-                    subdir = os.path.join(base, entry)
-                    sub_entries = []
-                    try:
-                        sub_entries = os.listdir(subdir)
-                    except EnvironmentError:
-                        pass
-                    for sub_entry in sub_entries:
-                        lsub_entry = sub_entry.lower()
-                        if get_ext(lsub_entry) in self.cover_exts:
-                            fns.append((entry, sub_entry))
-
-            for sub, fn in fns:
-                dec_lfn = fsdecode(fn, False).lower()
-
-                score = 0
-                # check for the album label number
-                labelid = self.song.get("labelid", "").lower()
-                if labelid and labelid in dec_lfn:
-                    score += 20
-
-                # Track-related keywords
-                keywords = [k.lower().strip() for k in [self.song("artist"),
-                            self.song("albumartist"), self.song("album")]
-                            if len(k) > 1]
-                score += 2 * sum(map(dec_lfn.__contains__, keywords))
-
-                # Generic keywords
-                score += 3 * sum(r.search(dec_lfn) is not None
-                                 for r in self.cover_positive_regexes)
-
-                negs = sum(r.search(dec_lfn) is not None
-                           for r in self.cover_negative_regexes)
-                score -= 2 * negs
-                #print("[%s - %s]: Album art \"%s\" scores %d (%s neg)." % (
-                #        self("artist"), self("title"), fn, score, negs))
-                if score > 0:
-                    if sub is not None:
-                        fn = os.path.join(sub, fn)
-                    images.append((score, os.path.join(base, fn)))
-            images.sort(reverse=True)
+        key = self._get_key()
+        found, path = path_cache.get(key)
+        if found:
+            if path is None:
+                return None
+            fileobj = self._open_first([(100, path)])
+            if fileobj is not None:
+                return fileobj
+
+        # take the mtimes first, so changes while searching invalidate
+        mtimes = [(base, mtime(base))]
+        get_ext = lambda s: os.path.splitext(s)[1].lstrip('.')
+
+        entries = []
+        try:
+            entries = os.listdir(base)
+        except EnvironmentError:
+            pass
+
+        fns = []
+        for entry in entries:
+            lentry = entry.lower()
+            if get_ext(lentry) in self.cover_exts:
+                fns.append((None, entry))
+            if lentry in self.cover_subdirs:
+                subdir = os.path.join(base, entry)
+                mtimes.append((subdir, mtime(subdir)))
+                sub_entries = []
+                try:
+                    sub_entries = os.listdir(subdir)
+                except EnvironmentError:
+                    pass
+                for sub_entry in sub_entries:
+                    lsub_entry = sub_entry.lower()
+                    if get_ext(lsub_entry) in self.cover_exts:
+                        fns.append((entry, sub_entry))
+
+        for sub, fn in fns:
+            dec_lfn = fsdecode(fn, False).lower()
+
+            score = 0
+            # check for the album label number
+            labelid = self.song.get("labelid", "").lower()
+            if labelid and labelid in dec_lfn:
+                score += 20
+
+            # Track-related keywords
+            keywords = [k.lower().strip() for k in [self.song("artist"),
+                        self.song("albumartist"), self.song("album")]
+                        if len(k) > 1]
+            score += 2 * sum(map(dec_lfn.__contains__, keywords))
+
+            # Generic keywords
+            score += 3 * sum(r.search(dec_lfn) is not None
+                             for r in self.cover_positive_regexes)
+
+            negs = sum(r.search(dec_lfn) is not None
+                       for r in self.cover_negative_regexes)
+            score -= 2 * negs
+            #print("[%s - %s]: Album art \"%s\" scores %d (%s neg)." % (
+            #        self("artist"), self("title"), fn, score, negs))
+            if score > 0:
+                if sub is not None:
+                    fn = os.path.join(sub, fn)
+                images.append((score, os.path.join(base, fn)))
+        images.sort(reverse=True)
+
+        fileobj = self._open_first(images)
+        path_cache.set(key, mtimes, fileobj and fileobj.name)
+        return fileobj
 
+    def _open_first(self, images):
         for score, path in images:
             # could be a directory
             if not os.path.isfile(path):
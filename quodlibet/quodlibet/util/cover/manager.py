@@ -83,8 +83,21 @@ class CoverManager(GObject.Object):
         to re-fetch the cover and do a display update.
         """
 
+        built_in.path_cache.invalidate(s("~dirname") for s in songs)
         self.emit("cover-changed", songs)
 
+    def load_cache(self, filename):
+        """Loads the paths of local covers found in a previous session,
+        see save_cache()
+        """
+
+        built_in.path_cache.load(filename)
+
+    def save_cache(self, filename):
+        """Saves the paths of the found local covers"""
+
+        built_in.path_cache.save(filename)
+
     def acquire_cover(self, callback, cancellable, song):
         """
         Try to get covers from all cover sources until a cover is found.
@@ -170,17 +183,21 @@ class CoverManager(GObject.Object):
 
         return self.get_cover_many([song])
 
-    def get_cover_many(self, songs):
+    def get_cover_many(self, songs, prefer_embedded=None):
         """Returns a cover file object for many songs or None.
 
         Returns the first found image for a group of songs
-        and respects the prefer_embedded setting. It tries to return the
-        same cover for the same set of songs.
+        and respects the prefer_embedded setting (unless `prefer_embedded`
+        is passed). It tries to return the same cover for the same set
+        of songs.
         """
 
-        prefer_embedded = config.getboolean(
-            "albumart", "prefer_embedded", False)
+        if prefer_embedded is None:
+            prefer_embedded = config.getboolean(
+                "albumart", "prefer_embedded", False)
+        return self._get_cover_many(songs, prefer_embedded)
 
+    def _get_cover_many(self, songs, prefer_embedded):
         get = self.acquire_cover_sync_many
         if prefer_embedded:
             return get(songs, True, False) or get(songs, False, True)
@@ -207,25 +224,34 @@ class CoverManager(GObject.Object):
 
     def get_pixbuf_many_async(self, songs, width, height, cancel, callback):
         """Async variant; callback gets called with a pixbuf or not called
-        in case of an error. cancel is a Gio.Cancellable.
+        in case of an error or if there is no cover. cancel is a
+        Gio.Cancellable.
 
+        Looking up the cover file and loading it happens in a thread pool,
+        requests which get cancelled before they are processed are skipped.
         The callback will be called in the main loop.
         """
 
-        fileobj = self.get_cover_many(songs)
-        if fileobj is None:
-            return
+        songs = list(songs)
+        prefer_embedded = config.getboolean(
+            "albumart", "prefer_embedded", False)
+
+        def get_pixbuf():
+            if cancel.is_cancelled():
+                return
+            fileobj = self._get_cover_many(songs, prefer_embedded)
+            if fileobj is None or cancel.is_cancelled():
+                return
+            return get_thumbnail_from_file(fileobj, (width, height))
 
         def main_loop_callback(result):
             if not cancel.is_cancelled():
                 callback(result)
 
         def thread_callback(result):
-            if cancel.is_cancelled():
+            if result is None or cancel.is_cancelled():
                 return
             GLib.idle_add(main_loop_callback, result,
                           priority=GLib.PRIORITY_DEFAULT)
 
-        self._pool.apply_async(
-            get_thumbnail_from_file, args=(fileobj, (width, height)),
-            callback=thread_callback)
+        self._pool.apply_async(get_pixbuf, callback=thread_callback)
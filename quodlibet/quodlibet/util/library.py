@@ -6,14 +6,22 @@
 # it under the terms of the GNU General Public License version 2 as
 # published by the Free Software Foundation
 
+import os
 import re
 import sys
+import time
+import tempfile
+import collections
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 from quodlibet import app
 from quodlibet import config
 from quodlibet.qltk.notif import Task
 from quodlibet.util.dprint import print_d
-from quodlibet.util import copool
+from quodlibet.util import copool, print_exc
+from quodlibet.util.thumbnails import ThumbSize, needs_thumbnail, \
+    create_thumbnails
 
 from quodlibet.query import Query
 from quodlibet.qltk.songlist import SongList
@@ -31,6 +39,82 @@ def background_filter():
         pass
 
 
+class QueryExecutor(object):
+    """Filters songs with a query in a copool routine, a chunk at a time,
+    so slow queries don't block the main loop.
+
+    Only one search runs at a time, starting a new one cancels the
+    running one.
+    """
+
+    STEP_TIME = 0.02
+    """Seconds to spend filtering before returning to the main loop"""
+
+    PARTIAL_TIME = 0.3
+    """Seconds after which the songs found so far get passed on"""
+
+    CHUNK_SIZE = 200
+
+    def __init__(self):
+        # the copool id of the running search or None
+        self.__funcid = None
+
+    @property
+    def running(self):
+        """If a search is in progress"""
+
+        return self.__funcid is not None
+
+    def run(self, query, songs, callback, partial=None):
+        """Start filtering `songs` (a list which must not change while
+        searching) using `query`.
+
+        callback(songs) gets called with all matching songs once done.
+        If the search takes longer than PARTIAL_TIME, partial(songs) gets
+        called with the songs found so far, in growing intervals.
+        """
+
+        self.cancel()
+        # a new id for each run, so a callback can start the next search
+        funcid = self.__funcid = object()
+        copool.add(self.__filter, funcid, query, songs, callback, partial,
+                   funcid=funcid)
+
+    def cancel(self):
+        """Stop the running search, if any. The callbacks won't be called"""
+
+        if self.__funcid is not None:
+            copool.remove(self.__funcid)
+            self.__funcid = None
+
+    def __filter(self, funcid, query, songs, callback, partial):
+        search = query.compiled
+        result = []
+        chunk = self.CHUNK_SIZE
+        total = len(songs)
+        index = 0
+        interval = self.PARTIAL_TIME
+        next_partial = time.time() + interval
+        while True:
+            step_end = time.time() + self.STEP_TIME
+            while index < total:
+                result.extend(filter(search, songs[index:index + chunk]))
+                index += chunk
+                if time.time() > step_end:
+                    break
+            if index >= total:
+                break
+            if partial is not None and time.time() > next_partial:
+                interval *= 2
+                next_partial = time.time() + interval
+                partial(list(result))
+            yield True
+
+        if self.__funcid is funcid:
+            self.__funcid = None
+        callback(result)
+
+
 def split_scan_dirs(s):
     """Split the value of the "scan" setting, accounting for drive letters on
     win32."""
@@ -63,8 +147,147 @@ def scan_library(library, force):
     paths = get_scan_dirs()
     exclude = split_scan_dirs(config.get("library", "exclude"))
     exclude = [bytes2fsnative(e) for e in exclude]
-    copool.add(library.rebuild, paths, force, exclude,
-               cofuncid="library", funcid="library")
+    copool.add(_rebuild, library, paths, force, exclude, funcid="library")
+
+
+def _rebuild(library, paths, force, exclude):
+    for result in library.rebuild(paths, force, exclude, cofuncid="library"):
+        yield result
+
+    if config.getboolean("albumart", "pregenerate"):
+        copool.add(warm_cover_cache, library, library.scan_processes,
+                   cofuncid="covers", funcid="covers")
+
+
+WARM_STEP_TIME = 0.02
+"""Seconds warm_cover_cache() spends in the main loop before yielding"""
+
+WARM_LOOKUP_CHUNK = 20
+"""Number of albums to look up covers for in one thread pool task"""
+
+
+def _find_thumbnail_paths(song_lists, sizes, prefer_embedded):
+    """Returns the paths of all covers of `song_lists` which are missing
+    a thumbnail. Looking them up lists directories and extracts embedded
+    images, so this runs in a thread.
+    """
+
+    tempdir = tempfile.gettempdir()
+    paths = []
+    for songs in song_lists:
+        fileobj = app.cover_manager.get_cover_many(songs, prefer_embedded)
+        if fileobj is None:
+            continue
+        path = fileobj.name
+        fileobj.close()
+        # embedded images only exist temporarily
+        if not path.startswith(tempdir) and \
+                any(needs_thumbnail(path, s) for s in sizes):
+            paths.append(path)
+    return paths
+
+
+def warm_cover_cache(library, processes=0,
+                     sizes=(ThumbSize.NORMAL, ThumbSize.LARGE),
+                     cofuncid=None):
+    """A copool generator which creates the missing thumbnails for the
+    covers of all albums in `library`, so the album browser doesn't have
+    to load the full images.
+
+    The covers are looked up in a thread and the thumbnails created
+    in `processes` worker processes (one per CPU if < 0, a thread if < 2).
+    Existing thumbnails are skipped, so running it again continues where
+    the last run stopped.
+    """
+
+    if processes < 0:
+        processes = multiprocessing.cpu_count()
+    # the workers get forked, not supported on Windows
+    if processes < 2 or os.name == "nt":
+        processes = 1
+        pool = ThreadPool(1)
+    else:
+        pool = multiprocessing.Pool(processes)
+    lookup_pool = ThreadPool(1)
+
+    prefer_embedded = config.getboolean("albumart", "prefer_embedded", False)
+    albums = library.albums.values()
+    lookups = collections.deque()
+    for i in xrange(0, len(albums), WARM_LOOKUP_CHUNK):
+        song_lists = [list(a.songs) for a in albums[i:i + WARM_LOOKUP_CHUNK]]
+        lookups.append(lookup_pool.apply_async(
+            _find_thumbnail_paths, (song_lists, sizes, prefer_embedded)))
+
+    pending = collections.deque()
+    seen = set()
+    chunk = []
+    created = 0
+
+    def wait(result):
+        # blocks shortly, so the main loop can continue in between
+        while not result.ready():
+            result.wait(0.01)
+            yield
+
+    def collect(limit):
+        # wait for the oldest chunks while more than `limit` are pending
+        while pending and (len(pending) > limit or pending[0].ready()):
+            result = pending.popleft()
+            for x in wait(result):
+                yield
+            try:
+                yield result.get()
+            except Exception:
+                print_exc()
+
+    with Task(_("Library"), _("Creating cover thumbnails")) as task:
+        if cofuncid:
+            task.copool(cofuncid)
+        try:
+            step_end = time.time() + WARM_STEP_TIME
+            total = len(lookups)
+            for i, result in enumerate(lookups):
+                for x in wait(result):
+                    yield True
+                try:
+                    paths = result.get()
+                except Exception:
+                    print_exc()
+                    paths = []
+
+                for path in paths:
+                    if path not in seen:
+                        seen.add(path)
+                        chunk.append(path)
+
+                if len(chunk) >= 10 or (chunk and not pending):
+                    pending.append(
+                        pool.apply_async(create_thumbnails, (chunk, sizes)))
+                    chunk = []
+                for count in collect(processes * 2):
+                    if count is None:
+                        yield True
+                    else:
+                        created += count
+
+                if time.time() > step_end:
+                    task.update(float(i) / total)
+                    yield True
+                    step_end = time.time() + WARM_STEP_TIME
+
+            if chunk:
+                pending.append(
+                    pool.apply_async(create_thumbnails, (chunk, sizes)))
+            for count in collect(0):
+                if count is None:
+                    yield True
+                else:
+                    created += count
+        finally:
+            lookup_pool.terminate()
+            pool.terminate()
+
+    print_d("Created thumbnails for %d covers" % created)
 
 
 def emit_signal(songs, signal="changed", block_size=50, name=None,
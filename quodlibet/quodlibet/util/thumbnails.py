@@ -8,6 +8,8 @@
 import os
 import tempfile
 import hashlib
+import threading
+import collections
 
 from gi.repository import GdkPixbuf, GLib
 
@@ -18,6 +20,91 @@ from quodlibet.util import enum
 from quodlibet.qltk.image import scale
 
 
+class PixbufCache(object):
+    """A thread-safe cache for pixbufs which drops the least recently used
+    ones once they take more than `max_bytes` of memory.
+
+    Pixbufs stored under multiple keys only count once.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        # id(pixbuf) -> [number of keys, size in bytes]
+        self._refs = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _add_ref(self, pixbuf):
+        ref = self._refs.get(id(pixbuf))
+        if ref is None:
+            size = pixbuf.get_rowstride() * pixbuf.get_height()
+            self._refs[id(pixbuf)] = [1, size]
+            self._bytes += size
+        else:
+            ref[0] += 1
+
+    def _remove_ref(self, pixbuf):
+        ref = self._refs[id(pixbuf)]
+        ref[0] -= 1
+        if not ref[0]:
+            del self._refs[id(pixbuf)]
+            self._bytes -= ref[1]
+
+    def get(self, key):
+        """Returns the pixbuf for `key` or None"""
+
+        with self._lock:
+            pixbuf = self._entries.pop(key, None)
+            if pixbuf is None:
+                self.misses += 1
+                return
+            self.hits += 1
+            self._entries[key] = pixbuf
+            return pixbuf
+
+    def set(self, key, pixbuf):
+        """Stores `pixbuf` under `key`, or removes `key` if it is None"""
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._remove_ref(old)
+            if pixbuf is None:
+                return
+            self._entries[key] = pixbuf
+            self._add_ref(pixbuf)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                key, old = self._entries.popitem(last=False)
+                self._remove_ref(old)
+
+    def clear(self):
+        """Removes all pixbufs and resets the statistics"""
+
+        with self._lock:
+            self._entries.clear()
+            self._refs.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def get_stats(self):
+        """Returns a dict containing the number of hits, misses, cached
+        pixbufs and the bytes they take.
+        """
+
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self), "bytes": self._bytes}
+
+
+pixbuf_cache = PixbufCache()
+"""Shared cache for cover pixbufs, see get_thumbnail()"""
+
+
 def get_thumbnail_folder():
     """Returns a path to the thumbnail folder.
 
@@ -70,6 +157,43 @@ def get_cache_info(path, boundary):
     return (thumb_path, thumb_size)
 
 
+def needs_thumbnail(path, size):
+    """If the thumbnail of `size` (a ThumbSize) for the image at `path`
+    is missing or older than the image.
+
+    Images smaller than the thumbnail don't get one, see _get_thumbnail().
+    """
+
+    thumb_path, thumb_size = get_cache_info(path, (size, size))
+    if mtime(thumb_path) >= mtime(path):
+        return False
+
+    info, width, height = GdkPixbuf.Pixbuf.get_file_info(path)
+    if info is None:
+        return False
+    return width >= thumb_size or height >= thumb_size
+
+
+def create_thumbnails(paths, sizes):
+    """Creates the missing thumbnails of all `sizes` for the images at
+    `paths`. Returns the number of images processed.
+
+    Used in worker processes, see util.library.warm_cover_cache().
+    """
+
+    count = 0
+    for path in paths:
+        for size in sizes:
+            if not needs_thumbnail(path, size):
+                continue
+            try:
+                _get_thumbnail(path, (size, size))
+            except (GLib.GError, EnvironmentError):
+                break
+        count += 1
+    return count
+
+
 def get_thumbnail_from_file(fileobj, boundary):
     """Like get_thumbnail() but works with files that can't be reopened.
 
@@ -105,9 +229,24 @@ def get_thumbnail(path, boundary):
 
     http://specifications.freedesktop.org/thumbnail-spec/
 
+    Results are kept in `pixbuf_cache` until the image changes.
+
     Can raise GLib.GError. Thread-safe.
     """
 
+    # embedded images come from /tmp/ and the file name gets reused
+    if path.startswith(tempfile.gettempdir()):
+        return _get_thumbnail(path, boundary)
+
+    key = (path, mtime(path), boundary[0], boundary[1])
+    pixbuf = pixbuf_cache.get(key)
+    if pixbuf is None:
+        pixbuf = _get_thumbnail(path, boundary)
+        pixbuf_cache.set(key, pixbuf)
+    return pixbuf
+
+
+def _get_thumbnail(path, boundary):
     width, height = boundary
     new_from_file_at_size = GdkPixbuf.Pixbuf.new_from_file_at_size
 
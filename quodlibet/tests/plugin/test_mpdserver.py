@@ -11,6 +11,7 @@ import socket
 from gi.repository import Gtk
 
 from quodlibet.formats import AudioFile
+from quodlibet.library import SongLibrary
 from quodlibet import app
 from quodlibet import config
 from tests.plugin import PluginTestCase, init_fake_app, destroy_fake_app
@@ -60,6 +61,47 @@ class TMPDServer(PluginTestCase):
         self.assertEqual(getline("discnumber", "2/3"), "Disc: 2/3")
         self.assertEqual(getline("date", "2009-03-04"), "Date: 2009")
 
+    def test_song_info_cache(self):
+        library = SongLibrary()
+        song = AudioFile({"~filename": "/dev/null", "artist": "foo"})
+        library.add([song])
+        cache = self.mod.main.SongInfoCache(library)
+
+        self.assertTrue(u"Artist: foo" in cache(song))
+        song["artist"] = u"bar"
+        self.assertTrue(u"Artist: foo" in cache(song))
+        library.changed([song])
+        self.assertTrue(u"Artist: bar" in cache(song))
+
+        cache.destroy()
+        library.destroy()
+
+    def test_library_stats(self):
+        library = SongLibrary()
+        songs = [AudioFile({"~filename": "/dev/%d" % i, "~#length": 10 + i,
+                            "~#added": 100 + i}) for i in range(3)]
+        library.add(songs[:2])
+        stats = self.mod.main.LibraryStats(library)
+
+        self.assertEqual(stats.playtime, 21)
+        self.assertEqual(stats.last_added, 101)
+        library.add(songs[2:])
+        self.assertEqual(stats.playtime, 33)
+        self.assertEqual(stats.last_added, 102)
+        songs[0]["~#length"] = 20
+        songs[2]["~#added"] = 50
+        library.changed(songs)
+        self.assertEqual(stats.playtime, 43)
+        self.assertEqual(stats.last_added, 101)
+        library.remove(songs[:2])
+        self.assertEqual(stats.playtime, 12)
+        self.assertEqual(stats.last_added, 50)
+        library.remove(songs[2:])
+        self.assertEqual((stats.playtime, stats.last_added), (0, 0))
+
+        stats.destroy()
+        library.destroy()
+
 
 @skipIf(os.name == "nt", "mpd server not supported under Windows")
 class TMPDCommands(PluginTestCase):
@@ -109,3 +151,52 @@ class TMPDCommands(PluginTestCase):
     def test_idle_close(self):
         for cmd in ["idle", "noidle", "close"]:
             self._cmd(cmd + b"\n")
+
+    def test_database(self):
+        song = AudioFile({"~filename": "/music/a/b.ogg", "artist": "foo",
+                          "album": "bar", "~#length": 42})
+        app.library.add([song])
+
+        response = self._cmd(b"find artist foo\n")
+        self.assertTrue(response.startswith(b"file: music/a/b.ogg\n"))
+        self.assertTrue(b"Album: bar\n" in response)
+        self.assertFalse(self._cmd(b"find artist fo\n").startswith(b"file"))
+        self.assertTrue(
+            self._cmd(b"search artist FO\n").startswith(b"file"))
+
+        self.assertEqual(self._cmd(b"list album\n"), b"Album: bar\nOK\n")
+        self.assertEqual(
+            self._cmd(b"count artist foo\n"),
+            b"songs: 1\nplaytime: 42\nOK\n")
+        self.assertEqual(
+            self._cmd(b"lsinfo\n"), b"directory: music\nOK\n")
+        self.assertEqual(
+            self._cmd(b"listall music\n"),
+            b"directory: music/a\nfile: music/a/b.ogg\nOK\n")
+        self.assertTrue(self._cmd(b"add nope\n").startswith(b"ACK"))
+
+    def test_database_errors(self):
+        app.library.add([AudioFile({"~filename": "/music/a/b.ogg"})])
+
+        self.assertTrue(self._cmd(b"list foo\n").startswith(b"ACK"))
+        self.assertTrue(
+            self._cmd(b"list album nosuchtag bar\n").startswith(b"ACK"))
+        self.assertTrue(
+            self._cmd(b"list album group nosuchtag\n").startswith(b"ACK"))
+        self.assertTrue(
+            self._cmd(b"count group nosuchtag\n").startswith(b"ACK"))
+        self.assertTrue(
+            self._cmd(b"count nosuchtag foo\n").startswith(b"ACK"))
+        # the connection still works afterwards
+        self.assertEqual(self._cmd(b"ping\n"), b"OK\n")
+
+    def test_playlist_snapshot(self):
+        service = self.conn.service
+        app.player.info = AudioFile({"~filename": "/music/a.ogg"})
+        result = service.playlistinfo()
+        changes = service.plchanges(-1)
+        app.player.info = None
+        # the entries don't change while waiting to be written
+        self.assertEqual(len(list(result)), 1)
+        self.assertEqual(len(list(changes)), 1)
+        self.assertEqual(list(service.playlistinfo()), [])
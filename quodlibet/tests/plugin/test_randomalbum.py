@@ -92,3 +92,14 @@ class TRandomAlbum(PluginTestCase):
         weights['length'] = 0.5
         # A1 is #1 for Rating, #2 for lastplayed, #2 or 3 length
         self.failUnlessEqual(A1, self.get_winner(self.albums))
+
+    def test_score_rank_sum(self):
+        weights = self.plugin.weights = self.WEIGHTS.copy()
+        weights['lastplayed'] = 2
+        weights['rating'] = 0.5
+        scores = dict((album, score)
+                      for score, album in self.plugin._score(self.albums))
+        # lastplayed: A1, A2 < A3; rating: A3 < A2 (default) < A1
+        self.failUnlessEqual(scores[A1], 0 * 2 + 2 * 0.5)
+        self.failUnlessEqual(scores[A2], 1 * 2 + 1 * 0.5)
+        self.failUnlessEqual(scores[A3], 2 * 2 + 0 * 0.5)
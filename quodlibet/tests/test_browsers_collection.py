@@ -80,6 +80,35 @@ class TCollectionAlbums(TestCase):
         model.remove_albums(self.albums)
         self.failUnlessEqual(len(model), 0)
 
+    def test_model_lazy(self):
+        model = CollectionTreeStore()
+        model.set_albums([("~people", 0)], self.albums)
+        for row in model:
+            children = list(row.iterchildren())
+            self.assertEqual(len(children), 1)
+            self.assertTrue(children[0][0] is None)
+            self.assertTrue(model.iter_albums(row.iter))
+
+        iter_ = model.get_iter_first()
+        albums = model.get_albums_for_iter(iter_)
+        model.populate(iter_)
+        children = list(model[iter_].iterchildren())
+        self.assertEqual(set(r[0] for r in children), albums)
+
+    def test_model_add_remove(self):
+        model = CollectionTreeStore()
+        albums = sorted(self.albums.values(), key=lambda a: a.key)
+        model.set_albums([("~people", 0), ("album", 0)], albums[:1])
+        self.assertEqual(len(model), 1)
+        model.add_albums(albums[1:])
+        self.assertEqual(len(model), 4)
+        for album in albums:
+            path = model.get_path_for_album(album)
+            self.assertTrue(model[path][0] is album)
+        model.remove_albums(albums[1:])
+        self.assertEqual(len(model), 1)
+        self.assertEqual(set(model.iter_albums(None)), {albums[0]})
+
     def test_utils(self):
         model = CollectionTreeStore()
         model.set_albums([("~people", 0)], self.albums)
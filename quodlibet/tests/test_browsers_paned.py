@@ -499,6 +499,42 @@ class TPaneModel(TestCase):
             m.remove_songs([song], True)
             self._verify_model(m)
 
+    def test_remove_empty_later(self):
+        conf = PaneConfig("artist")
+        m = PaneModel(conf)
+        m.add_songs(SONGS)
+        m.remove_songs(SONGS[:1], False)
+        self.assertEqual(len(m), len(SONGS))
+        m.remove_songs([], True)
+        self._verify_model(m)
+        self.assertEqual(len(m), len(SONGS) - 1)
+        self.assertEqual(m[1][0].key, "mu")
+
+    def test_add_sorted(self):
+        conf = PaneConfig("artist")
+        m = PaneModel(conf)
+        m.add_songs(SONGS)
+        for song in SONGS:
+            m.remove_songs([song], True)
+            m.add_songs([song])
+            self._verify_model(m)
+            self.assertEqual(
+                [e.key for e in m.itervalues()],
+                [None, "boris", "mu", "piman", ""])
+
+    def test_only_affected_rows_changed(self):
+        conf = PaneConfig("artist")
+        m = PaneModel(conf)
+        m.add_songs(SONGS)
+        changed = []
+        m.connect("row-changed", lambda m, path, iter_: changed.append(
+            m[path][0].key))
+        m.remove_songs([SONGS[0]], False)
+        self.assertEqual(changed, ["boris"])
+        del changed[:]
+        m.add_songs([SONGS[0], UNKNOWN_ARTIST])
+        self.assertEqual(sorted(changed), ["", "boris"])
+
     def test_matches(self):
         conf = PaneConfig("artist")
         m = PaneModel(conf)
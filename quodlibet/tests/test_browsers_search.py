@@ -123,3 +123,50 @@ class TEmptyBar(TestCase):
 
 class TSearchBar(TEmptyBar):
     Bar = SearchBar
+
+    def _search(self, text):
+        self.bar._set_text(text)
+        return sorted(self.bar._get_songs())
+
+    def test_refine(self):
+        library = quodlibet.browsers.search.library
+        self.assertEqual(self._search(u"tw"), [SONGS[1]])
+        # refinements and repeated searches don't need the library
+        library.search = library.values = None
+        try:
+            self.assertEqual(self._search(u"two"), [SONGS[1]])
+            self.assertEqual(self._search(u"two x"), [])
+            self.assertEqual(self._search(u"tw"), [SONGS[1]])
+        finally:
+            del library.search
+            del library.values
+
+    def test_activate_background(self):
+        self.bar._executor.CHUNK_SIZE = 1
+        self.bar._executor.STEP_TIME = 0
+        self.bar.filter_text("t")
+        self.bar.filter_text("two")
+        self.expected = [SONGS[1]]
+        self._do()
+
+    def test_activate_unresolvable_background(self):
+        library = quodlibet.browsers.search.library
+        library.use_index = True
+        # ratings aren't indexed, so this has to be filtered in the
+        # background instead of searching synchronously
+        library.search = None
+        try:
+            self.bar.filter_text("#(rating > 0.2)")
+            self.expected = sorted(SONGS)
+            self._do()
+        finally:
+            del library.search
+            del library.use_index
+
+    def test_results_library_changed(self):
+        self.assertEqual(self._search(u"five"), [SONGS[4]])
+        SONGS[4]["title"] = u"six"
+        quodlibet.browsers.search.library.changed([SONGS[4]])
+        self.assertEqual(self._search(u"five"), [])
+        SONGS[4]["title"] = u"five"
+        quodlibet.browsers.search.library.changed([SONGS[4]])
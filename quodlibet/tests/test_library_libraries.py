@@ -7,7 +7,7 @@ from quodlibet import config
 from quodlibet.util import connect_obj
 from quodlibet.formats import AudioFile
 
-from tests import TestCase, DATA_DIR, mkstemp
+from tests import TestCase, DATA_DIR, mkstemp, mkdtemp
 from helper import capture_output
 
 from quodlibet.library.libraries import *
@@ -270,6 +270,100 @@ class TPicklingMixin(TestCase):
             os.unlink(filename)
 
 
+class TJournalingLibrary(TestCase):
+
+    def setUp(self):
+        fd, self.filename = mkstemp()
+        os.close(fd)
+        os.unlink(self.filename)
+        self.library = JournalingLibrary()
+        self.library.load(self.filename)
+
+    def tearDown(self):
+        self.library.destroy()
+        for path in [self.filename, self.library.journal_filename]:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _reload(self):
+        library = JournalingLibrary()
+        library.load(self.filename)
+        return library
+
+    def test_save_load(self):
+        self.library.add(Frange(30))
+        self.library.save()
+        library = self._reload()
+        self.assertEqual(
+            sorted(self.library.items()), sorted(library.items()))
+        library.destroy()
+
+    def test_journal(self):
+        self.library.COMPACT_MIN = 100
+        self.library.add(Frange(30))
+        self.library.save()
+        self.assertTrue(os.path.exists(self.library.journal_filename))
+        self.assertFalse(os.path.exists(self.filename))
+
+        self.library.remove(Frange(10))
+        new = Fake(100)
+        self.library.add([new])
+        self.library.save()
+
+        library = self._reload()
+        self.assertEqual(sorted(library.keys()), range(10, 30) + [100])
+        library.destroy()
+
+    def test_compact(self):
+        self.library.COMPACT_MIN = 10
+        self.library.add(Frange(30))
+        self.library.save()
+        self.assertTrue(os.path.exists(self.filename))
+        self.assertFalse(os.path.exists(self.library.journal_filename))
+
+        library = self._reload()
+        self.assertEqual(sorted(library.keys()), range(30))
+        library.destroy()
+
+    def test_migrate(self):
+        dump_items(self.filename, Frange(10))
+        library = self._reload()
+        self.assertEqual(sorted(library.keys()), range(10))
+        library.destroy()
+
+    def test_load_items_mapped(self):
+        self.assertEqual(load_items_mapped(self.filename), [])
+        dump_items(self.filename, Frange(10))
+        self.assertEqual(load_items_mapped(self.filename), Frange(10))
+        # empty and broken files fall back to load_items()
+        with open(self.filename, "wb"):
+            pass
+        with capture_output():
+            self.assertEqual(load_items_mapped(self.filename), [])
+        with open(self.filename, "wb") as h:
+            h.write("foobar")
+        with capture_output():
+            self.assertEqual(load_items_mapped(self.filename, {}), {})
+        os.unlink(self.filename + ".not-valid")
+
+    def test_broken_journal(self):
+        self.library.add(Frange(10))
+        self.library.save()
+        with open(self.library.journal_filename, "ab") as h:
+            h.write("foobar")
+        with capture_output():
+            library = self._reload()
+        self.assertEqual(sorted(library.keys()), range(10))
+
+        # changes after the broken record have to survive a restart
+        library.add(Frange(10, 20))
+        library.save()
+        library.destroy()
+        library = self._reload()
+        self.assertEqual(sorted(library.keys()), range(20))
+        library.destroy()
+
+
 class TSongLibrary(TLibrary):
     Fake = FakeSong
     Frange = staticmethod(FSrange)
@@ -311,6 +405,125 @@ class TSongLibrary(TLibrary):
         self.failIf(self.changed or self.added or self.removed)
 
 
+class TSongLibraryIndex(TestCase):
+
+    def setUp(self):
+        self.library = SongLibrary()
+        self.library.use_index = True
+        self.library.add(ASrange(12))
+
+    def tearDown(self):
+        self.library.destroy()
+
+    def test_query(self):
+        self.assertEqual(len(self.library.query(u"album=\"album 1\"")), 4)
+        self.assertEqual(len(self.library.query(u"")), 12)
+
+    def test_signals(self):
+        self.assertEqual(len(self.library.query(u"album=\"album 1\"")), 4)
+        songs = self.library.query(u"album=\"album 2\"")
+        for song in songs:
+            song["album"] = u"Album 1"
+        self.library.changed(songs)
+        self.assertEqual(len(self.library.query(u"album=\"album 1\"")), 8)
+        self.library.remove(songs)
+        self.assertEqual(len(self.library.query(u"album=\"album 1\"")), 4)
+        self.library.add(songs)
+        self.assertEqual(len(self.library.query(u"album=\"album 1\"")), 8)
+
+
+class TSongLibraryVocabulary(TestCase):
+
+    def setUp(self):
+        self.library = SongLibrary()
+        self.library.add(ASrange(12))
+
+    def tearDown(self):
+        self.library.destroy()
+
+    def test_tag_values(self):
+        self.assertEqual(
+            self.library.tag_values("album"),
+            [u"Album 1", u"Album 2", u"Album 3"])
+        self.assertEqual(self.library.tag_values("foo"), [])
+
+    def test_tag_names(self):
+        self.assertEqual(
+            self.library.tag_names(),
+            ["album", "artist", "labelid", "title", "~filename"])
+
+    def test_signals(self):
+        self.library.tag_values("album")
+        self.library.tag_names()
+        songs = [s for s in self.library if s("album") == u"Album 2"]
+        for song in songs:
+            song["album"] = u"Other"
+            song["foo"] = u"bar"
+        self.library.changed(songs)
+        self.assertEqual(
+            self.library.tag_values("album"),
+            [u"Album 1", u"Album 3", u"Other"])
+        self.assertTrue("foo" in self.library.tag_names())
+        self.library.remove(songs)
+        self.assertEqual(
+            self.library.tag_values("album"), [u"Album 1", u"Album 3"])
+        self.assertFalse("foo" in self.library.tag_names())
+        self.library.add(songs)
+        self.assertEqual(self.library.vocabulary.count("album", u"Other"), 4)
+
+
+class TTagVocabulary(TestCase):
+
+    def setUp(self):
+        self.songs = ASrange(6)
+        self.vocabulary = TagVocabulary(self.songs)
+
+    def test_values(self):
+        self.assertEqual(
+            self.vocabulary.values("title"),
+            [u"Song %d" % i for i in range(1, 7)])
+        self.assertEqual(
+            self.vocabulary.values("~people"), [u"Fakeman"])
+        self.assertEqual(self.vocabulary.count("album", u"Album 1"), 2)
+        self.assertEqual(self.vocabulary.count("album", u"Album 4"), 0)
+        self.assertEqual(self.vocabulary.count_values("album"), 3)
+        self.assertEqual(self.vocabulary.count_values("~people"), 1)
+        self.assertEqual(self.vocabulary.count_values("nope"), 0)
+
+    def test_prefix(self):
+        self.songs[0]["album"] = u"Another"
+        self.songs[3]["album"] = u"Another"
+        self.vocabulary.change(self.songs)
+        self.assertEqual(
+            self.vocabulary.values("album", u"Al"),
+            [u"Album 2", u"Album 3"])
+        self.assertEqual(self.vocabulary.values("album", u"An"), [u"Another"])
+        self.assertEqual(self.vocabulary.values("album", u"X"), [])
+
+    def test_multi_value(self):
+        song = AlbumSong(10)
+        song["artist"] = u"a\nb\nFakeman"
+        self.vocabulary.add([song])
+        self.assertEqual(
+            self.vocabulary.values("artist"), [u"Fakeman", u"a", u"b"])
+        self.vocabulary.remove(self.songs)
+        self.assertEqual(
+            self.vocabulary.values("artist"), [u"Fakeman", u"a", u"b"])
+        self.vocabulary.remove([song])
+        self.assertEqual(self.vocabulary.values("artist"), [])
+
+    def test_change_unknown(self):
+        self.vocabulary.values("album")
+        self.vocabulary.change([AlbumSong(10, album=u"Foo")])
+        self.assertEqual(self.vocabulary.count("album", u"Foo"), 0)
+
+    def test_clear(self):
+        self.vocabulary.values("album")
+        self.vocabulary.clear()
+        self.assertEqual(self.vocabulary.values("album"), [])
+        self.assertEqual(self.vocabulary.tag_names(), [])
+
+
 class TFileLibrary(TLibrary):
     Fake = FakeSongFile
     Library = FileLibrary
@@ -378,6 +591,24 @@ class TFileLibrary(TLibrary):
         self.assertTrue(new in changed)
         self.assertFalse(removed)
 
+    def test_rebuild(self):
+        items = self.Frange(10)
+        self.library.add(items)
+        items[3]._valid = False
+        items[5]._valid = False
+        items[5]._exists = False
+        for x in self.library.rebuild([]):
+            pass
+        self.failUnlessEqual(self.changed, [items[3]])
+        self.failUnlessEqual(self.removed, [items[5]])
+        self.failUnless(items[3]._valid)
+        self.failIf(items[5] in self.library)
+
+        del self.changed[:]
+        for x in self.library.rebuild([], force=True):
+            pass
+        self.failUnlessEqual(sorted(self.changed), sorted(self.library))
+
 
 class TSongFileLibrary(TSongLibrary):
     Fake = FakeSongFile
@@ -473,6 +704,98 @@ class TSongFileLibrary(TSongLibrary):
         finally:
             config.quit()
 
+    def __scan(self, processes):
+        config.init()
+        dirname = mkdtemp()
+        try:
+            names = ["empty.flac", "empty.ogg", "silence-44-s.mp3",
+                     "silence-44-s.flac", "test.wav"]
+            for i in xrange(3):
+                subdir = os.path.join(dirname, str(i))
+                os.mkdir(subdir)
+                for name in names:
+                    shutil.copy(os.path.join(DATA_DIR, name), subdir)
+            with open(os.path.join(dirname, "broken.ogg"), "wb") as h:
+                h.write("nope")
+
+            self.library.scan_processes = processes
+            with capture_output():
+                for x in self.library.scan([dirname]):
+                    pass
+            self.failUnlessEqual(len(self.library), 15)
+            self.failUnlessEqual(len(self.added), 15)
+            self.failUnless(
+                all(s("~filename").startswith(dirname) for s in self.added))
+
+            # nothing new
+            del self.added[:]
+            with capture_output():
+                for x in self.library.scan([dirname]):
+                    pass
+            self.failIf(self.added)
+        finally:
+            shutil.rmtree(dirname)
+            config.quit()
+
+    def test_scan(self):
+        self.__scan(0)
+
+    def test_scan_parallel(self):
+        self.__scan(2)
+
+    def test_rebuild_trust_dir_mtimes(self):
+        config.init()
+        dirname = mkdtemp()
+        try:
+            songdir = os.path.join(dirname, "songs")
+            os.mkdir(songdir)
+            filename = os.path.join(songdir, "empty.flac")
+            shutil.copy(os.path.join(DATA_DIR, "empty.flac"), filename)
+            song = self.library.add_filename(filename)
+            self.library.filename = os.path.join(dirname, "library")
+            self.library.trust_dir_mtimes = True
+
+            def rebuild():
+                for x in self.library.rebuild([]):
+                    pass
+
+            rebuild()
+            self.failUnless(os.path.exists(
+                self.library.filename + self.library.DIRS_SUFFIX))
+            song["~#mtime"] = 1
+            song["title"] = u"foo"
+            rebuild()
+            # directory unchanged, not checked
+            self.failUnlessEqual(song["title"], u"foo")
+            os.utime(songdir, (1, 1))
+            rebuild()
+            self.failIf("title" in song)
+            self.failUnless(song.valid())
+        finally:
+            shutil.rmtree(dirname)
+            config.quit()
+
+    def test_rebuild_broken_dir_mtimes(self):
+        config.init()
+        dirname = mkdtemp()
+        try:
+            filename = os.path.join(dirname, "empty.flac")
+            shutil.copy(os.path.join(DATA_DIR, "empty.flac"), filename)
+            song = self.library.add_filename(filename)
+            self.library.filename = os.path.join(dirname, "library")
+            self.library.trust_dir_mtimes = True
+            dump_items(self.library.filename + self.library.DIRS_SUFFIX,
+                       [1, 2, 3])
+            with capture_output():
+                for x in self.library.rebuild([]):
+                    pass
+            self.failUnless(song in self.library)
+            self.failUnless(isinstance(load_items(
+                self.library.filename + self.library.DIRS_SUFFIX), dict))
+        finally:
+            shutil.rmtree(dirname)
+            config.quit()
+
     def test_add_filename_normalize_path(self):
         if not os.name == "nt":
             return
@@ -577,6 +900,34 @@ class TAlbumLibrary(TestCase):
         self.failUnlessEqual(album2.key, key)
         self.failUnlessEqual(len(album2.songs), 4)
 
+    def test_change_album_key(self):
+        song = self.underlying.get("file_1.mp3")
+        old = self.library[song.album_key]
+        song["album"] = song["labelid"] = "Album 2"
+        self.underlying.changed([song])
+        self.failIf(song in old.songs)
+        self.failUnlessEqual(len(old.songs), 3)
+        self.failUnless(song in self.library[song.album_key].songs)
+        self.failUnlessEqual(len(self.library[song.album_key].songs), 5)
+
+        # move the rest of Album 1 to a new album
+        songs = list(old.songs)
+        for song in songs:
+            song["album"] = song["labelid"] = "Album 4"
+        self.underlying.changed(songs)
+        self.failIf(old.key in self.library)
+        album = self.library[songs[0].album_key]
+        self.failUnlessEqual(album.songs, set(songs))
+        self.failUnlessEqual(len(self.library), 3)
+
+    def test_remove_changed_key(self):
+        song = self.underlying.get("file_1.mp3")
+        old = self.library[song.album_key]
+        song["album"] = song["labelid"] = "Album 2"
+        self.underlying.remove([song])
+        self.failIf(song in old.songs)
+        self.failUnlessEqual(len(old.songs), 3)
+
     def test_misc(self):
         # It shouldn't implement FileLibrary etc
         self.failIf(getattr(self.library, "filename", None))
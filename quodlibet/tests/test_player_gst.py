@@ -21,8 +21,13 @@ except ImportError:
 
 from quodlibet.player import PlayerError
 from quodlibet.util import sanitize_tags
-from quodlibet.formats import MusicFile
+from quodlibet.util.path import fsnative
+from quodlibet.formats import MusicFile, AudioFile
+from quodlibet.qltk.playorder import OrderOneSong
+from quodlibet.qltk.songmodel import PlaylistModel
 from quodlibet import config
+from quodlibet import library
+from quodlibet import player
 
 
 @contextlib.contextmanager
@@ -198,6 +203,63 @@ class TGstreamerTagList(TestCase):
         self.failIf(sanitize_tags({"foo": "bar"}))
 
 
+class _FakePlaybin(object):
+
+    uri = None
+
+    def set_property(self, name, value):
+        setattr(self, name, value)
+
+
+@skipUnless(Gst, "GStreamer missing")
+class TGStreamerPlayerGapless(TestCase):
+
+    def setUp(self):
+        config.init()
+        config.set("player", "gst_pipeline", "fakesink")
+        module = player.init_backend("gstbe")
+        self.player = module.init(library.init().librarian)
+        self.songs = []
+        for i in range(3):
+            song = AudioFile({"~filename": fsnative(u"/foo/bar%d" % i)})
+            song.sanitize()
+            self.songs.append(song)
+        self.source = PlaylistModel()
+        self.source.set(self.songs)
+        self.player.setup(self.source, self.songs[0], 0)
+
+    def tearDown(self):
+        self.player.destroy()
+        config.quit()
+
+    def _update_next_song(self):
+        self.player._GStreamerPlayer__update_next_song()
+
+    def _about_to_finish(self, playbin):
+        self.player._GStreamerPlayer__about_to_finish(playbin)
+
+    def test_prepared(self):
+        self._update_next_song()
+        playbin = _FakePlaybin()
+        self._about_to_finish(playbin)
+        self.assertEqual(playbin.uri, self.songs[1]("~uri"))
+        # the source gets moved on later in the main loop
+        self.assertTrue(self.source.current is self.songs[0])
+        self.assertTrue(self.player._next_song is None)
+
+    def test_state_mismatch(self):
+        self._update_next_song()
+        self.assertTrue(self.player._next_song[2] is self.songs[1])
+        # nothing follows with a non repeating one song order
+        self.source.order = OrderOneSong(self.source)
+        playbin = _FakePlaybin()
+        playbin.uri = u"nothing"
+        self._about_to_finish(playbin)
+        # the prepared song isn't used, the source decides in the main loop
+        self.assertTrue(playbin.uri is None)
+        self.assertTrue(self.source.current is None)
+
+
 @skipUnless(Gst, "GStreamer missing")
 class TGStreamerCodecs(TestCase):
 
@@ -11,6 +11,7 @@ from gi.repository import Gtk
 
 from quodlibet.qltk.models import ObjectStore, ObjectModelFilter
 from quodlibet.qltk.models import ObjectModelSort, ObjectTreeStore
+from quodlibet.qltk.models import ObjectListModel
 
 
 class _TObjectStoreMixin(object):
@@ -221,6 +222,112 @@ class TObjectStore(TestCase, _TObjectStoreMixin):
         self.assertEqual(inserted[0], len(m))
 
 
+class TObjectListModel(TestCase, _TObjectStoreMixin):
+
+    Store = ObjectListModel
+
+    def test_validate(self):
+        self.failUnlessRaises(ValueError, ObjectListModel, int)
+        ObjectListModel(object)
+
+    def test_insert_many(self):
+        m = ObjectListModel()
+        m.append(row=[42])
+        m.append(row=[24])
+        m.insert_many(1, range(10))
+        self.failUnlessEqual(list(m.itervalues()), [42] + range(10) + [24])
+        self.failUnlessEqual([r[0] for r in m], [42] + range(10) + [24])
+
+    def test_iterrows(self):
+        m = ObjectListModel()
+        m.append_many(range(10))
+        for iter_, value in m.iterrows():
+            self.failUnlessEqual(m.get_value(iter_), value)
+            self.failUnlessEqual(m[iter_][0], value)
+
+    def test_remove(self):
+        m = ObjectListModel()
+        m.append_many(range(5))
+        iter_ = m.get_iter_first()
+        last = m.iter_nth_child(None, 4)
+        self.assertTrue(m.remove(iter_))
+        self.assertEqual(m.get_value(iter_), 1)
+        self.assertEqual(m.get_path(last)[0], 3)
+        self.assertFalse(m.remove(last))
+        self.assertFalse(m.iter_is_valid(last))
+        self.assertEqual(list(m.itervalues()), [1, 2, 3])
+
+    def test_move(self):
+        m = ObjectListModel()
+        m.append_many(range(4))
+        iter_ = m.get_iter_first()
+        m.move_before(iter_, None)
+        self.assertEqual(list(m.itervalues()), [1, 2, 3, 0])
+        m.move_after(iter_, None)
+        self.assertEqual(list(m.itervalues()), [0, 1, 2, 3])
+        m.move_after(iter_, m.iter_nth_child(None, 2))
+        self.assertEqual(list(m.itervalues()), [1, 2, 0, 3])
+        self.assertEqual(m.get_value(iter_), 0)
+
+    def test_signal_count(self):
+        m = ObjectListModel()
+
+        def handler(model, path, *args):
+            args[-1][0] += 1
+
+        inserted = [0]
+        m.connect("row-inserted", handler, inserted)
+        deleted = [0]
+        m.connect("row-deleted", handler, deleted)
+
+        m.append([1])
+        m.insert_many(0, [1, 2, 3])
+        m.append_many([1, 2, 3])
+        self.assertEqual(inserted[0], len(m))
+        m.remove(m.get_iter_first())
+        m.clear()
+        self.assertEqual(deleted[0], inserted[0])
+
+    def test_clear_after_append(self):
+        m = ObjectListModel()
+        deleted = []
+        m.connect("row-deleted", lambda *x: deleted.append(x))
+        m.append_many(range(10))
+        m.clear()
+        self.assertEqual(len(deleted), 10)
+        self.assertTrue(m.is_empty())
+        m.append_many(range(5))
+        m.get_iter_first()
+        m.append_many(range(5))
+        m.clear()
+        self.assertEqual(len(deleted), 20)
+
+    def test_front_edits(self):
+        m = ObjectListModel()
+        m.MAX_PENDING = 5
+        m.append_many(range(20))
+        iters = list(m.iter_append_many(range(20, 30)))
+        for i in range(12):
+            m.remove(m.get_iter_first())
+            m.insert(0, row=[-i])
+            m.remove(m.get_iter_first())
+            for j, iter_ in enumerate(iters):
+                self.assertEqual(m.get_path(iter_)[0], 19 - i + j)
+                self.assertEqual(m.get_value(iter_), 20 + j)
+        m.move_before(iters[-1], m.get_iter_first())
+        self.assertEqual(m.get_path(iters[-1])[0], 0)
+        self.assertEqual(m.get_path(iters[0])[0], 9)
+
+    def test_view(self):
+        m = ObjectListModel()
+        m.append_many(range(100))
+        view = Gtk.TreeView(model=m)
+        m.remove(m.get_iter_first())
+        m.append([100])
+        self.assertEqual(len(view.get_model()), 100)
+        view.destroy()
+
+
 class _TObjectTreeStoreMixin(object):
 
     Store = None
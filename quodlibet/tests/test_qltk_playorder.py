@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from tests import TestCase
 
-from quodlibet.qltk.playorder import PlayOrder
+from quodlibet.qltk.playorder import PlayOrder, _ShufflePool, _WeightTree
 import quodlibet.config
 import quodlibet.plugins
 
@@ -68,3 +68,49 @@ class TPlayOrder(TestCase):
         self.po.set_shuffle(True)
         self.assertTrue(self.po.get_shuffle())
         self.assertEqual(self.po.get_active_name(), "weighted")
+
+
+class TShufflePool(TestCase):
+
+    def test_sample(self):
+        pool = _ShufflePool(5)
+        self.assertEqual(len(pool), 5)
+        pool.use(2)
+        pool.use(2)
+        pool.use(10)
+        self.assertEqual(len(pool), 4)
+        seen = set()
+        while len(pool):
+            index = pool.sample()
+            self.assertFalse(index in seen)
+            seen.add(index)
+            pool.use(index)
+        self.assertEqual(seen, {0, 1, 3, 4})
+        self.assertTrue(pool.sample() is None)
+
+
+class TWeightTree(TestCase):
+
+    def test_find(self):
+        tree = _WeightTree([0, 1, 2, 0, 3])
+        self.assertEqual(tree.total, 6)
+        self.assertEqual(tree.find(0), 0)
+        self.assertEqual(tree.find(0.5), 1)
+        self.assertEqual(tree.find(1), 1)
+        self.assertEqual(tree.find(1.5), 2)
+        self.assertEqual(tree.find(3.5), 4)
+        self.assertEqual(tree.find(6), 4)
+
+    def test_set(self):
+        tree = _WeightTree([1, 1, 1])
+        tree.set(1, 0)
+        self.assertEqual(tree.total, 2)
+        self.assertEqual(tree.find(1.5), 2)
+        tree.set(0, 3)
+        self.assertEqual(tree.total, 4)
+        self.assertEqual(tree.find(3.5), 2)
+
+    def test_empty(self):
+        tree = _WeightTree([])
+        self.assertEqual(tree.total, 0)
+        self.assertTrue(tree.find(0) is None)
@@ -17,7 +17,8 @@ class TSongList(TestCase):
 
     def setUp(self):
         config.init()
-        self.songlist = SongList(SongLibrary())
+        self.library = SongLibrary()
+        self.songlist = SongList(self.library)
 
         self.orders_changed = 0
 
@@ -165,6 +166,47 @@ class TSongList(TestCase):
 
         self.assertEqual(self.songlist.get_songs(), [song] * 4)
 
+    def test_add_songs_sorted(self):
+        songs = []
+        for i in xrange(30):
+            songs.append(AudioFile({
+                "~filename": fsnative(u"/dev/%d" % i),
+                "artist": [u"b", u"a", u"C"][i % 3],
+                "title": u"%d" % (i % 4),
+                "~#rating": (i % 5) / 4.0}))
+
+        self.songlist.set_column_headers(["artist", "title", "~#rating"])
+        for orders in [[("artist", False)], [("artist", True)],
+                       [("artist", False), ("~#rating", True)],
+                       [("~#rating", True), ("title", False),
+                        ("artist", True)]]:
+            self.songlist.set_sort_orders(orders)
+            self.songlist.set_songs(songs[:10])
+            self.songlist.add_songs(songs[10:20])
+            self.songlist.add_songs(songs[20:])
+            expected = list(songs)
+            self.songlist._sort_songs(expected)
+            self.assertEqual(self.songlist.get_songs(), expected)
+
+    def test_sort_cache_changed(self):
+        songs = [AudioFile({"~filename": fsnative(u"/dev/%d" % i),
+                            "artist": u"%d" % i}) for i in xrange(5)]
+        self.library.add(songs)
+        self.songlist.set_column_headers(["artist"])
+        self.songlist.set_sort_orders([("artist", False)])
+        self.songlist.set_songs(list(reversed(songs)))
+        self.assertEqual(self.songlist.get_songs(), songs)
+
+        songs[0]["artist"] = u"9"
+        self.library.changed([songs[0]])
+        self.songlist.set_songs(list(songs))
+        self.assertEqual(self.songlist.get_songs(), songs[1:] + songs[:1])
+
+        self.songlist.set_sort_orders([("artist", True)])
+        self.songlist.set_songs(list(songs))
+        self.assertEqual(
+            self.songlist.get_songs(), songs[:1] + list(reversed(songs[1:])))
+
     def test_header_menu(self):
         from quodlibet import browsers
         from quodlibet.library import SongLibrary, SongLibrarian
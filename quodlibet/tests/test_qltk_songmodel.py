@@ -5,7 +5,8 @@ from gi.repository import Gtk
 
 from quodlibet.player.nullbe import NullPlayer
 from quodlibet.formats import AudioFile
-from quodlibet.qltk.songmodel import PlaylistModel, PlaylistMux
+from quodlibet.qltk.songmodel import PlaylistModel, PlaylistMux, \
+    LazyPlaylistModel
 from quodlibet.qltk.playorder import ORDERS, Order
 
 
@@ -15,8 +16,11 @@ def do_events():
 
 
 class TPlaylistModel(TestCase):
+
+    Model = PlaylistModel
+
     def setUp(self):
-        self.pl = PlaylistModel()
+        self.pl = self.Model()
         self.pl.set(range(10))
         do_events()
         self.failUnless(self.pl.current is None)
@@ -140,6 +144,28 @@ class TPlaylistModel(TestCase):
         self.assert_(songs.count(r2) > songs.count(r1))
         self.assert_(songs.count(r3) > songs.count(r2))
 
+    def test_weighted_changed(self):
+        self.pl.order = ORDERS[2](self.pl)
+        r0 = AudioFile({'~#rating': 0})
+        r1 = AudioFile({'~#rating': 1})
+        self.pl.set([r0, r1])
+        self.pl.next()
+        self.assertEqual(self.pl.current, r1)
+        r0["~#rating"] = 1
+        r1["~#rating"] = 0
+        for row in self.pl:
+            self.pl.row_changed(row.path, row.iter)
+        for i in range(10):
+            self.pl.next()
+            self.assertEqual(self.pl.current, r0)
+
+    def test_shuffle_set(self):
+        self.pl.order = ORDERS[1](self.pl)
+        self.pl.go_to(self.pl.find(3), explicit=True)
+        numbers = [self.pl.current for i in range(9)
+                   if self.pl.next() or True]
+        self.assertEqual(sorted(numbers), [0, 1, 2, 4, 5, 6, 7, 8, 9])
+
     def test_shuffle_repeat(self):
         self.pl.order = ORDERS[1](self.pl)
         self.pl.repeat = True
@@ -170,6 +196,39 @@ class TPlaylistModel(TestCase):
         self.pl.next_ended()
         self.failUnlessEqual(self.pl.current, 4)
 
+    def test_peek_next_ended(self):
+        self.failUnlessEqual(self.pl.peek_next_ended(), 0)
+        self.pl.go_to(8)
+        self.failUnlessEqual(self.pl.peek_next_ended(), 9)
+        self.failUnlessEqual(self.pl.current, 8)
+        self.pl.next_ended()
+        self.failUnlessEqual(self.pl.peek_next_ended(), None)
+        self.pl.repeat = True
+        self.failUnlessEqual(self.pl.peek_next_ended(), 0)
+        self.pl.order = ORDERS[3](self.pl)
+        self.failUnlessEqual(self.pl.peek_next_ended(), 9)
+        self.pl.order = ORDERS[1](self.pl)
+        for i in range(15):
+            song = self.pl.peek_next_ended()
+            self.failUnlessEqual(self.pl.peek_next_ended(), song)
+            self.pl.next_ended()
+            self.failUnlessEqual(self.pl.current, song)
+
+    def test_state(self):
+        state = self.pl.state
+        self.failUnlessEqual(self.pl.state, state)
+        self.pl.next()
+        self.failIfEqual(self.pl.state, state)
+        state = self.pl.state
+        self.pl.insert_many(0, [20])
+        self.failIfEqual(self.pl.state, state)
+        state = self.pl.state
+        self.pl.repeat = True
+        self.failIfEqual(self.pl.state, state)
+        state = self.pl.state
+        self.pl.order = ORDERS[1](self.pl)
+        self.failIfEqual(self.pl.state, state)
+
     def test_previous(self):
         self.pl.go_to(2)
         self.failUnlessEqual(self.pl.current, 2)
@@ -255,6 +314,18 @@ class TPlaylistModel(TestCase):
         self.pl.destroy()
 
 
+class TLazyPlaylistModel(TPlaylistModel):
+
+    Model = LazyPlaylistModel
+
+    def test_iters_persist(self):
+        iter_ = self.pl.find(8)
+        self.pl.remove(self.pl.find(2))
+        self.pl.insert_many(0, range(20, 30))
+        self.assertEqual(self.pl.get_value(iter_), 8)
+        self.assertEqual(self.pl.get_path(iter_)[0], 17)
+
+
 class TPlaylistMux(TestCase):
     def setUp(self):
         self.q = PlaylistModel()
@@ -266,6 +337,19 @@ class TPlaylistMux(TestCase):
 
     def test_destroy(self):
         self.mux.destroy()
+        self.assertTrue(self.pl.rows_changed_func is None)
+
+    def test_source_changed(self):
+        calls = []
+        self.p._source_changed = lambda: calls.append(None)
+        self.pl.set(range(100))
+        # once for the whole content, not per row
+        self.assertEqual(len(calls), 1)
+        self.q.append(row=[1])
+        self.assertEqual(len(calls), 2)
+        self.mux.destroy()
+        self.pl.set(range(10))
+        self.assertEqual(len(calls), 2)
 
     def test_only_pl(self):
         self.pl.set(range(10))
@@ -375,6 +459,21 @@ class TPlaylistMux(TestCase):
                 next = 10
             self.failUnlessEqual(self.next(), next)
 
+    def test_peek_next_ended(self):
+        self.pl.set(range(10))
+        self.q.set(range(10, 12))
+        do_events()
+        self.mux.go_to(3)
+        for i in range(5):
+            song = self.mux.peek_next_ended()
+            state = self.mux.state
+            self.mux.next_ended()
+            self.failIfEqual(self.mux.state, state)
+            self.failUnlessEqual(self.mux.current, song)
+            self.p.emit('song-started', self.mux.current)
+            do_events()
+        self.failUnlessEqual(self.mux.current, 6)
+
     def test_sourced(self):
         self.pl.set(range(10))
         self.q.set(range(10))
@@ -355,6 +355,24 @@ class TQuery(TestCase):
         self.assertTrue(Query(u'Ångstrom').search(self.s4))
         self.assertFalse(Query(u'Ängström').search(self.s4))
 
+    def test_match_diacriticals_folded(self):
+        songs = [self.s1, self.s2, self.s3, self.s4, self.s5]
+        for text in [u"angstrom", u"mu", u"bar foo", u"Quux"]:
+            query = Query(text)
+            self.assertTrue(
+                isinstance(query._match, (match.FoldedTag, match.Inter)))
+            if isinstance(query._match, match.Inter):
+                tags = query._match.res
+            else:
+                tags = [query._match]
+            self.assertTrue(
+                all(isinstance(t, match.FoldedTag) for t in tags))
+            # the same words as /word/d regexes
+            regex = Query(query.string)
+            self.assertFalse(isinstance(regex._match, match.FoldedTag))
+            self.assertEqual(
+                filter(query.search, songs), filter(regex.search, songs))
+
     def test_match_diacriticals_invalid_or_unsupported(self):
         # these fall back to test dumb searches:
         # invalid regex
@@ -375,3 +393,49 @@ class TQuery_get_type(TestCase):
     def test_green(self):
         for p in ["a = /b/", "&(a = b, c = d)", "/abc/", "!x", "!&(abc, def)"]:
             self.failUnlessEqual(QueryType.VALID, Query.get_type(p))
+
+
+class TQuery_is_refinement_of(TestCase):
+
+    def _refines(self, text, other):
+        return Query(text).is_refinement_of(Query(other))
+
+    def test_text(self):
+        self.assertTrue(self._refines(u"beatl", u"beat"))
+        self.assertTrue(self._refines(u"beat", u"beat"))
+        self.assertTrue(self._refines(u"the beatl", u"the beat"))
+        self.assertTrue(self._refines(u"the beat x", u"the beat"))
+        self.assertTrue(self._refines(u"beat l", u"beat"))
+        self.assertTrue(self._refines(u"Überall", u"Über"))
+        self.assertTrue(self._refines(u"foo", u""))
+        self.assertFalse(self._refines(u"beat", u"beatl"))
+        self.assertFalse(self._refines(u"the", u"the beat"))
+
+    def test_tags(self):
+        self.assertTrue(self._refines(u"artist=beatles", u"artist=beat"))
+        self.assertTrue(
+            self._refines(u"artist=beatles", u"|(artist=beat, album=x)"))
+        self.assertFalse(self._refines(u"album=beatles", u"artist=beat"))
+        self.assertFalse(self._refines(u"artist=/^beatl/", u"artist=/^beat/"))
+        self.assertFalse(self._refines(u"artist=/be|atl/", u"artist=/be|at/"))
+        self.assertFalse(self._refines(u"artist=/beatl/c", u"artist=/beat/"))
+
+    def test_neg(self):
+        self.assertTrue(self._refines(u"!beat", u"!beatles"))
+        self.assertFalse(self._refines(u"!beatles", u"!beat"))
+
+    def test_numcmp(self):
+        refines = self._refines
+        self.assertTrue(refines(u"#(playcount > 5)", u"#(playcount > 3)"))
+        self.assertTrue(refines(u"#(playcount > 3)", u"#(playcount >= 3)"))
+        self.assertTrue(refines(u"#(playcount = 5)", u"#(playcount > 3)"))
+        self.assertTrue(refines(u"#(playcount < 3)", u"#(playcount < 5)"))
+        self.assertFalse(refines(u"#(playcount >= 3)", u"#(playcount > 3)"))
+        self.assertFalse(refines(u"#(playcount > 3)", u"#(playcount > 5)"))
+        self.assertFalse(refines(u"#(skipcount > 5)", u"#(playcount > 3)"))
+
+    def test_depends_on_time(self):
+        self.assertTrue(Query(u"#(lastplayed < 1 day)").depends_on_time)
+        self.assertTrue(Query(u"&(a=foo, !#(added > today))").depends_on_time)
+        self.assertFalse(Query(u"#(playcount > 3)").depends_on_time)
+        self.assertFalse(Query(u"foo").depends_on_time)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from tests import TestCase
+
+from quodlibet import config
+from quodlibet.formats import AudioFile
+from quodlibet.query import Query
+from quodlibet.query import _match as match
+from quodlibet.query._compiler import QueryCompiler, compile_query
+
+
+QUERIES = [
+    u"", u"foo = bar", u"~dirname = !64K", u"foobar = /./", u"#(track >= 11)",
+    u"album = /i hate/", u"artist = /pi*/", u"title = /x.y/",
+    u"artist = /mu|piman/", u"album = !hate", u"artist = !pi",
+    u"b = /i hate/", u"a = /pi*/", u"t = /x.y/", u"#(track = 0)",
+    u"#(notatag = 0)", u"#(track = 12)", u"#(11 < track <= 12)",
+    u"#(20 > track < 20)", u"album = /i hate/c", u"title = /ångström/",
+    u"album = &(/ate/,/est/)", u"album = |(/tate/, /ets/)", u"a = /\\n/",
+    u"&(album = ate, artist = man)", u"|(album = ate, artist = nam)",
+    u"ate man", u"woo man", u"|(ate, foobar)", u"!!|(ate, foobar)",
+    u"! !&(ate, foobar)", u"&blah oh", u"!oh no", u" !!!&(xyz, zyx)",
+    u"&(tests,|(foo,&(pi,!nope)))", u"/(x|H)ate/", u"!'PiMan'c",
+    u"~dirname=/dir1/", u"#(rating = 0.77)", u"utf8=Ångström",
+    u"~filename=foü.ogg", u"~basename=ü.ogg", u"filename=öä",
+    u"title=\"Ångstrom\"d", u"Ångstrom", u"Ängström",
+    u"&(artist=mu, #(track > 1), ~dirname=dir, artist=/m/)",
+    u"|(#(playcount > 3), artist=piman, artist=!mu)",
+]
+
+
+class TQueryCompiler(TestCase):
+
+    def setUp(self):
+        config.init()
+        self.songs = [
+            AudioFile({"album": "I Hate: Tests", "artist": "piman",
+                       "title": "Quuxly", "version": "cake mix",
+                       "~filename": "/dir1/foobar.ogg", "~#playcount": 4}),
+            AudioFile({"album": "Foo the Bar", "artist": "mu",
+                       "title": "Rockin' Out", "~filename": "/dir2/some.mp3",
+                       "tracknumber": "12/15"}),
+            AudioFile({"artist": "piman\nmu",
+                       "~filename":
+                           "/test/\xc3\xb6\xc3\xa4\xc3\xbc/fo\xc3\xbc.ogg"}),
+            AudioFile({"title": u"Ångström", "utf8": "Ångström",
+                       "~#rating": 0.771, "~filename": "/a.ogg"}),
+            AudioFile({"title": "oh&blahhh", "artist": "!ohno",
+                       "~#rating": 0.769, "~filename": "/b.ogg"}),
+            AudioFile({"~filename": "foo/64K/bar.ogg"}),
+        ]
+
+    def tearDown(self):
+        config.quit()
+
+    def test_same_results(self):
+        for text in QUERIES:
+            query = Query(text)
+            search = QueryCompiler(query).compile()
+            for song in self.songs:
+                self.assertEqual(
+                    search(song), query.search(song), msg=text)
+
+    def test_query_compiled(self):
+        for text in QUERIES:
+            query = Query(text)
+            self.assertEqual(
+                filter(query.compiled, self.songs),
+                filter(query.search, self.songs), msg=text)
+            self.assertEqual(
+                query.filter(self.songs), filter(query.search, self.songs))
+
+    def test_unknown_node(self):
+        class Odd(match.Node):
+            def search(self, data):
+                return "odd" in data
+
+        query = Query("artist=piman") & Odd()
+        search = compile_query(query)
+        self.assertFalse(search(self.songs[0]))
+        self.songs[0]["odd"] = u"1"
+        self.assertTrue(search(self.songs[0]))
@@ -10,7 +10,7 @@ import re
 from tests import TestCase
 
 from quodlibet.query._diacritic import re_add_variants, \
-    diacritic_for_letters, re_replace_literals
+    diacritic_for_letters, re_replace_literals, fold, can_fold
 
 
 class TDiacritics(TestCase):
@@ -70,3 +70,22 @@ class TDiacritics(TestCase):
         self.assertTrue(u"ø" in re_add_variants(u"o"))
         self.assertTrue(u"Ø" in re_add_variants(u"O"))
         self.assertEqual(re_add_variants(u"[^f]"), u"[^fḟꝼ]")
+
+    def test_fold(self):
+        self.assertEqual(fold(u"Ångström"), u"angstrom")
+        self.assertEqual(fold(u"ǿ ø"), u"o o")
+        self.assertEqual(fold(u"foo"), u"foo")
+
+    def test_can_fold(self):
+        self.assertTrue(can_fold(u"abcxyz 0129"))
+        self.assertTrue(can_fold(u""))
+        self.assertFalse(can_fold(u"Ångström"))
+        self.assertFalse(can_fold(u"fö"))
+
+    def test_fold_same_as_regex(self):
+        for text in [u"Ångström", u"ǿ ø", u"ḟoo", u"ŷ", u"Bär"]:
+            for word in [u"a", u"o", u"f", u"y", u"ar", u"angs"]:
+                regex = re.compile(re_add_variants(word), re.I | re.U)
+                self.assertEqual(
+                    word in fold(text), bool(regex.search(text)),
+                    msg=(text, word))
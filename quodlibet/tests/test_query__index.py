@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+from tests import TestCase
+
+from quodlibet.formats import AudioFile
+from quodlibet.query import Query, QueryIndex
+from quodlibet.query._index import get_literal
+from quodlibet.util.path import fsnative
+
+
+def _songs():
+    songs = []
+    artists = [u"Foo", u"foo bar", u"Bär", u"Baz\nFoo", u"Quux"]
+    for i in xrange(50):
+        song = AudioFile({
+            "~filename": fsnative(u"/dir%d/file%d.ogg" % (i % 3, i)),
+            "title": u"Title %d" % i,
+            "artist": artists[i % len(artists)],
+            "~#playcount": i % 7,
+            "~#length": i * 10,
+        })
+        if i % 4:
+            song["album"] = u"Album %d" % (i % 4)
+        if i % 5 == 0:
+            song["date"] = u"%d" % (2000 + i)
+        songs.append(song)
+    return songs
+
+
+QUERIES = [
+    u"", u"foo", u"bar foo", u"Bär", u"!foo", u"artist=foo",
+    u"artist=\"foo\"", u"artist=/^foo/", u"artist=/^foo$/c",
+    u"album=!\"album 1\"", u"|(artist=\"quux\", title=\"title 3\")",
+    u"&(artist=foo, #(playcount > 3))", u"#(playcount < 2)",
+    u"#(playcount <= 2)", u"#(playcount >= 5)", u"#(playcount = 0)",
+    u"#(playcount != 0)", u"#(length > 200)", u"#(2 < playcount < 5)",
+    u"#(year > 2010)", u"~dirname=dir1", u"~people=\"foo\"",
+    u"filename=file1", u"&(album=/album/, !artist=foo)",
+    u"&(#(rating > 0.2), artist=foo)", u"title=|(\"title 1\", \"title 2\")",
+    u"artist=/^b/", u"bar", u"ba quux", u"artist=\"bar\"",
+]
+
+
+class TQueryIndex(TestCase):
+
+    def setUp(self):
+        self.songs = _songs()
+        self.index = QueryIndex(self.songs)
+
+    def _check(self):
+        for text in QUERIES:
+            query = Query(text)
+            self.assertEqual(
+                sorted(self.index.search(query)),
+                sorted(query.filter(self.songs)), msg=text)
+
+    def test_search(self):
+        self._check()
+
+    def test_len(self):
+        self.assertEqual(len(self.index), len(self.songs))
+        self.index.clear()
+        self.assertEqual(len(self.index), 0)
+
+    def test_change(self):
+        self._check()
+        for song in self.songs[:10]:
+            song["artist"] = u"foo quux"
+            song["~#playcount"] = 42
+        self.index.change(self.songs[:10])
+        self._check()
+
+    def test_change_numeric_incremental(self):
+        self._check()
+        index = self.index._numeric["~#playcount"]
+        sorted_ = index._sorted
+        for song in self.songs[:10]:
+            song["~#playcount"] = 3
+        self.index.change(self.songs[:10])
+        self.index.remove(self.songs[10:15])
+        self.index.add(self.songs[10:15])
+        self.assertTrue(index._sorted is sorted_)
+        self._check()
+
+    def test_add_remove(self):
+        self._check()
+        removed = self.songs[::2]
+        self.index.remove(removed)
+        self.songs = self.songs[1::2]
+        self._check()
+        self.index.add(removed)
+        self.songs.extend(removed)
+        self._check()
+
+    def test_can_resolve(self):
+        def check(text):
+            return self.index.can_resolve(Query(text))
+
+        self.assertTrue(check(u"artist=/^foo/"))
+        self.assertTrue(check(u"&(artist=foo, #(playcount > 3))"))
+        self.assertTrue(check(u"!|(#(length < 20), artist=foo)"))
+        self.assertFalse(check(u"#(rating > 0.2)"))
+        self.assertFalse(check(u"&(artist=foo, #(rating > 0.2))"))
+        self.assertFalse(check(u"|(artist=foo, ~rating=/x/)"))
+
+    def test_get_literal(self):
+        def get(text):
+            return get_literal(Query(text)._match.res)
+
+        self.assertEqual(get(u"artist=\"Foo\""), (u"foo", True))
+        self.assertEqual(get(u"artist=/^Foo/"), (u"foo", False))
+        self.assertEqual(get(u"artist=/^Foo$/c"), None)
+        self.assertEqual(get(u"artist=/Foo/"), None)
+        self.assertEqual(get(u"artist=/^Fo+/"), None)
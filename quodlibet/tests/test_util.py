@@ -10,6 +10,7 @@ from tests import TestCase, mkstemp, skipIf
 
 import tempfile
 import os
+import pickle
 import sys
 import threading
 import traceback
@@ -234,6 +235,60 @@ class Thuman_sort(TestCase):
         self.failUnlessEqual(64.0 in util.human_sort_key(u"64. 8"), True)
 
 
+class TSortKeyCache(TestCase):
+
+    def test_cache(self):
+        cache = util.SortKeyCache(util._human_sort_key)
+        key = cache(u"Foo 2")
+        self.assertEqual(key, util._human_sort_key(u"Foo 2"))
+        self.assertTrue(cache(u"Foo 2") is key)
+        self.assertEqual(cache.get_stats(),
+                         {"hits": 1, "misses": 1, "size": 1})
+        cache.clear()
+        self.assertEqual(cache.get_stats(),
+                         {"hits": 0, "misses": 0, "size": 0})
+
+    def test_bounded(self):
+        cache = util.SortKeyCache(util._human_sort_key, 10)
+        for i in xrange(100):
+            cache(unicode(i))
+            self.assertTrue(len(cache) <= 10)
+        # recently used keys survive
+        for i in xrange(100):
+            cache(u"0")
+            cache(unicode(i))
+        self.assertEqual(cache.misses, 100 + 1 + 99)
+
+    def test_save_load(self):
+        fd, filename = mkstemp()
+        os.close(fd)
+        try:
+            cache = util.SortKeyCache(util._human_sort_key)
+            cache(u"foo")
+            cache.save(filename)
+
+            cache = util.SortKeyCache(util._human_sort_key)
+            cache.load(filename)
+            self.assertEqual(cache(u"foo"), util._human_sort_key(u"foo"))
+            self.assertEqual(cache.misses, 0)
+            cache.load(filename + "nope")
+        finally:
+            os.unlink(filename)
+
+    def test_load_wrong_type(self):
+        fd, filename = mkstemp()
+        os.close(fd)
+        try:
+            with open(filename, "wb") as h:
+                pickle.dump([u"foo"], h)
+            cache = util.SortKeyCache(util._human_sort_key)
+            cache.load(filename)
+            self.assertEqual(cache(u"foo"), util._human_sort_key(u"foo"))
+            self.assertEqual(len(cache), 1)
+        finally:
+            os.unlink(filename)
+
+
 class Tformat_time(TestCase):
     def test_seconds(self):
         self.failUnlessEqual(util.format_time(0), "0:00")
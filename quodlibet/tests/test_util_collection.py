@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import shutil
 import os
+
+from gi.repository import GdkPixbuf
+
 from quodlibet import config
 
 from tests import TestCase, mkdtemp
@@ -10,6 +13,7 @@ from quodlibet.util.collection import Album, Playlist, avg, bayesian_average
 from quodlibet.library.libraries import FileLibrary
 from quodlibet.util import format_rating
 from quodlibet.util.path import fsnative
+from quodlibet.util.thumbnails import pixbuf_cache
 
 config.RATINGS = config.HardCodedRatingsPrefs()
 
@@ -34,6 +38,21 @@ class TAlbum(TestCase):
     def setUp(self):
         config.init()
 
+    def test_cover(self):
+        album = Album(Fakesong({"album": "foo"}))
+        self.assertTrue(album.cover is None)
+        pb = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, True, 8, 10, 10)
+        album.scanned = True
+        album.cover = pb
+        self.assertTrue(album.cover is pb)
+        self.assertEqual(album("~cover"), "y")
+
+        # dropped from the cache, needs a rescan
+        pixbuf_cache.clear()
+        self.assertTrue(album.cover is None)
+        self.assertFalse(album.scanned)
+        self.assertEqual(album("~cover"), None)
+
     def test_people_sort(s):
         songs = [
             Fakesong({"albumartist": "aa", "artist": "b\na"}),
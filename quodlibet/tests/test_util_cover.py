@@ -5,13 +5,18 @@
 # published by the Free Software Foundation.
 
 import os
+import time
+
+from gi.repository import Gtk, Gio, GdkPixbuf
 
 from quodlibet import config
 from quodlibet.formats import AudioFile
 from quodlibet.util.cover.manager import CoverManager
+from quodlibet.util.cover.built_in import path_cache, CoverPathCache, \
+    FilesystemCover
 from quodlibet.util.path import fsnative, normalize_path
 
-from . import TestCase, DATA_DIR
+from . import TestCase, DATA_DIR, mkstemp
 
 
 quux = AudioFile({
@@ -32,6 +37,7 @@ class TCoverManager(TestCase):
 
     def setUp(self):
         config.init()
+        path_cache.clear()
         self.manager = CoverManager()
 
         self.dir = os.path.realpath(quux("~dirname"))
@@ -135,3 +141,98 @@ class TCoverManager(TestCase):
     def test_get_thumbnail(self):
         self.assertTrue(self.manager.get_pixbuf(quux, 10, 10) is None)
         self.assertTrue(self.manager.get_pixbuf_many([quux], 10, 10) is None)
+
+    def test_path_cache(self):
+        f = self.full_path("cover.jpg")
+        self.assertFalse(self._find_cover(quux))
+        key = FilesystemCover(quux)._get_key()
+        self.assertEqual(path_cache.get(key), (True, None))
+
+        # a new file changes the directory mtime
+        file(f, "w").close()
+        self.files.append(f)
+        self.assertEqual(path_cache.get(key), (False, None))
+        path = self._find_cover(quux).name
+        self.assertEqual(os.path.abspath(path), f)
+        self.assertEqual(path_cache.get(key), (True, path))
+
+        self.manager.cover_changed([quux])
+        self.assertEqual(path_cache.get(key), (False, None))
+
+    def test_get_pixbuf_many_async(self):
+        f = self.full_path("folder.jpg")
+        pb = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, True, 8, 150, 10)
+        pb.savev(f, "jpeg", [], [])
+        self.files.append(f)
+
+        results = []
+        cancelled = Gio.Cancellable()
+        cancelled.cancel()
+        self.manager.get_pixbuf_many_async(
+            [quux], 10, 10, cancelled, results.append)
+        self.manager.get_pixbuf_many_async(
+            [quux], 10, 10, Gio.Cancellable(), results.append)
+
+        end = time.time() + 5
+        while not results and time.time() < end:
+            Gtk.main_iteration_do(False)
+        while Gtk.events_pending():
+            Gtk.main_iteration()
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].get_width(), 10)
+
+
+class TCoverPathCache(TestCase):
+
+    def setUp(self):
+        self.cache = CoverPathCache(max_size=2)
+        self.dir = os.path.realpath(DATA_DIR)
+        self.mtimes = [(self.dir, os.path.getmtime(self.dir))]
+
+    def test_get_set(self):
+        self.assertEqual(self.cache.get((self.dir, 1)), (False, None))
+        self.cache.set((self.dir, 1), self.mtimes, "foo")
+        self.assertEqual(self.cache.get((self.dir, 1)), (True, "foo"))
+        self.cache.set((self.dir, 2), [(self.dir, 0)], None)
+        self.assertEqual(self.cache.get((self.dir, 2)), (False, None))
+        self.assertEqual(len(self.cache), 1)
+
+    def test_evict(self):
+        for i in range(3):
+            self.cache.set((self.dir, i), self.mtimes, str(i))
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get((self.dir, 0)), (False, None))
+        self.assertEqual(self.cache.get((self.dir, 1)), (True, "1"))
+        self.cache.set((self.dir, 3), self.mtimes, "3")
+        self.assertEqual(self.cache.get((self.dir, 1)), (True, "1"))
+        self.assertEqual(self.cache.get((self.dir, 2)), (False, None))
+
+    def test_invalidate(self):
+        self.cache.set((self.dir, 1), self.mtimes, "foo")
+        self.cache.set(("/nope", 1), [], "bar")
+        self.cache.invalidate([self.dir])
+        self.assertEqual(self.cache.get((self.dir, 1)), (False, None))
+        self.assertEqual(self.cache.get(("/nope", 1)), (True, "bar"))
+
+    def test_save_load(self):
+        fd, filename = mkstemp()
+        os.close(fd)
+        try:
+            self.cache.set((self.dir, 1), self.mtimes, "foo")
+            self.cache.save(filename)
+            cache = CoverPathCache()
+            cache.load(filename)
+            self.assertEqual(cache.get((self.dir, 1)), (True, "foo"))
+        finally:
+            os.unlink(filename)
+
+    def test_load_broken(self):
+        fd, filename = mkstemp()
+        os.write(fd, "nope")
+        os.close(fd)
+        try:
+            self.cache.load(filename)
+            self.assertEqual(len(self.cache), 0)
+        finally:
+            os.unlink(filename)
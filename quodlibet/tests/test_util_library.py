@@ -5,12 +5,25 @@
 # it under the terms of the GNU General Public License version 2 as
 # published by the Free Software Foundation
 
+import os
 import sys
+import shutil
+
+from gi.repository import Gtk, GdkPixbuf
+
+from quodlibet import app
 from quodlibet import config
-from quodlibet.util.library import split_scan_dirs, set_scan_dirs
+from quodlibet.formats import AudioFile
+from quodlibet.library import SongLibrary
+from quodlibet.query import Query
+from quodlibet.util.cover import CoverManager
+from quodlibet.util.library import split_scan_dirs, set_scan_dirs, \
+    QueryExecutor, warm_cover_cache
 from quodlibet.util.path import fsnative
+from quodlibet.util.thumbnails import ThumbSize, needs_thumbnail, \
+    get_cache_info
 
-from tests import TestCase
+from tests import TestCase, mkdtemp
 
 ON_WINDOWS = sys.platform == "win32"
 
@@ -67,3 +80,84 @@ class Tset_scan_dirs(TestCase):
         set_scan_dirs([STANDARD_PATH, GVFS_PATH])
         expected = GVFS_PATH if ON_WINDOWS else GVFS_PATH_ESCAPED
         self.assertEqual(self.scan_dirs, "%s:%s" % (STANDARD_PATH, expected))
+
+
+class TQueryExecutor(TestCase):
+
+    def setUp(self):
+        self.songs = [AudioFile({"title": u"%d" % i}) for i in xrange(100)]
+        self.executor = QueryExecutor()
+        self.executor.CHUNK_SIZE = 10
+        self.executor.STEP_TIME = 0
+
+    def _run(self):
+        while Gtk.events_pending():
+            Gtk.main_iteration()
+
+    def test_run(self):
+        result = []
+        partial = []
+        self.executor.PARTIAL_TIME = 0
+        self.executor.run(Query(u"title=1"), self.songs, result.extend,
+                          partial.append)
+        self.assertTrue(self.executor.running)
+        self._run()
+        self.assertFalse(self.executor.running)
+        self.assertEqual(result, Query(u"title=1").filter(self.songs))
+        self.assertTrue(partial)
+        for songs in partial:
+            self.assertEqual(songs, result[:len(songs)])
+
+    def test_cancel(self):
+        result = []
+        self.executor.run(Query(u"title=1"), self.songs, result.append)
+        self.executor.cancel()
+        self._run()
+        self.assertFalse(self.executor.running)
+        self.assertEqual(result, [])
+
+    def test_restart(self):
+        result = []
+        self.executor.run(Query(u"title=1"), self.songs, result.append)
+        self.executor.run(Query(u"title=2"), self.songs, result.append)
+        self._run()
+        self.assertEqual(result, [Query(u"title=2").filter(self.songs)])
+
+
+class Twarm_cover_cache(TestCase):
+
+    def setUp(self):
+        config.init()
+        self.dir = mkdtemp()
+        self.cover = os.path.join(self.dir, "folder.jpg")
+        pb = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, False, 8, 300, 300)
+        pb.savev(self.cover, "jpeg", [], [])
+        self.library = SongLibrary()
+        self.library.add([AudioFile({
+            "~filename": os.path.join(self.dir, "%d.ogg" % i),
+            "album": u"foo"}) for i in range(3)])
+        self.manager = app.cover_manager
+        app.cover_manager = CoverManager()
+
+    def tearDown(self):
+        app.cover_manager = self.manager
+        for size in [ThumbSize.NORMAL, ThumbSize.LARGE]:
+            try:
+                os.remove(get_cache_info(self.cover, (size, size))[0])
+            except OSError:
+                pass
+        self.library.destroy()
+        shutil.rmtree(self.dir)
+        config.quit()
+
+    def test_warm(self):
+        sizes = [ThumbSize.NORMAL, ThumbSize.LARGE]
+        for processes in [0, 2]:
+            self.tearDown()
+            self.setUp()
+            for size in sizes:
+                self.assertTrue(needs_thumbnail(self.cover, size))
+            for result in warm_cover_cache(self.library, processes):
+                pass
+            for size in sizes:
+                self.assertFalse(needs_thumbnail(self.cover, size))
@@ -25,6 +25,7 @@ class TThumb(TestCase):
             GdkPixbuf.Colorspace.RGB, True, 8, 10, 20)
         s.filename = os.path.join(getcwd(), "test_thumbnail.png")
         s.wide.savev(s.filename, "png", [], [])
+        thumbnails.pixbuf_cache.clear()
 
     def tearDown(self):
         p1 = thumbnails.get_cache_info(self.filename, (10, 10))[0]
@@ -80,9 +81,29 @@ class TThumb(TestCase):
         self.assertTrue(thumb)
         path, size = thumbnails.get_cache_info(self.filename, (50, 60))
         open(path, "wb").close()
+        thumbnails.pixbuf_cache.clear()
         thumb = thumbnails.get_thumbnail(self.filename, (50, 60))
         self.assertTrue(thumb)
 
+    def test_create_thumbnails(self):
+        normal, large = thumbnails.ThumbSize.NORMAL, thumbnails.ThumbSize.LARGE
+        self.assertTrue(thumbnails.needs_thumbnail(self.filename, normal))
+        self.assertEqual(
+            thumbnails.create_thumbnails([self.filename], [normal, large]), 1)
+        self.assertFalse(thumbnails.needs_thumbnail(self.filename, normal))
+        # too small for a large one, so none is needed
+        self.assertFalse(thumbnails.needs_thumbnail(self.filename, large))
+
+    def test_thumb_cached(self):
+        thumb = thumbnails.get_thumbnail(self.filename, (50, 60))
+        self.assertTrue(thumbnails.get_thumbnail(self.filename, (50, 60))
+                        is thumb)
+        self.assertFalse(thumbnails.get_thumbnail(self.filename, (40, 60))
+                         is thumb)
+        os.utime(self.filename, (0, 0))
+        self.assertFalse(thumbnails.get_thumbnail(self.filename, (50, 60))
+                         is thumb)
+
     def test_thumb(s):
         thumb = thumbnails.get_thumbnail(s.filename, (50, 60))
 
@@ -110,3 +131,54 @@ class TThumb(TestCase):
         #check rights
         if os.name != "nt":
             s.failUnlessEqual(os.stat(path).st_mode, 33152)
+
+
+class TPixbufCache(TestCase):
+
+    def setUp(self):
+        self.cache = thumbnails.PixbufCache(max_bytes=3000)
+
+    def _new(self):
+        # 10 * 10 * 4 bytes
+        return GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, True, 8, 10, 10)
+
+    def test_get_set(self):
+        pb = self._new()
+        self.assertTrue(self.cache.get("a") is None)
+        self.cache.set("a", pb)
+        self.assertTrue(self.cache.get("a") is pb)
+        self.assertEqual(
+            self.cache.get_stats(),
+            {"hits": 1, "misses": 1, "size": 1, "bytes": 400})
+        self.cache.set("a", None)
+        self.assertTrue(self.cache.get("a") is None)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_evict(self):
+        for i in range(7):
+            self.cache.set(i, self._new())
+        self.cache.get(0)
+        self.cache.set(7, self._new())
+        self.assertEqual(len(self.cache), 7)
+        self.assertTrue(self.cache.get(0) is not None)
+        self.assertTrue(self.cache.get(1) is None)
+
+    def test_shared(self):
+        pb = self._new()
+        for i in range(10):
+            self.cache.set(i, pb)
+        self.assertEqual(len(self.cache), 10)
+        self.assertEqual(self.cache.get_stats()["bytes"], 400)
+
+    def test_keep_one(self):
+        self.cache.max_bytes = 0
+        pb = self._new()
+        self.cache.set("a", pb)
+        self.assertTrue(self.cache.get("a") is pb)
+
+    def test_clear(self):
+        self.cache.set("a", self._new())
+        self.cache.clear()
+        self.assertEqual(
+            self.cache.get_stats(),
+            {"hits": 0, "misses": 0, "size": 0, "bytes": 0})